@@ -1,4 +1,10 @@
-# app/__init__.py
-from .factory import app
-
 __all__ = ["app"]
+
+
+def __getattr__(name):
+    # Built on first access rather than on package import, so a launcher can
+    # prepare the environment (e.g. Prometheus multiprocess mode) beforehand
+    if name == "app":
+        from .factory import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
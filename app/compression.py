@@ -0,0 +1,197 @@
+# app/compression.py
+"""
+Negotiated response compression, as a pure ASGI middleware.
+
+``CompressionMiddleware`` picks an encoding from ``Accept-Encoding``
+(the client's q-values first, then the server's order in
+``COMPRESSION_ENCODINGS``) and compresses single-message responses of a
+compressible type once they reach ``COMPRESSION_MIN_SIZE`` bytes. Streamed
+responses, such as the vote stream, go out untouched.
+
+The chosen encoding is left in the scope under ``SCOPE_KEY`` so a route
+can send a body it already holds compressed, such as a listing cache
+variant, with its own ``Content-Encoding``; the middleware leaves encoded
+responses alone.
+
+gzip is always available; ``br`` needs ``brotli`` and ``zstd`` needs
+``zstandard``. An encoding whose package is missing is skipped.
+"""
+import gzip
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.metrics import COMPRESSED_RESPONSES
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SCOPE_KEY = "ideahub.content_encoding"
+
+# encoding -> package providing it, for the warning when it is missing
+_PACKAGES = {"gzip": "gzip", "br": "brotli", "zstd": "zstandard"}
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/html", b"text/plain", b"text/css", b"application/javascript")
+
+
+@lru_cache(maxsize=256)
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """``Accept-Encoding`` as {coding: q}; clients send few distinct values, so parses are cached"""
+    codings = {}
+    for part in header.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+
+class Compressor:
+    def __init__(self, encodings: Iterable[str], levels: Dict[str, int], minimum_size: int):
+        self.minimum_size = minimum_size
+        self._codecs = {}
+        for encoding in encodings:
+            codec = self._codec(encoding, levels[encoding])
+            if codec is None:
+                logger.warning("Response compression: %s is not installed, %s disabled", _PACKAGES[encoding], encoding)
+            else:
+                self._codecs[encoding] = codec
+        # In server preference order
+        self.encodings: Tuple[str, ...] = tuple(self._codecs)
+
+    @staticmethod
+    def _codec(encoding: str, level: int):
+        if encoding == "gzip":
+            # mtime=0: equal bodies compress to equal bytes
+            return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+        if encoding == "br" and brotli is not None:
+            return lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=level)
+        if encoding == "zstd" and zstandard is not None:
+            return zstandard.ZstdCompressor(level=level).compress
+        return None
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Best encoding both sides support, or None for identity"""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        return self._codecs[encoding](data)
+
+
+def create_compressor() -> Compressor:
+    return Compressor(
+        [encoding.strip() for encoding in settings.COMPRESSION_ENCODINGS.split(",") if encoding.strip()],
+        {"gzip": settings.COMPRESSION_GZIP_LEVEL, "br": settings.COMPRESSION_BROTLI_LEVEL,
+         "zstd": settings.COMPRESSION_ZSTD_LEVEL},
+        settings.COMPRESSION_MIN_SIZE,
+    )
+
+
+compressor = create_compressor()
+
+
+def negotiated_encoding(scope) -> Optional[str]:
+    """Encoding ``CompressionMiddleware`` chose for this request, if any"""
+    return scope.get(SCOPE_KEY)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, compressor: Compressor = compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif name == b"accept" and value == b"text/event-stream":
+                # A stream: never compressed, not worth wrapping
+                accept_encoding = None
+                break
+        encoding = self.compressor.negotiate(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        scope[SCOPE_KEY] = encoding
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether to compress
+                start = message
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(start, body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self.compressor.compress(body, encoding)
+            headers = []
+            for name, value in start.get("headers", ()):
+                if name == b"content-length":
+                    continue
+                if name == b"etag" and not value.startswith(b"W/"):
+                    # The compressed body is no longer byte-identical
+                    value = b"W/" + value
+                headers.append((name, value))
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            COMPRESSED_RESPONSES.labels(encoding, "no").inc()
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start, body: bytes) -> bool:
+        if len(body) < self.compressor.minimum_size or start["status"] in (204, 206, 304):
+            return False
+        compressible = False
+        for name, value in start.get("headers", ()):
+            if name == b"content-encoding":
+                return False
+            if name == b"cache-control" and b"no-transform" in value:
+                return False
+            if name == b"content-type":
+                compressible = value.startswith(_COMPRESSIBLE_TYPES)
+        return compressible
@@ -0,0 +1,89 @@
+# app/db/instrumentation.py
+"""
+Connection pool and query metrics for an engine.
+
+``InstrumentedPool`` times how long each checkout waits for a connection
+and keeps the checked-out and overflow gauges current; ``instrument_engine``
+labels an engine's pool metrics and logs statements slower than
+``SLOW_QUERY_SECONDS``. Pool metrics follow ``ENABLE_STAGE_TIMING``; the
+query timing hooks are only installed when a threshold is set.
+"""
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+from app.logging_config import Truncated
+from app.metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_WAIT_SECONDS, DB_SLOW_QUERIES
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records checkout wait time and keeps the checked-out
+    and overflow gauges current, once ``instrument_engine`` has labelled it
+    """
+
+    # Keep SQLAlchemy's pool logging under its own (WARNING level) namespace
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+    metrics = None
+
+    def _update_gauges(self):
+        _, checked_out, overflow = self.metrics
+        checked_out.set(self.checkedout())
+        # Negative while the pool itself has unopened slots
+        overflow.set(max(0, self.overflow()))
+
+    def _do_get(self):
+        if self.metrics is None or not settings.ENABLE_STAGE_TIMING:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics[0].observe(time.perf_counter() - started)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        if self.metrics is not None and settings.ENABLE_STAGE_TIMING:
+            self._update_gauges()
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool, e.g. in forked workers
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Label ``engine``'s pool metrics ``name`` and log its slow queries"""
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedPool):
+        pool.metrics = (
+            DB_POOL_WAIT_SECONDS.labels(name),
+            DB_POOL_CHECKED_OUT.labels(name),
+            DB_POOL_OVERFLOW.labels(name),
+        )
+
+    threshold = settings.SLOW_QUERY_SECONDS
+    if threshold <= 0:
+        return
+    slow_queries = DB_SLOW_QUERIES.labels(name)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        if elapsed >= threshold:
+            slow_queries.inc()
+            logger.warning(
+                "Slow query on %s (%.1fms): %s", name, elapsed * 1e3, Truncated(" ".join(statement.split()))
+            )
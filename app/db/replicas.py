@@ -0,0 +1,201 @@
+# app/db/replicas.py
+"""
+Read replicas: health-aware selection and read-your-writes pinning.
+
+``ReplicaSet`` hands out replica engines round robin for read-only
+sessions (see ``get_read_db``). A replica is taken out of rotation as soon
+as connecting to it fails or a connection to it drops, and by
+``replica_health_job`` when ``SELECT 1`` fails or, on MySQL with
+``max_lag`` set, it reports itself too far behind (or not replicating at
+all). The job puts it back once it passes again. With no healthy replica,
+reads fail over to the primary.
+
+Replicas lag, so a client that has just written must not read from them:
+``pin_reads_to_primary`` marks the current request, and
+``ReadYourWritesMiddleware`` turns that into a short-lived cookie that
+pins the client's reads for ``DB_READ_YOUR_WRITES_SECONDS``. Clients that
+drop cookies simply may not see their own vote for up to the replica lag.
+"""
+import asyncio
+import logging
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.metrics import DB_REPLICA_HEALTHY
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_COOKIE = "ideahub_rw"
+
+
+class ReplicaSet:
+    def __init__(self, max_lag: float = 0.0, check_timeout: float = 2.0):
+        self.max_lag = max_lag
+        self.check_timeout = check_timeout
+        self._replicas: List[Tuple[str, AsyncEngine]] = []
+        self._healthy: Dict[str, bool] = {}
+        self._next = 0
+
+    def add(self, name: str, engine: AsyncEngine):
+        """Put ``engine`` in rotation, assumed healthy until it fails"""
+        self._replicas.append((name, engine))
+        self._set_health(name, True)
+        self._watch(name, engine)
+
+    def __bool__(self) -> bool:
+        return bool(self._replicas)
+
+    @property
+    def engines(self) -> List[AsyncEngine]:
+        return [engine for _, engine in self._replicas]
+
+    def healthy(self, name: str) -> bool:
+        return self._healthy.get(name, False)
+
+    def available(self) -> bool:
+        """Whether any replica is in rotation"""
+        return any(self._healthy.values())
+
+    def choose(self) -> Optional[Tuple[str, AsyncEngine]]:
+        """Next healthy replica, round robin; None when there is none"""
+        for _ in range(len(self._replicas)):
+            name, engine = self._replicas[self._next]
+            self._next = (self._next + 1) % len(self._replicas)
+            if self._healthy[name]:
+                return name, engine
+        return None
+
+    def mark_down(self, name: str, reason: str):
+        if self._healthy.get(name):
+            logger.warning("Replica %s out of rotation: %s", name, reason)
+        self._set_health(name, False)
+
+    def _set_health(self, name: str, healthy: bool):
+        self._healthy[name] = healthy
+        DB_REPLICA_HEALTHY.labels(name).set(1 if healthy else 0)
+
+    def _watch(self, name: str, engine: AsyncEngine):
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _connection_failed(context):
+            # No connection yet means connecting itself failed
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(name, str(context.original_exception))
+
+    async def check(self):
+        """Probe every replica once, returning recovered ones to rotation"""
+        await asyncio.gather(*(self._check(name, engine) for name, engine in self._replicas))
+
+    async def _check(self, name: str, engine: AsyncEngine):
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    lag = await self._lag(conn)
+        except Exception as e:
+            self.mark_down(name, f"health check failed: {e}")
+            return
+        if lag is not None and lag > self.max_lag:
+            self.mark_down(name, f"{lag:.0f}s behind the primary")
+            return
+        if not self._healthy[name]:
+            logger.info("Replica %s back in rotation", name)
+        self._set_health(name, True)
+
+    async def _lag(self, conn) -> Optional[float]:
+        """Seconds behind the primary (inf when not replicating); None when not checked"""
+        if not self.max_lag or conn.dialect.name != "mysql":
+            return None
+        status = (await conn.exec_driver_sql("SHOW REPLICA STATUS")).mappings().first()
+        if status is None:
+            return float("inf")
+        lag = status.get("Seconds_Behind_Source")
+        return float("inf") if lag is None else float(lag)
+
+
+async def replica_health_job(replicas: ReplicaSet, interval: float):
+    """Background task: probe the replicas every ``interval`` seconds"""
+    while True:
+        try:
+            await replicas.check()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Replica health check failed")
+        await asyncio.sleep(interval)
+
+
+class _RequestReads:
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned: bool):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_request_reads: ContextVar[Optional[_RequestReads]] = ContextVar("request_reads", default=None)
+
+
+def pin_reads_to_primary():
+    """Send this request's client to the primary for its next reads, which must see what it just wrote"""
+    state = _request_reads.get()
+    if state is not None:
+        state.wrote = True
+
+
+def reads_pinned() -> bool:
+    """Whether this request's reads must go to the primary"""
+    state = _request_reads.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client's reads to the primary for ``window`` seconds after it writes (pure ASGI)"""
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+        self._prefix = f"{READ_YOUR_WRITES_COOKIE}=".encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        now = time.time()
+        state = _RequestReads(self._pinned_until(scope, now) > now)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={now + self.window:.3f}; Max-Age={math.ceil(self.window)}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", ()), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        token = _request_reads.set(state)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_reads.reset(token)
+
+    def _pinned_until(self, scope, now: float) -> float:
+        for name, value in scope["headers"]:
+            if name != b"cookie":
+                continue
+            for cookie in value.split(b";"):
+                cookie = cookie.strip()
+                if cookie.startswith(self._prefix):
+                    try:
+                        until = float(cookie[len(self._prefix):])
+                    except ValueError:
+                        return 0.0
+                    # Client-controlled: an expiry further out than one window
+                    # (or inf/nan) was never issued here, so it pins nothing
+                    return until if until <= now + self.window else 0.0
+        return 0.0
@@ -1,16 +1,68 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db.instrumentation import InstrumentedPool, instrument_engine
+from app.db.replicas import ReplicaSet, reads_pinned
+from app.metrics import DB_READ_SESSIONS
+from app.utils.stages import stage
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
-# Async MySQL engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
+
+def worker_pool_limits(pool_size: int, max_overflow: int, budget: int, workers: int) -> Tuple[int, int]:
+    """
+    Per-worker (pool_size, max_overflow) such that ``workers`` pools never
+    hold more than ``budget`` connections together (``budget`` 0 = no cap)
+    """
+    if budget <= 0:
+        return pool_size, max_overflow
+    per_worker = max(1, budget // max(1, workers))
+    pool_size = min(pool_size, per_worker)
+    return pool_size, min(max_overflow, per_worker - pool_size)
+
+
+WORKERS = settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+POOL_SIZE, MAX_OVERFLOW = worker_pool_limits(
+    settings.DB_POOL_SIZE,
+    settings.DB_MAX_OVERFLOW,
+    settings.DB_CONNECTION_BUDGET,
+    WORKERS
 )
+# Per replica: each is its own server, with its own connection limit
+REPLICA_POOL_SIZE, REPLICA_MAX_OVERFLOW = worker_pool_limits(
+    settings.DB_REPLICA_POOL_SIZE,
+    settings.DB_REPLICA_MAX_OVERFLOW,
+    settings.DB_CONNECTION_BUDGET,
+    WORKERS
+)
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        poolclass=InstrumentedPool,
+    )
+    instrument_engine(engine, name)
+    return engine
+
+
+# Async MySQL engines: the primary takes every write, the replicas reads
+engine = _create_engine(settings.DATABASE_URL, POOL_SIZE, MAX_OVERFLOW, "primary")
+replicas = ReplicaSet(max_lag=settings.DB_READ_YOUR_WRITES_SECONDS)
+for number, url in enumerate(settings.replica_urls, start=1):
+    replicas.add(f"replica{number}", _create_engine(url, REPLICA_POOL_SIZE, REPLICA_MAX_OVERFLOW, f"replica{number}"))
 
 # Create session factory
 AsyncSessionLocal = sessionmaker(
@@ -31,9 +83,66 @@ async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            with stage("db", "commit"):
+                await session.commit()
         except Exception:
-            await session.rollback()
+            with stage("db", "rollback"):
+                await session.rollback()
             raise
         finally:
             await session.close()
+
+
+async def get_read_db() -> Optional[AsyncSession]:
+    """
+    Dependency for read-only queries: a session on a healthy replica, or
+    None to read from the primary session of ``get_db`` (no replicas, none
+    healthy, or the client's reads are pinned after a write)
+    """
+    if not replicas:
+        yield None
+        return
+    if reads_pinned():
+        DB_READ_SESSIONS.labels("primary", "pinned").inc()
+        yield None
+        return
+    chosen = replicas.choose()
+    if chosen is None:
+        DB_READ_SESSIONS.labels("primary", "failover").inc()
+        yield None
+        return
+    name, replica = chosen
+    DB_READ_SESSIONS.labels(name, "replica").inc()
+    # Nothing to commit; closing rolls the read transaction back
+    async with AsyncSessionLocal(bind=replica) as session:
+        yield session
+
+
+_after_commit_tasks = set()
+
+
+def run_after_commit(session: AsyncSession, func: Callable[..., Awaitable], *args):
+    """
+    Schedule ``func(*args)`` on the event loop once ``session`` commits.
+
+    Used for side effects (cache invalidation, fan-out) that must not be
+    observable before the data they describe is visible to other readers.
+    """
+    def _schedule(sync_session):
+        async def _run():
+            try:
+                await func(*args)
+            except Exception:
+                logger.exception("After-commit hook %s failed", getattr(func, "__qualname__", func))
+
+        task = asyncio.get_running_loop().create_task(_run())
+        _after_commit_tasks.add(task)
+        task.add_done_callback(_after_commit_tasks.discard)
+
+    event.listen(session.sync_session, "after_commit", _schedule, once=True)
+
+
+async def drain_after_commit_tasks(timeout: float):
+    """Wait for scheduled after-commit hooks to finish, e.g. before shutdown"""
+    if _after_commit_tasks:
+        await asyncio.wait(set(_after_commit_tasks), timeout=timeout)
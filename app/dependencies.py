@@ -5,8 +5,15 @@ from typing import Annotated, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db.session import get_db
+from .db.session import get_db, get_read_db
 from .services.ideas import IdeaService
+from .services.listing_cache import ListingCache, listing_cache
+from .services.listing_versions import ListingVersions, listing_versions
+from .services.search import InvertedIndex, search_index
+from .services.similarity import MinHashIndex, similarity_index
+from .services.vote_buffer import VoteBuffer, vote_buffer
+from .services.vote_stream import VoteStream, vote_stream
+from .schemas.idea import VoteBatchRequest
 from .security import (
     security_service,
     submission_limiter,
@@ -17,14 +24,62 @@ from .security import (
 from .config import settings
 
 
-def get_idea_service(db: Annotated[AsyncSession, Depends(get_db)]) -> IdeaService:
+def get_vote_buffer() -> Optional[VoteBuffer]:
+    """Write-behind vote buffer, when enabled"""
+    return vote_buffer if settings.VOTE_BUFFER_ENABLED else None
+
+
+def get_listing_cache() -> Optional[ListingCache]:
+    """Listing page cache, when enabled"""
+    return listing_cache if settings.LISTING_CACHE_ENABLED else None
+
+
+def get_listing_versions() -> Optional[ListingVersions]:
+    """Listing version counters for HTTP revalidation, when enabled"""
+    return listing_versions if settings.HTTP_CACHE_ENABLED else None
+
+
+def get_search_index() -> Optional[InvertedIndex]:
+    """In-memory search index for databases without FULLTEXT, when enabled"""
+    return search_index if settings.SEARCH_FALLBACK_ENABLED else None
+
+
+def get_similarity_index() -> Optional[MinHashIndex]:
+    """Near-duplicate index, when enabled"""
+    return similarity_index if settings.SIMILARITY_ENABLED else None
+
+
+def get_vote_stream() -> Optional[VoteStream]:
+    """Live vote count hub, when enabled"""
+    return vote_stream if settings.VOTE_STREAM_ENABLED else None
+
+
+def get_idea_service(
+        db: Annotated[AsyncSession, Depends(get_db)],
+        read_db: Annotated[Optional[AsyncSession], Depends(get_read_db)],
+        buffer: Annotated[Optional[VoteBuffer], Depends(get_vote_buffer)],
+        cache: Annotated[Optional[ListingCache], Depends(get_listing_cache)],
+        index: Annotated[Optional[InvertedIndex], Depends(get_search_index)],
+        similar: Annotated[Optional[MinHashIndex], Depends(get_similarity_index)],
+        stream: Annotated[Optional[VoteStream], Depends(get_vote_stream)],
+        versions: Annotated[Optional[ListingVersions], Depends(get_listing_versions)]
+) -> IdeaService:
     """Dependency injection for IdeaService with async support"""
-    return IdeaService(db)
+    return IdeaService(
+        db, read_db=read_db, vote_buffer=buffer, listing_cache=cache, search_index=index, similarity_index=similar,
+        vote_stream=stream, listing_versions=versions
+    )
 
 
-def get_voter_identifier(request: Request) -> str:
+async def get_voter_identifier(request: Request) -> str:
     """Get secure voter hash using security service"""
-    return security_service.get_voter_identifier(request)
+    return await security_service.resolve_voter_identifier(request)
+
+
+def get_vote_batch(request: Request, batch: VoteBatchRequest) -> VoteBatchRequest:
+    """Vote batch body; records its rate limit cost (one token per distinct idea)"""
+    request.state.vote_batch_cost = len({item.idea_id for item in batch.votes})
+    return batch
 
 
 def get_submission_limiter() -> Optional[Limiter]:
@@ -48,4 +103,6 @@ VoterHashDep = Annotated[str, Depends(get_voter_identifier)]
 CaptchaDep = Annotated[None, Depends(verify_captcha_dependency)]
 SubmissionLimitDep = Annotated[Optional[Limiter], Depends(get_submission_limiter)]
 VotingLimitDep = Annotated[Optional[Limiter], Depends(get_voting_limiter)]
+VoteBatchDep = Annotated[VoteBatchRequest, Depends(get_vote_batch)]
+ListingCacheDep = Annotated[Optional[ListingCache], Depends(get_listing_cache)]
 SanitizedTextDep = Annotated[str, SanitizedText]
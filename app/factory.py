@@ -1,50 +1,131 @@
 # app/factory.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_fastapi_instrumentator import Instrumentator
 from contextlib import asynccontextmanager
 from app.config import settings
-from app.db.session import init_db as create_db_tables, get_db
-from app.logging_config import configure_logging
+from app.compression import CompressionMiddleware
+from app.db.replicas import ReadYourWritesMiddleware, replica_health_job
+from app.db.session import (
+    init_db as create_db_tables, get_db, AsyncSessionLocal, drain_after_commit_tasks, engine, replicas
+)
+from app.http_cache import HTTPCacheMiddleware
+from app.logging_config import RequestIdMiddleware, configure_logging
 from app.routes import core, admin, health
+from app.security import SecurityHeadersMiddleware, security_service
+from app.services.listing_cache import listing_cache
+from app.services.listing_sweep import listing_sweep
+from app.services.listing_versions import listing_versions
+from app.services.ranking import hot_score_job
+from app.services.similarity import similarity_index, similarity_job
+from app.services.vote_buffer import vote_buffer
+from app.services.vote_stream import vote_stream
+from app.utils.names import get_name_pool
+from app.utils.stages import configure_tracing, shutdown_tracing
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def setup_basic_logging():
-    """Minimal logging setup for MVP"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler()]
-    )
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Async context manager for database initialization"""
     logger.info("Starting application lifecycle")
-    await create_db_tables()
+    if settings.CREATE_TABLES_ON_STARTUP:
+        await create_db_tables()
+    get_name_pool()
+    if settings.ENABLE_RECAPTCHA:
+        await security_service.captcha.start()
+    hot_scores = None
+    if settings.RUN_HOST_JOBS:
+        hot_scores = asyncio.create_task(hot_score_job(
+            AsyncSessionLocal,
+            settings.HOT_SCORE_REFRESH_SECONDS,
+            settings.HOT_SCORE_BATCH_SIZE,
+            listing_versions if settings.HTTP_CACHE_ENABLED else None
+        ))
+    if settings.VOTE_BUFFER_ENABLED:
+        vote_buffer.start()
+    listing_sweep.start(
+        listing_cache if settings.LISTING_CACHE_ENABLED else None,
+        listing_versions if settings.HTTP_CACHE_ENABLED else None,
+        vote_buffer if settings.VOTE_BUFFER_ENABLED else None,
+        settings.DB_READ_YOUR_WRITES_SECONDS if replicas else 0.0
+    )
+    if settings.VOTE_STREAM_ENABLED:
+        vote_stream.start()
+    replica_health = None
+    if replicas:
+        replica_health = asyncio.create_task(replica_health_job(
+            replicas,
+            settings.DB_REPLICA_HEALTH_INTERVAL_SECONDS
+        ))
+    similarity = None
+    if settings.SIMILARITY_ENABLED:
+        similarity_index.load()
+        similarity = asyncio.create_task(similarity_job(
+            similarity_index,
+            AsyncSessionLocal,
+            settings.SIMILARITY_REFRESH_SECONDS,
+            settings.SIMILARITY_SAVE_EVERY,
+            save=settings.RUN_HOST_JOBS
+        ))
     yield
     logger.info("Closing application")
+    # In-flight requests have finished by now; let their side effects land
+    await drain_after_commit_tasks(timeout=settings.GRACEFUL_TIMEOUT)
+    if settings.VOTE_BUFFER_ENABLED:
+        await vote_buffer.stop()
+    await listing_sweep.stop()
+    if settings.VOTE_STREAM_ENABLED:
+        await vote_stream.stop()
+    if hot_scores is not None:
+        hot_scores.cancel()
+    if replica_health is not None:
+        replica_health.cancel()
+    if similarity is not None:
+        similarity.cancel()
+        if settings.RUN_HOST_JOBS:
+            await similarity_index.save_async()
+    await security_service.captcha.close()
+    security_service.shutdown()
+    await engine.dispose()
+    for replica in replicas.engines:
+        await replica.dispose()
+    shutdown_tracing()
 
 
 def create_app() -> FastAPI:
     """Core factory function for MVP"""
-    setup_basic_logging()
-
     configure_logging()
+    configure_tracing()
 
     app = FastAPI(
         title=settings.PROJECT_NAME,
         description=settings.DESCRIPTION,
         version=settings.VERSION,
         lifespan=lifespan,
-        docs_url="/docs",
+        docs_url="/docs" if settings.ENABLE_DOCS else None,
+        openapi_url="/openapi.json" if settings.ENABLE_DOCS else None,
         redoc_url=None
     )
 
+    # Pure ASGI middleware only, innermost first. Cache-Control, ETag and
+    # 304s sit inside CORS so 304s carry its headers too
+    if replicas:
+        app.add_middleware(ReadYourWritesMiddleware, window=settings.DB_READ_YOUR_WRITES_SECONDS)
+    if settings.HTTP_CACHE_ENABLED:
+        app.add_middleware(
+            HTTPCacheMiddleware,
+            policies=settings.HTTP_CACHE_POLICIES,
+            versions=listing_versions
+        )
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
+    if settings.SECURITY_HEADERS_ENABLED:
+        docs = ("/docs", "/docs/oauth2-redirect") if settings.ENABLE_DOCS else ()
+        app.add_middleware(SecurityHeadersMiddleware, csp_exempt=docs)
+
     # CORS Configuration
     app.add_middleware(
         CORSMiddleware,
@@ -52,7 +133,10 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
     )
+    # Outermost, so every log line of a request carries its ID
+    app.add_middleware(RequestIdMiddleware)
 
     # Include essential routes
     app.include_router(health.router)
@@ -61,6 +145,7 @@ def create_app() -> FastAPI:
 
     # Add metrics if enabled
     if settings.ENABLE_PROMETHEUS:
+        from prometheus_fastapi_instrumentator import Instrumentator
         Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 
     return app
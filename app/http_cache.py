@@ -0,0 +1,133 @@
+# app/http_cache.py
+"""
+HTTP caching headers, as a pure ASGI middleware.
+
+Successful ``GET`` responses get the ``Cache-Control`` configured for
+their path in ``HTTP_CACHE_POLICIES`` (exact paths first, then fnmatch
+patterns). ``GET /api/ideas`` is also validated: its ``ETag`` and
+``Last-Modified`` come from ``ListingVersions``, read before the route
+runs, so a matching ``If-None-Match`` (or, without one, a recent enough
+``If-Modified-Since``) is answered with a 304 without routing, opening a
+session or touching the listing cache.
+
+The validator is read before the response is built, never after: a bump
+that lands meanwhile leaves the response with an older ETag, costing the
+client one extra full response rather than ever a stale 304.
+"""
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from fnmatch import fnmatchcase
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app.metrics import HTTP_CACHE_REVALIDATIONS
+from app.services.ideas import SORT_KEYS
+from app.services.listing_versions import ListingVersions
+
+logger = logging.getLogger(__name__)
+
+LISTING_PATH = "/api/ideas"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2) of ``etag`` against an ``If-None-Match`` value"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, modified: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified is sent to the second
+    return int(modified) <= since
+
+
+class HTTPCacheMiddleware:
+    def __init__(self, app, policies: Dict[str, str], versions: Optional[ListingVersions] = None):
+        self.app = app
+        self.versions = versions
+        self._exact = {path: policy.encode() for path, policy in policies.items() if not _is_pattern(path)}
+        self._patterns = [(path, policy.encode()) for path, policy in policies.items() if _is_pattern(path)]
+
+    def policy(self, path: str) -> Optional[bytes]:
+        policy = self._exact.get(path)
+        if policy is None:
+            for pattern, candidate in self._patterns:
+                if fnmatchcase(path, pattern):
+                    return candidate
+        return policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        headers = []
+        policy = self.policy(path)
+        if policy is not None:
+            headers.append((b"cache-control", policy))
+
+        if path == LISTING_PATH and self.versions is not None:
+            validator = await self._validator(scope)
+            if validator is not None:
+                etag, modified = validator
+                headers += [(b"etag", etag.encode()), (b"last-modified", formatdate(modified, usegmt=True).encode())]
+                if self._not_modified(scope, etag, modified):
+                    await send({"type": "http.response.start", "status": 304, "headers": headers})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+        if not headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cache_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                existing = {name.lower() for name, _ in message.get("headers", ())}
+                extra = [(name, value) for name, value in headers if name not in existing]
+                message = {**message, "headers": [*message.get("headers", ()), *extra]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
+
+    async def _validator(self, scope) -> Optional[Tuple[str, float]]:
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        category = query.get("category", [None])[0] or None
+        sort = query.get("sort", ["recent"])[0]
+        if sort not in SORT_KEYS:
+            # Left for the route to reject
+            return None
+        try:
+            return await self.versions.current(category, sort)
+        except Exception:
+            # Serve the listing unvalidated rather than fail it
+            logger.exception("Listing version read failed")
+            return None
+
+    @staticmethod
+    def _not_modified(scope, etag: str, modified: float) -> bool:
+        if_none_match = if_modified_since = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+            elif name == b"if-modified-since":
+                if_modified_since = value.decode("latin-1")
+
+        if if_none_match is not None:
+            # If-None-Match takes precedence; If-Modified-Since is then ignored
+            matched = etag_matches(if_none_match, etag)
+        elif if_modified_since is not None:
+            matched = not_modified_since(if_modified_since, modified)
+        else:
+            return False
+        HTTP_CACHE_REVALIDATIONS.labels("not_modified" if matched else "modified").inc()
+        return matched
+
+
+def _is_pattern(path: str) -> bool:
+    return any(char in path for char in "*?[")
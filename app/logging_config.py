@@ -1,45 +1,234 @@
 # app/logging_config.py
+"""
+Logging setup.
+
+No handler runs on the event loop: every logger feeds one ``QueueHandler``
+and a ``QueueListener`` thread formats the records and writes them to
+stderr and to a size-rotated error file. The queue is bounded; if the
+writer falls behind, records are dropped and counted
+(``ideahub_log_records_dropped_total``) rather than stalling requests.
+
+Records are JSON lines (``LOG_FORMAT=json``) carrying the ID that
+``RequestIdMiddleware`` takes from ``X-Request-ID`` or generates, and
+echoes back on the response. Log with ``%``-style arguments so messages
+that are filtered out are never rendered, and wrap large payloads in
+``Truncated``.
+"""
+import atexit
+import copy
+import json
 import logging
-import logging.config
+import os
+import queue
+import random
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
 
+from app.config import settings
 
-def configure_logging():
-    logging_config = {
-        'version': 1,
-        'disable_existing_loggers': False,
-        'formatters': {
-            'standard': {
-                'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            },
-        },
-        'handlers': {
-            'default': {
-                'level': 'INFO',
-                'formatter': 'standard',
-                'class': 'logging.StreamHandler',
-            },
-            'file': {
-                'level': 'ERROR',
-                'formatter': 'standard',
-                'class': 'logging.FileHandler',
-                'filename': 'app_errors.log',
-            }
-        },
-        'loggers': {
-            '': {  # root logger
-                'handlers': ['default', 'file'],
-                'level': 'INFO',
-                'propagate': True
-            },
-            'app': {
-                'handlers': ['default', 'file'],
-                'level': 'INFO',
-                'propagate': False
-            }
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed with ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+# Client supplied request IDs end up in log lines, so only accept plain tokens
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+_listener: Optional[QueueListener] = None
+
+
+def _dumps(entry: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(entry, default=str).decode()
+    return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra=`` fields become keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
         }
-    }
-    logging.config.dictConfig(logging_config)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return _dumps(entry)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request ID (runs in the logging caller's context)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Resolves the message in the calling thread and leaves formatting and
+    I/O to the listener. Never blocks: a full queue drops the record.
+    """
+
+    _tracebacks = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks pin frames; hand the listener the rendered text instead
+            record.exc_text = self._tracebacks.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            from app.metrics import LOG_RECORDS_DROPPED
+            LOG_RECORDS_DROPPED.inc()
+
+
+class Truncated:
+    """Logging argument that renders ``str(value)`` cut to ``limit`` characters, only if emitted"""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: Optional[int] = None):
+        self.value = value
+        self.limit = settings.LOG_PAYLOAD_MAX_CHARS if limit is None else limit
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... ({len(text)} chars)"
+
+
+def sample_payload(rate: Optional[float] = None) -> bool:
+    """Whether this request's payload should be logged (``LOG_PAYLOAD_SAMPLE_RATE``)"""
+    rate = settings.LOG_PAYLOAD_SAMPLE_RATE if rate is None else rate
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class RequestIdMiddleware:
+    """Binds a request ID for the duration of each HTTP request and returns it as ``X-Request-ID``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode())
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), header]}
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
+def _handlers() -> List[logging.Handler]:
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+    console = logging.StreamHandler()
+    console.setLevel(settings.LOG_LEVEL)
+    console.setFormatter(formatter)
+    handlers = [console]
+
+    if settings.LOG_FILE:
+        # "{pid}" gives each worker its own file; rotation is per process
+        file = RotatingFileHandler(
+            settings.LOG_FILE.format(pid=os.getpid()),
+            maxBytes=settings.LOG_FILE_MAX_BYTES,
+            backupCount=settings.LOG_FILE_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True,
+        )
+        file.setLevel(settings.LOG_FILE_LEVEL)
+        file.setFormatter(formatter)
+        handlers.append(file)
+    return handlers
+
+
+def configure_logging():
+    """Route all loggers through the queue and start its writer thread (safe to call again)"""
+    global _listener
+    stop_logging()
+
+    log_queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    app_logger = logging.getLogger("app")
+    app_logger.handlers.clear()
+    app_logger.setLevel(settings.LOG_LEVEL)
+    app_logger.propagate = True
+
+    _listener = QueueListener(log_queue, *_handlers(), respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork() and the queue's lock may
+    # have been held mid-put; give the child a fresh pipeline
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
 
 
-# Call this in your app startup
-configure_logging()
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
@@ -1,11 +1,7 @@
 # main.py
-from app import app
+import sys
+
+from app.server import main
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "app:app",
-        host="localhost",
-        port=8000,
-        log_level="info"
-    )
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# app/metrics.py
+"""
+Application-level Prometheus metrics.
+
+Everything is registered on the default registry so it is served by the
+``/metrics`` endpoint exposed by the instrumentator in ``factory.py``. Under
+the multi-worker server the values live in ``PROMETHEUS_MULTIPROC_DIR`` and
+are aggregated across workers; gauges declare how to combine them.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+VOTER_IDENTITY_CACHE_HITS = Counter(
+    "ideahub_voter_identity_cache_hits_total",
+    "Voter identity lookups served from the in-process cache",
+)
+VOTER_IDENTITY_CACHE_MISSES = Counter(
+    "ideahub_voter_identity_cache_misses_total",
+    "Voter identity lookups that required a fresh derivation",
+)
+VOTER_IDENTITY_DERIVATION_SECONDS = Histogram(
+    "ideahub_voter_identity_derivation_seconds",
+    "Time spent deriving a voter identity hash",
+    ["mode"],
+    buckets=(0.00001, 0.0001, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+VOTE_BUFFER_PENDING = Gauge(
+    "ideahub_vote_buffer_pending_votes",
+    "Votes whose counter deltas are waiting in the write-behind buffer",
+    multiprocess_mode="livesum",
+)
+VOTE_BUFFER_BATCH_SIZE = Histogram(
+    "ideahub_vote_buffer_flush_votes",
+    "Votes folded into a single write-behind flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+VOTE_BUFFER_FLUSH_LAG_SECONDS = Histogram(
+    "ideahub_vote_buffer_flush_lag_seconds",
+    "Age of the oldest buffered vote when its flush committed",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+VOTE_BUFFER_RETRIES = Counter(
+    "ideahub_vote_buffer_retries_total",
+    "Buffered idea deltas re-queued after a failed flush",
+)
+VOTE_BUFFER_DROPPED = Counter(
+    "ideahub_vote_buffer_dropped_total",
+    "Buffered idea deltas given up on after exhausting flush retries (the idea is recounted from its votes)",
+)
+
+LISTING_CACHE_HITS = Counter(
+    "ideahub_listing_cache_hits_total",
+    "Idea listing requests served from the listing cache",
+)
+LISTING_CACHE_MISSES = Counter(
+    "ideahub_listing_cache_misses_total",
+    "Idea listing requests that had to query the database",
+)
+LISTING_CACHE_ENTRIES = Gauge(
+    "ideahub_listing_cache_entries",
+    "Pages held by the in-process listing cache",
+    multiprocess_mode="livesum",
+)
+
+VOTE_STREAM_CONNECTIONS = Gauge(
+    "ideahub_vote_stream_connections",
+    "Open live vote count streams",
+    multiprocess_mode="livesum",
+)
+VOTE_STREAM_EVENTS = Counter(
+    "ideahub_vote_stream_events_total",
+    "Coalesced vote count events sent to stream clients",
+)
+VOTE_STREAM_RESETS = Counter(
+    "ideahub_vote_stream_resets_total",
+    "Stream clients told to refetch after falling max_pending ideas behind",
+)
+
+COMPRESSED_RESPONSES = Counter(
+    "ideahub_compressed_responses_total",
+    "Compressed responses, by encoding and whether the compressed body came from the listing cache",
+    ["encoding", "precompressed"],  # yes | no
+)
+
+HTTP_CACHE_REVALIDATIONS = Counter(
+    "ideahub_http_cache_revalidations_total",
+    "Conditional listing requests, by whether they were answered with a 304",
+    ["result"],  # not_modified | modified
+)
+
+CAPTCHA_VERIFICATIONS = Counter(
+    "ideahub_captcha_verifications_total",
+    "reCAPTCHA verifications by outcome",
+    ["outcome"],
+)
+CAPTCHA_UPSTREAM_SECONDS = Histogram(
+    "ideahub_captcha_upstream_seconds",
+    "Round trip to the reCAPTCHA verification endpoint",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+CAPTCHA_CIRCUIT_OPEN = Gauge(
+    "ideahub_captcha_circuit_open",
+    "1 while the reCAPTCHA circuit breaker is refusing upstream calls",
+    multiprocess_mode="livemax",
+)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "ideahub_rate_limit_decisions_total",
+    "Rate limit checks by limit and outcome",
+    ["limit", "outcome"],
+)
+RATE_LIMIT_DECISION_SECONDS = Histogram(
+    "ideahub_rate_limit_decision_seconds",
+    "Time taken by the rate limit storage to reach a decision",
+    ["backend"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "ideahub_log_records_dropped_total",
+    "Log records discarded because the logging queue was full",
+)
+
+STAGE_SECONDS = Histogram(
+    "ideahub_stage_seconds",
+    "Time spent in one stage of a request (voter hashing, rate limiting, queries, commit)",
+    ["component", "stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "ideahub_db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "ideahub_db_pool_overflow",
+    "Connections open beyond the pool size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "ideahub_db_pool_wait_seconds",
+    "Time taken to check a connection out of the pool",
+    ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_SLOW_QUERIES = Counter(
+    "ideahub_db_slow_queries_total",
+    "Statements slower than SLOW_QUERY_SECONDS",
+    ["engine"],
+)
+DB_REPLICA_HEALTHY = Gauge(
+    "ideahub_db_replica_healthy",
+    "Whether a read replica is in rotation (1) or failed over from (0)",
+    ["engine"],
+    multiprocess_mode="livemin",
+)
+DB_READ_SESSIONS = Counter(
+    "ideahub_db_read_sessions_total",
+    "Read sessions by the engine serving them: a replica, or the primary when reads are pinned or failed over",
+    ["engine", "reason"],
+)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Boolean, Integer, Enum, ForeignKey, Index, CheckConstraint, func, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Boolean, Integer, Double, Enum, ForeignKey, Index, CheckConstraint, func, DateTime
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import expression
 from uuid import uuid4
 from datetime import datetime
@@ -16,7 +16,9 @@ class Idea(Base):
     title = Column(String(200), nullable=False, index=True)
     slug = Column(String(220), unique=True, nullable=False)
     summary = Column(String(500), nullable=False)
-    details = Column(String(10000), nullable=False)  # Use String instead of TEXT for MySQL
+    # Use String instead of TEXT for MySQL. Only the detail view needs the
+    # body, so it is left out of entity loads unless explicitly undeferred
+    details = deferred(Column(String(10000), nullable=False))
     category = Column(Enum('industry', 'technology', 'problem_area'), nullable=False)
     is_new = Column(Boolean, nullable=False)
     status = Column(Enum('pending', 'approved', 'rejected'),
@@ -24,14 +26,37 @@ class Idea(Base):
     submitted_by = Column(String(100), nullable=False)
     upvotes = Column(Integer, default=0, nullable=False)
     downvotes = Column(Integer, default=0, nullable=False)
+    # Ranking scores, maintained alongside the counters (see services/ranking.py)
+    net_score = Column(Integer, default=0, nullable=False)
+    wilson_score = Column(Double, default=0.0, nullable=False)
+    controversy = Column(Double, default=0.0, nullable=False)
+    hot_score = Column(Double, default=0.0, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
-    votes = relationship("Vote", back_populates="idea", cascade="all, delete-orphan")
+    # Never loaded implicitly: votes are only touched through set-based SQL,
+    # and the database cascades deletes
+    votes = relationship(
+        "Vote", back_populates="idea", cascade="all, delete-orphan",
+        lazy="raise", passive_deletes=True
+    )
 
     __table_args__ = (
         CheckConstraint('char_length(title) >= 10', name='title_min_length'),
         CheckConstraint('char_length(summary) BETWEEN 50 AND 500', name='summary_length'),
+        # Keyset pagination: one (status[, category], sort key, id) index per sort mode
+        Index('ix_ideas_status_created', 'status', 'created_at', 'id'),
+        Index('ix_ideas_status_category_created', 'status', 'category', 'created_at', 'id'),
+        Index('ix_ideas_status_net_score', 'status', 'net_score', 'id'),
+        Index('ix_ideas_status_category_net_score', 'status', 'category', 'net_score', 'id'),
+        Index('ix_ideas_status_wilson', 'status', 'wilson_score', 'id'),
+        Index('ix_ideas_status_category_wilson', 'status', 'category', 'wilson_score', 'id'),
+        Index('ix_ideas_status_controversy', 'status', 'controversy', 'id'),
+        Index('ix_ideas_status_category_controversy', 'status', 'category', 'controversy', 'id'),
+        Index('ix_ideas_status_hot', 'status', 'hot_score', 'id'),
+        Index('ix_ideas_status_category_hot', 'status', 'category', 'hot_score', 'id'),
+        # Search (services/search.py); other dialects use an in-memory index
+        Index('ft_ideas_search', 'title', 'summary', 'details', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
     )
 
     def __init__(self, **kwargs):
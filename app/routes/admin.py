@@ -1,21 +1,76 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, status
 from uuid import UUID
-from app.models.idea import Idea
+from typing import List, Optional
+
 from app.services.ideas import IdeaService
 from app.dependencies import get_idea_service
+from app.schemas.idea import IdeaResponse, ModerationRequest, ModerationResult, dump_ideas, rows_to_dicts
+from app.utils.responses import PreSerializedJSONResponse
 
 router = APIRouter(tags=["Admin"])
 
 
+@router.get("/ideas/pending", response_model=List[IdeaResponse])
+async def get_pending_ideas(
+        category: Optional[str] = None,
+        per_page: int = 50,
+        cursor: Optional[str] = None,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """
+    Moderation queue, oldest first. Pass the ``X-Next-Cursor`` response
+    header back as ``cursor`` for the next page.
+    """
+    per_page = max(1, min(per_page, 200))
+    ideas = await service.get_pending_ideas(category=category, per_page=per_page, cursor=cursor)
+    next_cursor = service.next_pending_cursor(ideas, per_page)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return PreSerializedJSONResponse(content=dump_ideas(rows_to_dicts(ideas)), headers=headers)
+
+
+async def _moderate(request: ModerationRequest, new_status: str, service: IdeaService) -> dict:
+    if (request.idea_ids is None) == (request.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Pass either idea_ids or filter"
+        )
+    if request.idea_ids is not None:
+        counts = await service.moderate_ideas(request.idea_ids, new_status)
+    else:
+        counts = await service.moderate_matching(
+            new_status,
+            current_status=request.filter.status,
+            category=request.filter.category,
+            submitted_before=request.filter.submitted_before,
+            limit=request.limit
+        )
+    return {"status": new_status, **counts}
+
+
+@router.post("/ideas/approve", response_model=ModerationResult)
+async def approve_ideas(
+        request: ModerationRequest,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """Approve a list of ideas, or every idea matching a filter"""
+    return await _moderate(request, 'approved', service)
+
+
+@router.post("/ideas/reject", response_model=ModerationResult)
+async def reject_ideas(
+        request: ModerationRequest,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """Reject a list of ideas, or every idea matching a filter"""
+    return await _moderate(request, 'rejected', service)
+
+
 @router.post("/approve/{idea_id}")
 async def approve_idea(
         idea_id: UUID,
         service: IdeaService = Depends(get_idea_service)
 ):
-    idea = service.get_idea(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    service.approve_idea(idea_id)
+    await service.update_idea_status(idea_id, 'approved')
     return {"message": "Idea approved successfully"}
 
 
@@ -24,8 +79,5 @@ async def reject_idea(
         idea_id: UUID,
         service: IdeaService = Depends(get_idea_service)
 ):
-    idea = service.get_idea(idea_id)
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    service.reject_idea(idea_id)
+    await service.update_idea_status(idea_id, 'rejected')
     return {"message": "Idea rejected successfully"}
@@ -1,6 +1,7 @@
 # app/routes/core.py
-from fastapi import APIRouter, Request, Depends, status, HTTPException
+from fastapi import APIRouter, Request, Depends, Query, status, HTTPException
 from fastapi.responses import JSONResponse
+from urllib.parse import parse_qs
 from uuid import UUID
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict, ValidationError
@@ -12,21 +13,42 @@ from app.dependencies import (
     SubmissionLimitDep,
     VotingLimitDep,
     SanitizedTextDep,
-    get_idea_service
+    ListingCacheDep,
+    VoteBatchDep,
+    get_idea_service,
+    get_vote_stream
 )
+from app.compression import compressor, negotiated_encoding
+from app.db.replicas import reads_pinned
 from app.services.ideas import IdeaService
-from app.schemas.idea import IdeaCreate, IdeaResponse, VoteRequest
+from app.schemas.idea import (
+    IdeaCreate,
+    IdeaDetailResponse,
+    IdeaResponse,
+    IdeaSearchResponse,
+    IdeaSimilarResponse,
+    VoteBatchResponse,
+    VoteRequest,
+    dump_ideas,
+    rows_to_dicts
+)
+from app.services.listing_cache import ListingCache
 from app.config import settings
+from app.logging_config import Truncated, sample_payload
+from app.models.idea import Idea
 from app.utils.names import generate_animal_name
+from app.utils.responses import PreSerializedJSONResponse
 
+import asyncio
 import os
-import traceback
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Ideas"])
 
+STREAM_CATEGORIES = frozenset(Idea.category.type.enums)
+
 
 # Modify the decorator to handle migrations
 def submission_rate_limit_decorator(func):
@@ -50,23 +72,42 @@ def voting_rate_limit_decorator(func):
     return voting_limiter.limit(settings.VOTING_RATE_LIMIT)(func)
 
 
+def batch_voting_rate_limit_decorator(func):
+    if os.environ.get('RUNNING_MIGRATION'):
+        return func
+
+    # Charged per distinct idea in the batch, which get_vote_batch counts
+    from app.dependencies import voting_limiter
+    return voting_limiter.limit(
+        settings.VOTING_BATCH_RATE_LIMIT,
+        cost=lambda request: request.state.vote_batch_cost
+    )(func)
+
+
+def log_http_exception(e: HTTPException):
+    # Client errors are routine (unknown idea, bad input); only 5xx is an error
+    level = logging.ERROR if e.status_code >= 500 else logging.INFO
+    logger.log(level, "HTTP Exception %d: %s", e.status_code, e.detail)
+
+
 @router.post(
     "/ideas",
     response_model=IdeaResponse,
-    status_code=status.HTTP_201_CREATED,
-    # dependencies=[Depends(CaptchaDep)]
+    status_code=status.HTTP_201_CREATED
 )
 @submission_rate_limit_decorator
 async def submit_idea(
         request: Request,
         idea_data: IdeaCreate,
         voter_hash: VoterHashDep,
+        captcha: CaptchaDep,
         service: IdeaService = Depends(get_idea_service)
 ):
-    """Submit a new idea (CAPTCHA protected)"""
+    """Submit a new idea (CAPTCHA protected when ``ENABLE_RECAPTCHA`` is set)"""
     try:
-        # Log the received data for debugging
-        logger.info(f"Received idea data: {idea_data}")
+        # Payloads run to 10 KB: log a truncated sample, not every one
+        if sample_payload():
+            logger.info("Received idea data: %s", Truncated(idea_data))
 
         # Convert to dictionary, ensuring string values
         idea_dict = {
@@ -77,14 +118,14 @@ async def submit_idea(
             'is_new': idea_data.is_new
         }
 
-        idea = service.submit_idea(
+        idea = await service.submit_idea(
             idea_dict,
             submitted_by=generate_animal_name()
         )
         return idea
     except ValidationError as ve:
         # Log the validation error details
-        logger.error(f"Validation Error: {ve}")
+        logger.error("Validation Error: %s", ve)
         return JSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             content={
@@ -93,13 +134,12 @@ async def submit_idea(
             }
         )
     except HTTPException as e:
-        # Log the HTTP exception
-        logger.error(f"HTTP Exception: {e.detail}")
+        log_http_exception(e)
         raise e
     except Exception as e:
         # Log the full traceback for server-side errors
-        logger.error(f"Unexpected error: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Unexpected error: %s", e)
+        await service.rollback()
 
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -125,7 +165,7 @@ async def vote_idea(
     # Rate limiting is now handled by the decorator
 
     try:
-        upvotes, downvotes = service.handle_vote(
+        upvotes, downvotes = await service.handle_vote(
             idea_id,
             voter_hash,
             vote_data.vote_type
@@ -136,13 +176,49 @@ async def vote_idea(
             "downvotes": downvotes
         }
     except HTTPException as e:
-        # Log the HTTP exception
-        logger.error(f"HTTP Exception: {e.detail}")
+        log_http_exception(e)
         raise e
     except Exception as e:
         # Log the full traceback for server-side errors
-        logger.error(f"Unexpected error: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Unexpected error: %s", e)
+        # get_db commits on a normal return, so undo any half-applied vote
+        await service.rollback()
+
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"detail": "Voting failed"}
+        )
+
+
+@router.post(
+    "/ideas/votes",
+    response_model=VoteBatchResponse
+)
+@batch_voting_rate_limit_decorator
+async def vote_ideas(
+        request: Request,
+        batch: VoteBatchDep,
+        voter_hash: VoterHashDep,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """
+    Vote on several approved ideas at once, in one transaction.
+
+    Each item behaves like ``POST /ideas/{idea_id}/vote``; unknown ideas
+    are reported per item. An invalid vote type rejects the whole batch.
+    """
+    try:
+        results = await service.handle_votes(
+            voter_hash,
+            [(item.idea_id, item.vote_type) for item in batch.votes]
+        )
+        return {"results": results}
+    except HTTPException as e:
+        log_http_exception(e)
+        raise e
+    except Exception as e:
+        logger.exception("Unexpected error: %s", e)
+        await service.rollback()
 
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -152,23 +228,51 @@ async def vote_idea(
 
 @router.get("/ideas", response_model=List[IdeaResponse])
 async def get_ideas(
+        request: Request,
+        cache: ListingCacheDep,
         category: Optional[str] = None,
         sort: str = "recent",
-        page: int = 1,
-        per_page: int = 20,
+        page: int = Query(1, ge=1),
+        per_page: int = Query(20, ge=1, le=settings.LISTING_MAX_PER_PAGE),
+        cursor: Optional[str] = None,
         service: IdeaService = Depends(get_idea_service)
 ):
-    """Get approved ideas with sorting and filtering"""
+    """
+    Get approved ideas with sorting and filtering.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the following page in constant time.
+    """
     try:
-        ideas = service.get_approved_ideas(
-            category=category,
-            sort=sort,
-            page=page,
-            per_page=per_page
-        )
-        return ideas
+        cache_key = ListingCache.key(category, sort, page, per_page, cursor)
+        # A client that just wrote may not see it in a page refilled from a replica
+        cached = await cache.get(cache_key) if cache is not None and not reads_pinned() else None
+        if cached is not None:
+            body, next_cursor = cached
+        else:
+            ideas = await service.get_approved_ideas(
+                category=category,
+                sort=sort,
+                page=page,
+                per_page=per_page,
+                cursor=cursor
+            )
+            next_cursor = service.next_cursor(ideas, sort, per_page)
+            body = dump_ideas(rows_to_dicts(ideas))
+            if cache is not None:
+                await cache.put(cache_key, category, [idea.id for idea in ideas], body, next_cursor)
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        encoding = negotiated_encoding(request.scope)
+        if cache is not None and encoding is not None and len(body) >= compressor.minimum_size:
+            # Hot pages are compressed once per version, not per request
+            body = await cache.compressed(cache_key, body, encoding, compressor.compress)
+            headers.update({"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+        return PreSerializedJSONResponse(content=body, headers=headers or None)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching ideas: {str(e)}")
+        logger.error("Error fetching ideas: %s", e)
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
@@ -176,3 +280,143 @@ async def get_ideas(
                 "error_message": str(e)
             }
         )
+
+
+# Declared before /ideas/{idea_id}, which would otherwise capture "search"
+@router.get("/ideas/search", response_model=List[IdeaSearchResponse])
+async def search_ideas(
+        q: str = Query(min_length=1, max_length=200),
+        category: Optional[str] = None,
+        per_page: int = 20,
+        cursor: Optional[str] = None,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """
+    Full-text search over approved ideas' title, summary and details, most
+    relevant first. Pass the ``X-Next-Cursor`` response header back as
+    ``cursor`` to fetch the following page.
+    """
+    per_page = max(1, min(per_page, settings.SEARCH_MAX_PER_PAGE))
+    ideas, next_cursor = await service.search_ideas(q, category=category, per_page=per_page, cursor=cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return PreSerializedJSONResponse(content=dump_ideas(ideas), headers=headers)
+
+
+class VoteCountStream:
+    """
+    ``GET /api/ideas/stream``: server-sent events carrying live vote counts
+    for the ideas in ``ids`` and/or every idea in ``category`` (both
+    repeatable). ``counts`` events hold a JSON array of ``{id, upvotes,
+    downvotes}`` with at most one entry per idea per
+    ``VOTE_STREAM_INTERVAL_MS``; a ``reset`` event means updates were
+    dropped and the client should refetch.
+
+    Bare ASGI rather than a FastAPI route: a parked stream then holds one
+    coroutine and a disconnect watcher instead of a request, dependency
+    scope and response task group, which is most of the memory of ten
+    thousand idle connections. It takes no database session.
+    """
+
+    async def __call__(self, scope, receive, send):
+        stream = get_vote_stream()
+        try:
+            subscription = self._subscribe(stream, scope)
+        except HTTPException as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            await response(scope, receive, send)
+            return
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        watcher.add_done_callback(lambda _: subscription.close())
+        events = stream.events(subscription)
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_200_OK,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+            async for chunk in events:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except OSError:
+            # Client went away mid-write
+            pass
+        finally:
+            watcher.cancel()
+            await events.aclose()
+            stream.unsubscribe(subscription)
+
+    @staticmethod
+    def _subscribe(stream, scope):
+        # Kept out of __call__ so the parsed query is not held for the life of the stream
+        if stream is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Live vote counts are disabled")
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        # Known categories only, so subscribe() (which deduplicates) keeps at most one of each
+        categories = query.get("category", [])
+        if not STREAM_CATEGORIES.issuperset(categories):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unknown category")
+        try:
+            idea_ids = [str(UUID(value)) for value in query.get("ids", [])]
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid idea id")
+        if not idea_ids and not categories:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Subscribe to at least one idea id or category"
+            )
+        if len(idea_ids) > settings.VOTE_STREAM_MAX_IDEAS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"At most {settings.VOTE_STREAM_MAX_IDEAS} idea ids per stream"
+            )
+        subscription = stream.subscribe(idea_ids, categories)
+        if subscription is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many live streams, try again later",
+                headers={"Retry-After": "30"}
+            )
+        return subscription
+
+
+# Declared before /ideas/{idea_id}, which would otherwise capture "stream"
+router.add_route("/ideas/stream", VoteCountStream(), methods=["GET"], include_in_schema=False)
+
+
+@router.get("/ideas/{idea_id}", response_model=IdeaDetailResponse)
+async def get_idea(
+        idea_id: UUID,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """Get a single approved idea, including its full details"""
+    idea = await service.get_idea(idea_id)
+    if idea is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Idea not found or not approved"
+        )
+    return idea
+
+
+@router.get("/ideas/{idea_id}/similar", response_model=List[IdeaSimilarResponse])
+async def get_similar_ideas(
+        idea_id: UUID,
+        service: IdeaService = Depends(get_idea_service)
+):
+    """Approved ideas worded much like this one, most similar first"""
+    ideas = await service.get_similar_ideas(idea_id, limit=settings.SIMILAR_IDEAS_LIMIT)
+    if ideas is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Idea not found or not approved"
+        )
+    return PreSerializedJSONResponse(content=dump_ideas(ideas))
@@ -1,40 +1,51 @@
 # app/routes/health.py
+import logging
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db, replicas
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["System Health"])
 
 
 @router.get("/health", summary="System Health Check")
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check(
+        db: AsyncSession = Depends(get_db),
+        read_db: Optional[AsyncSession] = Depends(get_read_db)
+):
     """
     Comprehensive health check endpoint verifying:
-    - Database connectivity
+    - Database connectivity (through a replica when one is healthy)
     - Core service availability
     """
     try:
         # Check database connection
-        await db.execute(text("SELECT 1"))
+        await (read_db or db).execute(text("SELECT 1"))
 
+        services = {
+            "database": "operational",
+            "api": "operational"
+        }
+        if replicas:
+            services["replicas"] = "operational" if replicas.available() else "failed over"
         return JSONResponse(
             status_code=200,
             content={
                 "status": "healthy",
-                "services": {
-                    "database": "operational",
-                    "api": "operational"
-                },
+                "services": services,
                 "version": settings.VERSION,
                 "environment": settings.ENVIRONMENT
             }
         )
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+        logger.error("Health check failed: %s", e)
         raise HTTPException(
             status_code=503,
             detail={
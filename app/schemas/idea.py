@@ -1,9 +1,17 @@
 # app/schemas/idea.py
+import json
 from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Union, Dict, Any
+from typing import Union, Dict, Any, Iterable, List, Literal, Optional, Sequence
 from uuid import UUID
 from datetime import datetime
 
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; stdlib json renders the same bytes
+    orjson = None
+
 
 class IdeaCreate(BaseModel):
     title: Union[str, Dict[str, Any]]
@@ -46,10 +54,110 @@ class IdeaResponse(BaseModel):
     submitted_by: str
     upvotes: int
     downvotes: int
-    created_at: str
+    created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class IdeaDetailResponse(IdeaResponse):
+    details: str
+
+
+class IdeaSearchResponse(IdeaResponse):
+    relevance: float
+
+
+class IdeaSimilarResponse(IdeaResponse):
+    similarity: float
+
+
+IDEA_RESPONSE_FIELDS = tuple(IdeaResponse.model_fields)
+
+
+def rows_to_dicts(rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    ``IdeaResponse``-shaped dicts from rows whose leading columns are
+    ``IDEA_RESPONSE_FIELDS`` in order (trailing columns are ignored)
+    """
+    return [dict(zip(IDEA_RESPONSE_FIELDS, row)) for row in rows]
+
+
+def dump_ideas(ideas: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    JSON array of ``IdeaResponse``-shaped dicts, byte-for-byte what
+    FastAPI's ``JSONResponse`` would render for ``List[IdeaResponse]``
+    """
+    if orjson is not None:
+        return orjson.dumps(list(ideas))
+    return json.dumps(
+        list(ideas), default=_json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def load_ideas(body: bytes) -> List[Dict[str, Any]]:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 class VoteRequest(BaseModel):
     vote_type: str
+
+
+class VoteBatchItem(BaseModel):
+    idea_id: UUID
+    vote_type: str
+
+
+class VoteBatchRequest(BaseModel):
+    votes: List[VoteBatchItem] = Field(min_length=1, max_length=settings.VOTE_BATCH_MAX_ITEMS)
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "votes": [
+                    {"idea_id": "5f0c6a9e-8d7b-4a55-9a8e-2f1d3c4b5a69", "vote_type": "upvote"},
+                    {"idea_id": "0b7e4d2c-1a3f-4e6b-8c9d-7a5b3c1e2f40", "vote_type": "downvote"}
+                ]
+            }
+        }
+    )
+
+
+class VoteBatchResult(BaseModel):
+    idea_id: UUID
+    vote_type: str
+    # recorded, switched, unchanged, superseded or not_found
+    status: str
+    upvotes: Optional[int] = None
+    downvotes: Optional[int] = None
+
+
+class VoteBatchResponse(BaseModel):
+    results: List[VoteBatchResult]
+
+
+class ModerationFilter(BaseModel):
+    status: Literal['pending', 'approved', 'rejected'] = 'pending'
+    category: Optional[str] = None
+    submitted_before: Optional[datetime] = None
+
+
+class ModerationRequest(BaseModel):
+    """Either explicit ``idea_ids`` or a ``filter`` (pending ideas by default)"""
+    idea_ids: Optional[List[UUID]] = Field(default=None, min_length=1, max_length=settings.MODERATION_MAX_IDS)
+    filter: Optional[ModerationFilter] = None
+    # Filter only; defaults to MODERATION_FILTER_LIMIT
+    limit: Optional[int] = Field(default=None, ge=1, le=settings.MODERATION_FILTER_LIMIT)
+
+
+class ModerationResult(BaseModel):
+    status: str
+    updated: int
+    unchanged: int = 0
+    not_found: int = 0
+    has_more: bool = False
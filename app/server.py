@@ -0,0 +1,271 @@
+# app/server.py
+"""
+Production entry point.
+
+    python -m app.server [--workers N] [--host 0.0.0.0] [--port 8000]
+    python -m app.server --profile-startup [--startup-budget 2.0]
+
+The app is imported once in the supervisor and the workers are forked
+from it, so they share its memory pages and start instantly. Each worker
+binds its own ``SO_REUSEPORT`` socket and the kernel spreads connections
+across them (platforms without it share one inherited socket instead).
+uvloop and httptools are used when installed.
+
+With more than one worker, Prometheus metrics go to files under
+``PROMETHEUS_DIR`` so ``/metrics`` reports all workers together.
+
+SIGTERM/SIGINT drain: workers stop accepting, finish in-flight requests,
+then run the app's shutdown (after-commit hooks, vote buffer flush).
+Workers still alive after ``GRACEFUL_TIMEOUT`` are killed. Workers that
+die on their own are replaced.
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# A worker dying sooner than this after its start is respawned with a delay
+MIN_WORKER_UPTIME = 5.0
+
+
+def event_loop_choice() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol_choice() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_prometheus_dir(path: str):
+    """
+    Point prometheus_client at a clean multiprocess directory.
+
+    Must run before anything imports prometheus_client, which picks its
+    value storage at import time.
+    """
+    if "prometheus_client" in sys.modules:
+        raise RuntimeError("prometheus_client was imported before multiprocess mode was configured")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+async def create_tables_once():
+    from app.db.session import engine, init_db
+    await init_db()
+    # Close the connection so no socket is inherited by the workers
+    await engine.dispose()
+
+
+class Supervisor:
+    def __init__(self, app, workers: int, host: str, port: int, graceful_timeout: int):
+        self.app = app
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.graceful_timeout = graceful_timeout
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT")
+        # Without SO_REUSEPORT every worker accepts on the socket bound here
+        self.shared_socket: Optional[socket.socket] = None
+        # pid -> (started, worker index)
+        self.children: Dict[int, Tuple[float, int]] = {}
+        self.stopping = False
+
+    def uvicorn_config(self) -> uvicorn.Config:
+        return uvicorn.Config(
+            self.app,
+            loop=event_loop_choice(),
+            http=http_protocol_choice(),
+            lifespan="on",
+            timeout_graceful_shutdown=self.graceful_timeout,
+            proxy_headers=True,
+            log_config=None,
+        )
+
+    def _run_worker(self, index: int):
+        # uvicorn installs its own handlers; drop the supervisor's
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+            signal.signal(signum, signal.SIG_DFL)
+        # The per-host jobs run in worker 0 (and its replacements) only
+        settings.RUN_HOST_JOBS = settings.RUN_HOST_JOBS and index == 0
+
+        # Connections must never be shared with the parent or other workers
+        from app.db.session import engine, replicas
+        engine.sync_engine.dispose(close=False)
+        for replica in replicas.engines:
+            replica.sync_engine.dispose(close=False)
+
+        sock = self.shared_socket or bind_socket(self.host, self.port, reuse_port=True)
+        uvicorn.Server(self.uvicorn_config()).run(sockets=[sock])
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker(index)
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                # os._exit skips atexit, so flush queued log records here
+                from app.logging_config import stop_logging
+                stop_logging()
+                os._exit(code)
+        self.children[pid] = (time.monotonic(), index)
+        logger.info("Started worker %d (#%d)", pid, index)
+
+    def _terminate(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Received %s, draining %d workers", signal.Signals(signum).name, len(self.children))
+        for pid in self.children:
+            self._signal(pid, signal.SIGTERM)
+        # Hard deadline for the drain, on top of uvicorn's own graceful timeout
+        signal.alarm(self.graceful_timeout + 5)
+
+    def _kill_stragglers(self, signum, frame):
+        for pid in self.children:
+            logger.warning("Worker %d did not drain in time, killing it", pid)
+            self._signal(pid, signal.SIGKILL)
+
+    @staticmethod
+    def _signal(pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self, pid: int, status: int):
+        if pid not in self.children:
+            return
+        started, index = self.children.pop(pid)
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid)
+        if self.stopping:
+            return
+        logger.error("Worker %d exited with status %d, replacing it", pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            # Avoid a hot fork loop when workers fail at startup
+            time.sleep(1)
+        self.spawn(index)
+
+    def run(self) -> int:
+        if not self.reuse_port:
+            self.shared_socket = bind_socket(self.host, self.port, reuse_port=False)
+        signal.signal(signal.SIGTERM, self._terminate)
+        signal.signal(signal.SIGINT, self._terminate)
+        signal.signal(signal.SIGALRM, self._kill_stragglers)
+
+        logger.info(
+            "Serving on %s:%d with %d workers (%s, %s, %s, db pool %d+%d per worker)",
+            self.host, self.port, self.workers, event_loop_choice(), http_protocol_choice(),
+            "SO_REUSEPORT" if self.reuse_port else "shared socket",
+            *self._pool_limits()
+        )
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self._reap(pid, status)
+        signal.alarm(0)
+        return 0
+
+    @staticmethod
+    def _pool_limits():
+        from app.db.session import MAX_OVERFLOW, POOL_SIZE
+        return POOL_SIZE, MAX_OVERFLOW
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the IdeaHub API server")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument(
+        "--workers", type=int, default=settings.WEB_CONCURRENCY,
+        help="worker processes (0 = one per CPU core)"
+    )
+    parser.add_argument("--graceful-timeout", type=int, default=settings.GRACEFUL_TIMEOUT)
+    parser.add_argument(
+        "--create-tables", action="store_true",
+        help="create missing tables before serving (normally Alembic's job)"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="report per-module import times and time to first request, then exit"
+    )
+    parser.add_argument(
+        "--startup-budget", type=float, default=0.0,
+        help="with --profile-startup, fail when the first request takes longer (seconds)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.profile_startup:
+        from app.utils.startup_profile import report
+        return report(budget=args.startup_budget)
+    if args.create_tables:
+        settings.CREATE_TABLES_ON_STARTUP = True
+
+    workers = args.workers or os.cpu_count() or 1
+    # Read by the per-worker DB pool sizing when the app is imported below
+    settings.WEB_CONCURRENCY = workers
+
+    if workers > 1 and settings.ENABLE_PROMETHEUS:
+        prepare_prometheus_dir(settings.PROMETHEUS_DIR)
+
+    # Preload: import (and build) the app once, before forking
+    from app.factory import app
+
+    if workers > 1 and settings.CREATE_TABLES_ON_STARTUP:
+        # Once here rather than racing CREATE TABLE in every worker
+        asyncio.run(create_tables_once())
+        settings.CREATE_TABLES_ON_STARTUP = False
+
+    if workers == 1:
+        uvicorn.run(
+            app,
+            host=args.host,
+            port=args.port,
+            loop=event_loop_choice(),
+            http=http_protocol_choice(),
+            timeout_graceful_shutdown=args.graceful_timeout,
+            proxy_headers=True,
+            log_config=None,
+        )
+        return 0
+
+    return Supervisor(app, workers, args.host, args.port, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
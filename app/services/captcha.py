@@ -0,0 +1,144 @@
+# app/services/captcha.py
+"""
+reCAPTCHA v3 verification.
+
+One pooled ``httpx.AsyncClient`` is opened in the app lifespan and reused
+for every verification, with tight connect/read timeouts so a slow
+verifier cannot tie up request handlers. Consecutive upstream failures
+open a circuit breaker; while it is open (or a call fails) the configured
+policy decides: fail open accepts the submission, fail closed rejects it.
+
+Verified tokens are remembered by digest for a short while, so a client
+retrying the same request is not re-verified (Google would report the
+reused token as a duplicate anyway).
+"""
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from app.config import settings
+from app.metrics import CAPTCHA_CIRCUIT_OPEN, CAPTCHA_UPSTREAM_SECONDS, CAPTCHA_VERIFICATIONS
+from app.utils.cache import TTLCache
+from app.utils.circuit import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class CaptchaVerifier:
+    def __init__(
+            self,
+            verify_url: str,
+            secret: str,
+            min_score: float = 0.5,
+            connect_timeout: float = 1.0,
+            read_timeout: float = 2.0,
+            max_connections: int = 20,
+            fail_open: bool = False,
+            breaker: Optional[CircuitBreaker] = None,
+            cache_ttl: float = 120,
+            cache_size: int = 10000
+    ):
+        self.verify_url = verify_url
+        self.secret = secret
+        self.min_score = min_score
+        self.fail_open = fail_open
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        self._verified = TTLCache(cache_size, cache_ttl)
+        self._client = None
+        self._upstream_errors = ()
+
+    async def start(self):
+        if self._client is None:
+            # Imported here so deployments without reCAPTCHA never load httpx
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            self._upstream_errors = (httpx.HTTPError, ValueError)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16, person=b"captcha").digest()
+
+    def _degraded(self, outcome: str) -> bool:
+        CAPTCHA_VERIFICATIONS.labels(outcome).inc()
+        return self.fail_open
+
+    def _passed(self, result) -> bool:
+        """Verdict of a ``siteverify`` answer; ValueError when it is not one"""
+        if not isinstance(result, dict):
+            raise ValueError(f"siteverify answered a JSON {type(result).__name__}, not an object")
+        score = result.get("score", 0)
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            raise ValueError(f"siteverify answered a non-numeric score {score!r}")
+        return result.get("success") is True and score >= self.min_score
+
+    async def verify(self, token: str) -> bool:
+        """Whether ``token`` passes verification (or the failure policy allows it)"""
+        digest = self._digest(token)
+        if self._verified.get(digest):
+            CAPTCHA_VERIFICATIONS.labels("cached").inc()
+            return True
+
+        if not self.breaker.allow():
+            return self._degraded("circuit_open")
+        if self._client is None:
+            # Outside the app lifespan (scripts, benchmarks)
+            await self.start()
+
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(
+                self.verify_url, data={"secret": self.secret, "response": token}
+            )
+            response.raise_for_status()
+            passed = self._passed(response.json())
+        except self._upstream_errors as e:
+            logger.warning("reCAPTCHA verification unavailable: %r", e)
+            self.breaker.record_failure()
+            CAPTCHA_CIRCUIT_OPEN.set(self.breaker.state != CircuitBreaker.CLOSED)
+            return self._degraded("error")
+        except BaseException:
+            # Cancelled or failed here: no verdict on the verifier, but a
+            # probe left claimed would keep the circuit half-open for good
+            self.breaker.release()
+            raise
+        finally:
+            CAPTCHA_UPSTREAM_SECONDS.observe(time.perf_counter() - started)
+
+        self.breaker.record_success()
+        CAPTCHA_CIRCUIT_OPEN.set(0)
+        CAPTCHA_VERIFICATIONS.labels("passed" if passed else "rejected").inc()
+        if passed:
+            self._verified.set(digest, True)
+        return passed
+
+
+captcha_verifier = CaptchaVerifier(
+    settings.RECAPTCHA_VERIFY_URL,
+    settings.RECAPTCHA_SECRET,
+    min_score=settings.RECAPTCHA_MIN_SCORE,
+    connect_timeout=settings.RECAPTCHA_CONNECT_TIMEOUT,
+    read_timeout=settings.RECAPTCHA_READ_TIMEOUT,
+    max_connections=settings.RECAPTCHA_MAX_CONNECTIONS,
+    fail_open=settings.RECAPTCHA_FAIL_OPEN,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.RECAPTCHA_BREAKER_THRESHOLD,
+        reset_timeout=settings.RECAPTCHA_BREAKER_RESET_SECONDS
+    ),
+    cache_ttl=settings.RECAPTCHA_CACHE_TTL,
+    cache_size=settings.RECAPTCHA_CACHE_SIZE
+)
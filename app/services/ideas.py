@@ -1,29 +1,124 @@
 from uuid import UUID
 
-from sqlalchemy import case, update
+from datetime import datetime
+
+from sqlalchemy import Row, func, or_, select, update
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from typing import Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List, Set
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
+from app.config import settings
+from app.db.replicas import pin_reads_to_primary
+from app.db.session import replicas, run_after_commit
 from app.models import Idea
-from app.models.idea import Vote
+from app.schemas.idea import IDEA_RESPONSE_FIELDS
+from app.services.listing_cache import ListingCache
+from app.services.listing_sweep import listing_sweep
+from app.services.listing_versions import ListingVersions
+from app.services.search import (
+    InvertedIndex,
+    decode_search_cursor,
+    encode_search_cursor,
+    fulltext_search,
+    has_fulltext,
+)
+from app.services.similarity import MinHashIndex, idea_text, signature
+from app.services.vote_buffer import VoteBuffer
+from app.services.vote_stream import VoteStream
+from app.services.votes import (
+    VOTE_TYPES,
+    apply_counter_delta,
+    apply_counter_deltas,
+    previous_votes,
+    upsert_vote,
+    upsert_votes,
+    vote_delta,
+)
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.stages import stage
+
+# Columns needed to render an ``IdeaResponse``, in field order
+LIST_COLUMNS = tuple(getattr(Idea, field) for field in IDEA_RESPONSE_FIELDS)
+
+# sort mode -> (sort key column, descending); ``Idea.id`` breaks ties
+SORT_KEYS = {
+    'recent': (Idea.created_at, True),
+    'popular': (Idea.wilson_score, True),
+    'top': (Idea.net_score, True),
+    'controversial': (Idea.controversy, True),
+    'hot': (Idea.hot_score, True),
+}
+
+MODERATION_STATUSES = ('approved', 'rejected')
 
 
 class IdeaService:
-    def __init__(self, db: Session):
+    """
+    Idea persistence on top of an ``AsyncSession``.
+
+    The service never commits: the ``get_db`` dependency owns the single
+    transaction of each request and commits or rolls back once at the end.
+    With a ``vote_buffer``, idea counters are updated write-behind; with a
+    ``listing_cache``, cached pages are patched or evicted after commit, and
+    ``listing_versions`` are bumped so HTTP clients revalidate.
+    ``search_index`` serves searches where MySQL FULLTEXT is unavailable;
+    ``similarity_index`` finds near-duplicates of new and existing ideas;
+    ``vote_stream`` relays fresh counts to live clients after commit.
+    Listings, search and idea pages are read from ``read_db``, a replica
+    session when one is in use, and everything else from ``db``.
+    """
+
+    def __init__(
+            self,
+            db: AsyncSession,
+            read_db: Optional[AsyncSession] = None,
+            vote_buffer: Optional[VoteBuffer] = None,
+            listing_cache: Optional[ListingCache] = None,
+            search_index: Optional[InvertedIndex] = None,
+            similarity_index: Optional[MinHashIndex] = None,
+            vote_stream: Optional[VoteStream] = None,
+            listing_versions: Optional[ListingVersions] = None
+    ):
         self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.vote_buffer = vote_buffer
+        self.listing_cache = listing_cache
+        self.search_index = search_index
+        self.similarity_index = similarity_index
+        self.vote_stream = vote_stream
+        self.listing_versions = listing_versions
+
+    async def submit_idea(self, idea_data: dict, submitted_by: str) -> Idea:
+        sig = None
+        if self.similarity_index is not None:
+            with stage("submit", "similarity"):
+                sig = signature(idea_text(idea_data['title'], idea_data['summary']))
+                if sig is not None and settings.NEAR_DUPLICATE_THRESHOLD:
+                    duplicates = await self._live_matches(
+                        self.similarity_index.query(sig, settings.NEAR_DUPLICATE_THRESHOLD),
+                        ('approved', 'pending')
+                    )
+                    if duplicates:
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail={
+                                "message": "A very similar idea has already been submitted",
+                                # Pending ideas block the submission too, but are not disclosed
+                                "similar_ideas": [
+                                    idea_id for idea_id, _, idea_status in duplicates if idea_status == 'approved'
+                                ],
+                            }
+                        )
 
-    def submit_idea(self, idea_data: dict, submitted_by: str) -> Idea:
+        idea = Idea(**idea_data, submitted_by=submitted_by)
+        self.db.add(idea)
         try:
-            idea = Idea(**idea_data, submitted_by=submitted_by)
-            self.db.add(idea)
-            self.db.commit()
-            self.db.refresh(idea)
-            return idea
+            with stage("submit", "insert"):
+                await self.db.flush()
         except IntegrityError as e:
-            self.db.rollback()
             if "slug" in str(e):
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
@@ -34,99 +129,516 @@ class IdeaService:
                 detail="Invalid idea data"
             )
 
-    def handle_vote(self, idea_id: UUID, voter_hash: str, vote_type: str) -> Tuple[int, int]:
-        # Check if idea exists and is approved
-        idea = self.db.query(Idea).filter(
-            Idea.id == idea_id,
-            Idea.status == 'approved'
-        ).first()
-
-        if not idea:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Idea not found or not approved"
+        # Pick up server-side defaults such as created_at
+        with stage("submit", "refresh"):
+            await self.db.refresh(idea)
+        if idea.status == 'approved':
+            self._invalidate_after_commit({idea.category})
+        if self.search_index is not None and not has_fulltext(self.db):
+            run_after_commit(
+                self.db, self._index_idea,
+                idea.id, idea.category, idea.title, idea.summary, idea_data['details']
             )
+        if sig is not None:
+            run_after_commit(self.db, self._index_similarity, idea.id, sig, idea.created_at)
+        return idea
+
+    async def _index_idea(self, *fields):
+        self.search_index.add(*fields)
+
+    async def _index_similarity(self, idea_id: str, sig, created_at: datetime):
+        self.similarity_index.add(idea_id, sig, created_at)
 
-        # Use atomic update to prevent race conditions
-        update_values = {
-            "upvotes": case(
-                (Vote.vote_type == 'upvote', Idea.upvotes - 1),
-                else_=Idea.upvotes + (vote_type == 'upvote')
-            ),
-            "downvotes": case(
-                (Vote.vote_type == 'downvote', Idea.downvotes - 1),
-                else_=Idea.downvotes + (vote_type == 'downvote')
+    async def _live_matches(
+            self, matches: List[Tuple[str, float]], statuses: Tuple[str, ...]
+    ) -> List[Tuple[str, float, str]]:
+        """``matches`` whose ideas still exist with one of ``statuses``, with that status"""
+        if not matches:
+            return []
+        # Status is checked in Python; see InvertedIndex.search
+        rows = await self.db.execute(
+            select(Idea.id, Idea.status).where(Idea.id.in_([idea_id for idea_id, _ in matches]))
+        )
+        live = {row.id: row.status for row in rows if row.status in statuses}
+        return [(idea_id, similarity, live[idea_id]) for idea_id, similarity in matches if idea_id in live]
+
+    async def get_similar_ideas(self, idea_id: UUID, limit: int = 10) -> Optional[List[dict]]:
+        """
+        Approved ideas similar to approved idea ``idea_id``, most similar
+        first, as ``IdeaResponse``-shaped dicts with a ``similarity``
+        estimate; None when the idea is not found or not approved.
+        """
+        idea = (await self.read_db.execute(
+            select(Idea.title, Idea.summary).where(Idea.id == str(idea_id), Idea.status == 'approved')
+        )).first()
+        if idea is None:
+            return None
+        sig = signature(idea_text(idea.title, idea.summary))
+        if self.similarity_index is None or sig is None:
+            return []
+
+        with stage("similar", "query"):
+            # Over-fetch, as some matches may be pending or rejected
+            matches = self.similarity_index.query(
+                sig, settings.SIMILAR_IDEAS_THRESHOLD, limit=limit * 3, exclude=str(idea_id)
             )
-        }
-
-        # Check existing vote using CTE
-        existing_vote = self.db.query(Vote).filter(
-            Vote.idea_id == idea_id,
-            Vote.voter_hash == voter_hash
-        ).cte("existing_vote")
-
-        # Perform atomic update
-        stmt = (
-            update(Idea)
-            .where(Idea.id == idea_id)
-            .values(**update_values)
-            .returning(Idea.upvotes, Idea.downvotes)
+        if not matches:
+            return []
+        rows = await self.read_db.execute(
+            select(*LIST_COLUMNS, Idea.status).where(Idea.id.in_([match_id for match_id, _ in matches]))
         )
+        by_id = {row.id: row for row in rows if row.status == 'approved'}
+        ideas = []
+        for match_id, similarity in matches:
+            if match_id in by_id:
+                similar = dict(zip(IDEA_RESPONSE_FIELDS, by_id[match_id]))
+                similar['similarity'] = similarity
+                ideas.append(similar)
+        return ideas[:limit]
 
-        if existing_vote is not None:
-            # Update existing vote
-            self.db.query(Vote).filter(
-                Vote.idea_id == idea_id,
-                Vote.voter_hash == voter_hash
-            ).update({"vote_type": vote_type})
-        else:
-            # Create new vote
-            self.db.add(Vote(
-                idea_id=idea_id,
-                voter_hash=voter_hash,
-                vote_type=vote_type
-            ))
+    async def handle_vote(self, idea_id: UUID, voter_hash: str, vote_type: str) -> Tuple[int, int]:
+        """
+        Record a vote and return the idea's fresh (upvotes, downvotes).
+
+        Voting for a new type casts or switches the vote; repeating the
+        current vote is a no-op, so client retries are safe.
+        """
+        if vote_type not in VOTE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid vote type"
+            )
+        idea_id = str(idea_id)
 
         try:
-            result = self.db.execute(stmt).fetchone()
-            self.db.commit()
-            return (result.upvotes, result.downvotes)
+            with stage("vote", "upsert"):
+                previous = await upsert_vote(self.db, idea_id, voter_hash, vote_type)
         except IntegrityError:
-            self.db.rollback()
+            # The only constraint the upsert can violate is the idea foreign key
+            updated = None
+        else:
+            deltas = vote_delta(previous, vote_type)
+            with stage("vote", "counters"):
+                if self.vote_buffer is not None:
+                    updated = await self.vote_buffer.record(self.db, idea_id, deltas)
+                else:
+                    updated = await apply_counter_delta(self.db, idea_id, deltas)
+
+        if updated is None:
+            # The vote row, if written, is rolled back with the request
             raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Vote processing failed"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Idea not found or not approved"
             )
+        counts, category = updated[:2], updated[2]
+        changed_categories = set()
+        if any(deltas.values()) and (self.vote_stream is not None or self.listing_versions is not None):
+            if category is None:
+                category = await self._idea_category(idea_id)
+            if self.vote_stream is not None:
+                run_after_commit(self.db, self.vote_stream.publish, [(idea_id, category, *counts)])
+            changed_categories.add(category)
+        self._refresh_listings_after_commit({idea_id: counts}, changed_categories)
+        return counts
+
+    async def _idea_category(self, idea_id: str) -> str:
+        # Only needed on MySQL, whose counter update cannot return it. Ideas
+        # never change category; the stream hub keeps a cache of them
+        categories = self.vote_stream.categories if self.vote_stream is not None else None
+        category = categories.get(idea_id) if categories is not None else None
+        if category is None:
+            category = await self.db.scalar(select(Idea.category).where(Idea.id == idea_id))
+            if categories is not None:
+                categories.set(idea_id, category)
+        return category
+
+    def _refresh_listings_after_commit(self, counts: Dict[str, Tuple[int, int]], categories: Set[str]):
+        if counts:
+            # The voter's next reads must show the vote
+            pin_reads_to_primary()
+        if self.listing_cache is not None or (categories and self.listing_versions is not None):
+            run_after_commit(self.db, self._refresh_listings, counts, categories)
+
+    async def _refresh_listings(self, counts: Dict[str, Tuple[int, int]], categories: Set[str]):
+        """Patch fresh counts into cached pages, then bump the versions of the voted categories"""
+        if self.listing_cache is not None:
+            for idea_id, (upvotes, downvotes) in counts.items():
+                await self.listing_cache.refresh_counts(idea_id, upvotes, downvotes)
+        versioned = bool(categories) and self.listing_versions is not None
+        if versioned:
+            # Not before the cache is patched, or an old page could go out
+            # with the new ETag. Counts show on every sort of the category
+            await self.listing_versions.bump_categories(categories)
+        if replicas or (self.vote_buffer is not None and versioned):
+            # Listings read from the database show the vote later; see listing_sweep
+            listing_sweep.schedule(counts=counts, voted=categories)
+
+    async def handle_votes(self, voter_hash: str, votes: List[Tuple[UUID, str]]) -> List[dict]:
+        """
+        Record a batch of (idea_id, vote_type) votes from one voter in the
+        request's transaction and return one result per item, in order.
+
+        Each vote behaves as in ``handle_vote``, except that unknown or
+        unapproved ideas are reported per item instead of failing the batch.
+        When an idea appears more than once, the last vote wins and the
+        earlier ones are ``superseded``. Results carry a ``status`` of
+        ``recorded``, ``switched``, ``unchanged``, ``superseded`` or
+        ``not_found`` plus the idea's fresh counts when it exists.
+        """
+        if any(vote_type not in VOTE_TYPES for _, vote_type in votes):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid vote type"
+            )
+        items = [(str(idea_id), vote_type) for idea_id, vote_type in votes]
+        # Last vote per idea wins
+        wanted: Dict[str, str] = dict(items)
+
+        with stage("vote_batch", "upsert"):
+            # idea_id -> category
+            approved = dict((await self.db.execute(
+                select(Idea.id, Idea.category).where(Idea.id.in_(list(wanted)), Idea.status == 'approved')
+            )).all())
+            previous = await previous_votes(self.db, voter_hash, list(approved)) if approved else {}
+            changes = {
+                idea_id: vote_type for idea_id, vote_type in wanted.items()
+                if idea_id in approved and previous.get(idea_id) != vote_type
+            }
+            if changes:
+                await upsert_votes(self.db, voter_hash, changes)
+
+        deltas = {}
+        for idea_id, vote_type in changes.items():
+            delta = vote_delta(previous.get(idea_id), vote_type)
+            deltas[idea_id] = (delta['upvotes'], delta['downvotes'])
+
+        with stage("vote_batch", "counters"):
+            if self.vote_buffer is not None:
+                counts = {}
+                for idea_id in approved:
+                    up, down = deltas.get(idea_id, (0, 0))
+                    updated = await self.vote_buffer.record(
+                        self.db, idea_id, {'upvotes': up, 'downvotes': down}
+                    )
+                    if updated is not None:
+                        counts[idea_id] = updated[:2]
+            else:
+                counts = await apply_counter_deltas(self.db, approved, deltas) if approved else {}
+
+        self._refresh_listings_after_commit(
+            {idea_id: counts[idea_id] for idea_id in changes if idea_id in counts},
+            {approved[idea_id] for idea_id in changes if idea_id in counts}
+        )
+        if self.vote_stream is not None:
+            updates = [
+                (idea_id, approved[idea_id], *counts[idea_id]) for idea_id in changes if idea_id in counts
+            ]
+            if updates:
+                run_after_commit(self.db, self.vote_stream.publish, updates)
+
+        results = []
+        last_index = {idea_id: index for index, (idea_id, _) in enumerate(items)}
+        for index, (idea_id, vote_type) in enumerate(items):
+            if idea_id not in counts:
+                item_status = 'not_found'
+            elif last_index[idea_id] != index:
+                item_status = 'superseded'
+            elif idea_id not in changes:
+                item_status = 'unchanged'
+            elif idea_id in previous:
+                item_status = 'switched'
+            else:
+                item_status = 'recorded'
+            upvotes, downvotes = counts.get(idea_id, (None, None))
+            results.append({
+                "idea_id": idea_id,
+                "vote_type": vote_type,
+                "status": item_status,
+                "upvotes": upvotes,
+                "downvotes": downvotes
+            })
+        return results
 
-    def get_approved_ideas(
+    async def rollback(self):
+        """Discard the request's pending writes before returning an error response"""
+        await self.db.rollback()
+
+    async def get_idea(self, idea_id: UUID, approved_only: bool = True) -> Optional[Idea]:
+        """Full idea including its deferred ``details`` body, or None"""
+        stmt = select(Idea).options(undefer(Idea.details)).where(Idea.id == str(idea_id))
+        if approved_only:
+            stmt = stmt.where(Idea.status == 'approved')
+        return await self.read_db.scalar(stmt)
+
+    async def get_approved_ideas(
             self,
             category: Optional[str] = None,
             sort: str = 'recent',
             page: int = 1,
-            per_page: int = 20
-    ) -> List[Idea]:
-        query = self.db.query(Idea).filter(Idea.status == 'approved')
+            per_page: int = 20,
+            cursor: Optional[str] = None
+    ) -> List[Row]:
+        """
+        List approved ideas as column-only rows (``LIST_COLUMNS`` followed
+        by the sort key), skipping ORM entity hydration entirely.
+
+        With ``cursor`` (from ``next_cursor``) the page is fetched by keyset
+        seek on the (status[, category], sort key, id) indexes and ``page``
+        is ignored; without it, falls back to offset pagination.
+        """
+        if sort not in SORT_KEYS:
+            sort = 'recent'
+        sort_key, descending = SORT_KEYS[sort]
+
+        columns = LIST_COLUMNS if sort_key in LIST_COLUMNS else LIST_COLUMNS + (sort_key,)
+        stmt = select(*columns).where(Idea.status == 'approved')
 
         if category:
-            query = query.filter(Idea.category == category)
+            stmt = stmt.where(Idea.category == category)
 
-        if sort == 'popular':
-            query = query.order_by(Idea.upvotes.desc())
-        elif sort == 'controversial':
-            query = query.order_by((Idea.upvotes - Idea.downvotes).asc())
+        if descending:
+            stmt = stmt.order_by(sort_key.desc(), Idea.id.desc())
         else:
-            query = query.order_by(Idea.created_at.desc())
+            stmt = stmt.order_by(sort_key.asc(), Idea.id.asc())
+
+        if cursor:
+            try:
+                last_key, last_id = decode_cursor(cursor, sort, (sort_key.type.python_type, str))
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            # The redundant leading bound lets the planner range-scan the index
+            if descending:
+                stmt = stmt.where(
+                    sort_key <= last_key,
+                    or_(sort_key < last_key, Idea.id < last_id)
+                )
+            else:
+                stmt = stmt.where(
+                    sort_key >= last_key,
+                    or_(sort_key > last_key, Idea.id > last_id)
+                )
+        else:
+            stmt = stmt.offset((page - 1) * per_page)
+
+        stmt = stmt.limit(per_page)
+        return list((await self.read_db.execute(stmt)).all())
+
+    @staticmethod
+    def next_cursor(ideas: List[Row], sort: str, per_page: int) -> Optional[str]:
+        """Cursor for the page after ``ideas``, or None when it was the last page"""
+        if not ideas or len(ideas) < per_page:
+            return None
+        if sort not in SORT_KEYS:
+            sort = 'recent'
+        sort_key, _ = SORT_KEYS[sort]
+        last = ideas[-1]
+        return encode_cursor(sort, (getattr(last, sort_key.key), last.id))
+
+    async def search_ideas(
+            self,
+            query: str,
+            category: Optional[str] = None,
+            per_page: int = 20,
+            cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Approved ideas matching ``query``, most relevant first, as
+        ``IdeaResponse``-shaped dicts with a ``relevance`` score, plus the
+        cursor of the next page (None on the last page).
+        """
+        after = None
+        if cursor:
+            try:
+                after = decode_search_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        with stage("search", "query"):
+            if has_fulltext(self.read_db):
+                rows = await fulltext_search(self.read_db, LIST_COLUMNS, query, category, per_page, after)
+                matches = [(row, row.relevance) for row in rows]
+            elif self.search_index is not None:
+                matches = await self.search_index.search(self.read_db, LIST_COLUMNS, query, category, per_page, after)
+            else:
+                matches = []
+
+        ideas = []
+        for row, relevance in matches:
+            idea = dict(zip(IDEA_RESPONSE_FIELDS, row))
+            idea['relevance'] = relevance
+            ideas.append(idea)
+        next_cursor = None
+        if ideas and len(ideas) == per_page:
+            next_cursor = encode_search_cursor(ideas[-1]['relevance'], ideas[-1]['id'])
+        return ideas, next_cursor
+
+    async def get_pending_ideas(
+            self,
+            category: Optional[str] = None,
+            per_page: int = 50,
+            cursor: Optional[str] = None
+    ) -> List[Row]:
+        """
+        Moderation queue, oldest first: pending ideas as ``LIST_COLUMNS``
+        rows, keyset-paginated on the (status[, category], created_at, id)
+        indexes. ``cursor`` comes from ``next_pending_cursor``.
+        """
+        stmt = select(*LIST_COLUMNS).where(Idea.status == 'pending')
+        if category:
+            stmt = stmt.where(Idea.category == category)
+        if cursor:
+            try:
+                last_created, last_id = decode_cursor(cursor, 'pending', (datetime, str))
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            stmt = stmt.where(
+                Idea.created_at >= last_created,
+                or_(Idea.created_at > last_created, Idea.id > last_id)
+            )
+        stmt = stmt.order_by(Idea.created_at.asc(), Idea.id.asc()).limit(per_page)
+        return list((await self.db.execute(stmt)).all())
+
+    @staticmethod
+    def next_pending_cursor(ideas: List[Row], per_page: int) -> Optional[str]:
+        """Cursor for the queue page after ``ideas``, or None when it was the last page"""
+        if not ideas or len(ideas) < per_page:
+            return None
+        return encode_cursor('pending', (ideas[-1].created_at, ideas[-1].id))
+
+    async def moderate_ideas(self, idea_ids: List[UUID], new_status: str) -> Dict[str, int]:
+        """
+        Set ``new_status`` on every idea in ``idea_ids`` with one
+        ``UPDATE ... WHERE id IN`` per ``MODERATION_CHUNK_SIZE`` ids.
+
+        Returns how many ideas were ``updated``, already ``unchanged`` and
+        ``not_found``. Listing caches are invalidated once, after commit.
+        """
+        self._check_moderation_status(new_status)
+        ids = list(dict.fromkeys(str(idea_id) for idea_id in idea_ids))
+        counts = {"updated": 0, "unchanged": 0, "not_found": 0}
+        categories: Set[str] = set()
+
+        for start in range(0, len(ids), settings.MODERATION_CHUNK_SIZE):
+            chunk = ids[start:start + settings.MODERATION_CHUNK_SIZE]
+            with stage("moderation", "update"):
+                found = 0
+                rows = await self.db.execute(
+                    select(Idea.category, Idea.status, func.count())
+                    .where(Idea.id.in_(chunk))
+                    .group_by(Idea.category, Idea.status)
+                )
+                for category, current, count in rows:
+                    found += count
+                    if current == new_status:
+                        counts["unchanged"] += count
+                    elif 'approved' in (current, new_status):
+                        categories.add(category)
+                result = await self.db.execute(
+                    update(Idea)
+                    .where(Idea.id.in_(chunk), Idea.status != new_status)
+                    .values(status=new_status)
+                )
+            counts["updated"] += result.rowcount
+            counts["not_found"] += len(chunk) - found
+
+        self._invalidate_after_commit(categories)
+        return counts
+
+    async def moderate_matching(
+            self,
+            new_status: str,
+            current_status: str = 'pending',
+            category: Optional[str] = None,
+            submitted_before: Optional[datetime] = None,
+            limit: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Set ``new_status`` on up to ``limit`` (``MODERATION_FILTER_LIMIT``)
+        ideas matching the filter, oldest first, walking the status index
+        in keyset order one ``MODERATION_CHUNK_SIZE`` chunk at a time.
+
+        Returns the ``updated`` count and whether matching ideas remain
+        (``has_more``), in which case the same request can be repeated.
+        """
+        self._check_moderation_status(new_status)
+        if current_status == new_status:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ideas already have that status"
+            )
+        limit = settings.MODERATION_FILTER_LIMIT if limit is None else limit
+
+        matching = select(Idea.id, Idea.category, Idea.created_at).where(Idea.status == current_status)
+        if category:
+            matching = matching.where(Idea.category == category)
+        if submitted_before is not None:
+            matching = matching.where(Idea.created_at < submitted_before)
+        matching = matching.order_by(Idea.created_at.asc(), Idea.id.asc())
+
+        updated = 0
+        last = None
+        categories: Set[str] = set()
+        while updated < limit:
+            stmt = matching
+            if last is not None:
+                stmt = stmt.where(
+                    Idea.created_at >= last.created_at,
+                    or_(Idea.created_at > last.created_at, Idea.id > last.id)
+                )
+            with stage("moderation", "update"):
+                rows = (await self.db.execute(
+                    stmt.limit(min(settings.MODERATION_CHUNK_SIZE, limit - updated))
+                )).all()
+                if not rows:
+                    break
+                result = await self.db.execute(
+                    update(Idea)
+                    .where(Idea.id.in_([row.id for row in rows]), Idea.status == current_status)
+                    .values(status=new_status)
+                )
+            updated += result.rowcount
+            if 'approved' in (current_status, new_status):
+                categories.update(row.category for row in rows)
+            last = rows[-1]
+
+        # Rows moderated above no longer match, so any row left is more work
+        has_more = await self.db.scalar(matching.with_only_columns(Idea.id).limit(1)) is not None
+        self._invalidate_after_commit(categories)
+        return {"updated": updated, "has_more": has_more}
+
+    @staticmethod
+    def _check_moderation_status(new_status: str):
+        if new_status not in MODERATION_STATUSES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status")
+
+    def _invalidate_after_commit(self, categories: Set[str]):
+        if categories:
+            pin_reads_to_primary()
+        if categories and (self.listing_cache is not None or self.listing_versions is not None):
+            run_after_commit(self.db, self._invalidate_listings, categories)
 
-        return query.offset((page - 1) * per_page).limit(per_page).all()
+    async def _invalidate_listings(self, categories: Set[str]):
+        if self.listing_cache is not None:
+            await self.listing_cache.invalidate_categories(categories)
+        if self.listing_versions is not None:
+            # Not before the cache has dropped the old pages, which could
+            # otherwise go out with the new ETag
+            await self.listing_versions.bump_categories(categories)
+        if replicas:
+            # Pages rendered from a lagging replica meanwhile may predate the change
+            listing_sweep.schedule(dropped=categories)
 
-    def update_idea_status(self, idea_id: UUID, status: str) -> Idea:
-        idea = self.db.query(Idea).get(idea_id)
+    async def update_idea_status(self, idea_id: UUID, status: str) -> Idea:
+        idea = await self.db.get(Idea, str(idea_id))
         if not idea:
             raise HTTPException(status_code=404, detail="Idea not found")
 
         if status not in ['approved', 'rejected']:
             raise HTTPException(status_code=400, detail="Invalid status")
 
+        changed_visibility = 'approved' in (idea.status, status) and idea.status != status
         idea.status = status
-        self.db.commit()
+        await self.db.flush()
+        if changed_visibility:
+            self._invalidate_after_commit({idea.category})
         return idea
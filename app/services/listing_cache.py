@@ -0,0 +1,261 @@
+# app/services/listing_cache.py
+"""
+Read-through cache for ``GET /api/ideas`` pages.
+
+Entries hold the page exactly as sent on the wire (JSON bytes) plus its
+``X-Next-Cursor``, so a hit never touches the database or Pydantic. Every
+page is tagged with its category and with each idea it contains:
+
+* approving or un-approving an idea drops the pages of its category and
+  the unfiltered listing;
+* a vote rewrites the counters inside the pages that show the idea, keeping
+  their remaining TTL, instead of evicting them;
+* with read replicas, both happen once more after
+  ``DB_READ_YOUR_WRITES_SECONDS`` (see ``listing_sweep``), as a page may
+  have been refilled from a replica that had not caught up yet.
+
+Compressed variants of a page are cached beside it, keyed by encoding and
+stamped with a digest of the body they were made from, so a variant of a
+page that has since been patched or replaced simply stops matching and
+needs no invalidation of its own.
+
+The in-process backend is per worker; ``RedisCacheBackend`` shares entries
+between workers through any client with the ``redis.asyncio`` API.
+"""
+import hashlib
+import logging
+from typing import Callable, Iterable, List, Optional, Protocol, Set, Tuple
+
+from app.config import settings
+from app.metrics import COMPRESSED_RESPONSES, LISTING_CACHE_ENTRIES, LISTING_CACHE_HITS, LISTING_CACHE_MISSES
+from app.schemas.idea import dump_ideas, load_ideas
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ALL_CATEGORIES = "*"
+# Variant entry layout: digest of the uncompressed body, then the compressed body
+_DIGEST_SIZE = 8
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None: ...
+
+    async def replace(self, key: str, value: bytes) -> None:
+        """Overwrite an existing entry, keeping its remaining TTL"""
+
+    async def delete(self, keys: Iterable[str]) -> None: ...
+
+    async def members(self, tag: str) -> Set[str]: ...
+
+    async def clear(self) -> None: ...
+
+
+class MemoryCacheBackend:
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(maxsize=maxsize, ttl=0)
+        self._tags: dict = {}
+        self._sets_since_prune = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        self._entries.set(key, value, ttl=ttl)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        # Evicted or expired keys linger in tag sets until pruned
+        self._sets_since_prune += 1
+        if self._sets_since_prune >= self._entries.maxsize:
+            self._sets_since_prune = 0
+            self._prune()
+        LISTING_CACHE_ENTRIES.set(len(self._entries))
+
+    async def replace(self, key: str, value: bytes) -> None:
+        self._entries.replace(key, value)
+
+    async def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._entries.pop(key)
+        LISTING_CACHE_ENTRIES.set(len(self._entries))
+
+    async def members(self, tag: str) -> Set[str]:
+        return set(self._tags.get(tag, ()))
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        LISTING_CACHE_ENTRIES.set(0)
+
+    def _prune(self):
+        for tag in list(self._tags):
+            live = {key for key in self._tags[tag] if key in self._entries}
+            if live:
+                self._tags[tag] = live
+            else:
+                del self._tags[tag]
+
+
+class RedisCacheBackend:
+    """Shared backend over a ``redis.asyncio.Redis``-compatible client"""
+
+    def __init__(self, client, prefix: str = "ideahub:listing"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:page:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        seconds = max(int(ttl), 1)
+        pipe = self.client.pipeline()
+        pipe.set(self._key(key), value, ex=seconds)
+        for tag in tags:
+            pipe.sadd(self._tag(tag), key)
+            pipe.expire(self._tag(tag), seconds)
+        await pipe.execute()
+
+    async def replace(self, key: str, value: bytes) -> None:
+        await self.client.set(self._key(key), value, xx=True, keepttl=True)
+
+    async def delete(self, keys: Iterable[str]) -> None:
+        keys = [self._key(key) for key in keys]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def members(self, tag: str) -> Set[str]:
+        return {
+            member.decode() if isinstance(member, bytes) else member
+            for member in await self.client.smembers(self._tag(tag))
+        }
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=f"{self.prefix}:*"):
+            await self.client.delete(key)
+
+
+class ListingCache:
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def key(category: Optional[str], sort: str, page: int, per_page: int, cursor: Optional[str]) -> str:
+        position = f"c{cursor}" if cursor else f"p{page}"
+        return f"{category or ALL_CATEGORIES}|{sort}|{position}|{per_page}"
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Cached (body, next cursor) for ``key``"""
+        try:
+            entry = await self.backend.get(key)
+        except Exception:
+            logger.exception("Listing cache read failed")
+            entry = None
+
+        if entry is None:
+            LISTING_CACHE_MISSES.inc()
+            return None
+        LISTING_CACHE_HITS.inc()
+        return self._unpack(entry)
+
+    async def put(
+            self,
+            key: str,
+            category: Optional[str],
+            idea_ids: List[str],
+            body: bytes,
+            next_cursor: Optional[str]
+    ) -> None:
+        tags = [f"cat:{category or ALL_CATEGORIES}"] + [f"idea:{idea_id}" for idea_id in idea_ids]
+        try:
+            await self.backend.set(key, self._pack(body, next_cursor), self.ttl, tags)
+        except Exception:
+            logger.exception("Listing cache write failed")
+
+    async def compressed(
+            self,
+            key: str,
+            body: bytes,
+            encoding: str,
+            compress: Callable[[bytes, str], bytes]
+    ) -> bytes:
+        """The page ``body`` of ``key`` compressed as ``encoding``: cached, or made with ``compress`` and cached"""
+        variant_key = f"{key}|{encoding}"
+        digest = hashlib.blake2b(body, digest_size=_DIGEST_SIZE).digest()
+        try:
+            entry = await self.backend.get(variant_key)
+        except Exception:
+            logger.exception("Listing cache read failed")
+            entry = None
+        if entry is not None and entry[:_DIGEST_SIZE] == digest:
+            COMPRESSED_RESPONSES.labels(encoding, "yes").inc()
+            return entry[_DIGEST_SIZE:]
+
+        compressed = compress(body, encoding)
+        COMPRESSED_RESPONSES.labels(encoding, "no").inc()
+        try:
+            await self.backend.set(variant_key, digest + compressed, self.ttl, ())
+        except Exception:
+            logger.exception("Listing cache write failed")
+        return compressed
+
+    async def invalidate_category(self, category: Optional[str]) -> None:
+        """Drop every page an idea of ``category`` appears or could appear on"""
+        await self.invalidate_categories([category])
+
+    async def invalidate_categories(self, categories: Iterable[Optional[str]]) -> None:
+        """``invalidate_category`` for several categories, in one delete"""
+        keys = set()
+        tags = {f"cat:{category or ALL_CATEGORIES}" for category in categories} | {f"cat:{ALL_CATEGORIES}"}
+        for tag in tags:
+            keys |= await self.backend.members(tag)
+        await self.backend.delete(keys)
+
+    async def refresh_counts(self, idea_id: str, upvotes: int, downvotes: int) -> None:
+        """Rewrite the counters of ``idea_id`` inside every cached page showing it"""
+        for key in await self.backend.members(f"idea:{idea_id}"):
+            entry = await self.backend.get(key)
+            if entry is None:
+                continue
+            body, next_cursor = self._unpack(entry)
+            ideas = load_ideas(body)
+            for idea in ideas:
+                if idea["id"] == idea_id:
+                    idea["upvotes"] = upvotes
+                    idea["downvotes"] = downvotes
+            await self.backend.replace(key, self._pack(dump_ideas(ideas), next_cursor))
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    # Entry layout: next cursor (URL-safe base64, may be empty), newline, body
+    @staticmethod
+    def _pack(body: bytes, next_cursor: Optional[str]) -> bytes:
+        return (next_cursor or "").encode() + b"\n" + body
+
+    @staticmethod
+    def _unpack(entry: bytes) -> Tuple[bytes, Optional[str]]:
+        cursor, _, body = entry.partition(b"\n")
+        return body, cursor.decode() or None
+
+
+def create_listing_cache() -> ListingCache:
+    if settings.LISTING_CACHE_BACKEND == "redis":
+        # Optional dependency, only needed for the shared backend
+        import redis.asyncio as redis
+        backend = RedisCacheBackend(redis.from_url(settings.LISTING_CACHE_REDIS_URL))
+    else:
+        backend = MemoryCacheBackend(settings.LISTING_CACHE_MAX_ENTRIES)
+    return ListingCache(backend, settings.LISTING_CACHE_TTL)
+
+
+listing_cache = create_listing_cache()
@@ -0,0 +1,113 @@
+# app/services/listing_sweep.py
+"""
+Second pass over cached listings once the database has caught up.
+
+A vote is patched into the cached pages and bumps its category's listing
+version right after commit, but listings rendered from the database only
+show it once the vote buffer has flushed it, and from a read replica only
+once the replica has replayed it (``DB_READ_YOUR_WRITES_SECONDS``). A page
+rendered in between may have been cached without it, or sent with the
+ETag that promised it. The same goes for moderation, which drops the
+pages of a category.
+
+Rather than one waiting task per change, changes are collected here and a
+single task per worker replays them in sweeps: it takes everything queued
+so far, waits for the next buffer flush (bumping the voted categories
+again), waits out the replica window, then patches the latest counts
+into the cached pages again, drops the moderated categories once more and
+bumps every affected category. Whatever was queued meanwhile goes in the
+next sweep, so a vote storm costs one sweep per window, not one per vote.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from app.services.listing_cache import ListingCache
+from app.services.listing_versions import ListingVersions
+from app.services.vote_buffer import VoteBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class ListingSweep:
+    def __init__(self):
+        # idea_id -> latest (upvotes, downvotes) seen by this worker
+        self._counts: Dict[str, Tuple[int, int]] = {}
+        # Voted categories, and categories whose pages are dropped
+        self._voted: Set[str] = set()
+        self._dropped: Set[str] = set()
+        self._listing_cache: Optional[ListingCache] = None
+        self._listing_versions: Optional[ListingVersions] = None
+        self._vote_buffer: Optional[VoteBuffer] = None
+        self._delay = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(
+            self,
+            listing_cache: Optional[ListingCache],
+            listing_versions: Optional[ListingVersions],
+            vote_buffer: Optional[VoteBuffer],
+            delay: float
+    ):
+        """Sweep the given (enabled) collaborators, ``delay`` seconds after each buffer flush"""
+        self._listing_cache = listing_cache
+        self._listing_versions = listing_versions
+        self._vote_buffer = vote_buffer
+        self._delay = delay
+
+    def schedule(
+            self,
+            counts: Optional[Dict[str, Tuple[int, int]]] = None,
+            voted: Iterable[str] = (),
+            dropped: Iterable[str] = ()
+    ):
+        """Queue changes for the next sweep"""
+        self._counts.update(counts or {})
+        self._voted.update(voted)
+        self._dropped.update(dropped)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def pending(self) -> bool:
+        return bool(self._counts or self._voted or self._dropped)
+
+    async def stop(self):
+        """Cancel the sweep in progress; pages it would have fixed expire with their TTL"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._counts, self._voted, self._dropped = {}, set(), set()
+
+    async def _run(self):
+        try:
+            while self.pending():
+                counts, voted, dropped = self._counts, self._voted, self._dropped
+                self._counts, self._voted, self._dropped = {}, set(), set()
+                try:
+                    await self._sweep(counts, voted, dropped)
+                except Exception:
+                    logger.exception("Listing sweep failed")
+        finally:
+            self._task = None
+
+    async def _sweep(self, counts: Dict[str, Tuple[int, int]], voted: Set[str], dropped: Set[str]):
+        cache, versions = self._listing_cache, self._listing_versions
+        if self._vote_buffer is not None and counts:
+            await self._vote_buffer.wait_flushed()
+            if versions is not None and voted:
+                await versions.bump_categories(voted)
+        if not self._delay:
+            return
+        await asyncio.sleep(self._delay)
+        if cache is not None:
+            for idea_id, (upvotes, downvotes) in counts.items():
+                await cache.refresh_counts(idea_id, upvotes, downvotes)
+            if dropped:
+                await cache.invalidate_categories(dropped)
+        if versions is not None and (voted or dropped):
+            # Not before the cache is patched, as after commit
+            await versions.bump_categories(voted | dropped)
+
+
+listing_sweep = ListingSweep()
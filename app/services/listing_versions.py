@@ -0,0 +1,138 @@
+# app/services/listing_versions.py
+"""
+Version counters behind the ``ETag`` of ``GET /api/ideas``.
+
+A listing of (category, sort) is versioned by two counters: one per
+category, bumped after commit whenever an idea of it is submitted
+approved, approved or un-approved, or voted on, and one per sort, bumped
+when a sort's order changes on its own (the hot score job). The unfiltered
+listing has its own category counter, bumped along with every category.
+Reading a validator is one dict lookup (or one Redis round trip), so
+``HTTPCacheMiddleware`` can answer ``If-None-Match`` with a 304 before any
+database work.
+
+Each counter also records when it was last bumped, which gives
+``Last-Modified`` and makes the ETag differ between a restarted worker or
+a flushed Redis and what it served before.
+
+The in-process backend is per worker and cannot see the other workers'
+bumps; its validators roll over every ``max_stale`` seconds so a stale
+``304`` can last no longer than a listing cache entry. ``RedisVersionBackend``
+shares the counters between workers.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple
+
+from app.config import settings
+
+ALL_CATEGORIES = "*"
+
+
+class VersionBackend(Protocol):
+    async def get(self, keys: List[str]) -> List[Tuple[int, float]]:
+        """(version, last bumped as a Unix time) per key"""
+
+    async def bump(self, keys: Iterable[str]) -> None: ...
+
+
+class MemoryVersionBackend:
+    def __init__(self, max_stale: float = 0.0):
+        self.max_stale = max_stale
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        # Counters nobody has bumped yet date from this worker's start
+        self._started = time.time()
+
+    async def get(self, keys: List[str]) -> List[Tuple[int, float]]:
+        floor = self._started
+        if self.max_stale:
+            now = time.time()
+            floor = max(floor, now - now % self.max_stale)
+        return [
+            (version, max(modified, floor))
+            for version, modified in (self._versions.get(key, (0, self._started)) for key in keys)
+        ]
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        now = time.time()
+        for key in keys:
+            version, _ = self._versions.get(key, (0, now))
+            self._versions[key] = (version + 1, now)
+
+
+class RedisVersionBackend:
+    """Shared counters in two hashes, over a ``redis.asyncio.Redis``-compatible client"""
+
+    def __init__(self, client, prefix: str = "ideahub:versions"):
+        self.client = client
+        self.versions_key = f"{prefix}:version"
+        self.modified_key = f"{prefix}:modified"
+
+    async def get(self, keys: List[str]) -> List[Tuple[int, float]]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hmget(self.versions_key, keys)
+        pipe.hmget(self.modified_key, keys)
+        versions, modified = await pipe.execute()
+
+        result = []
+        for key, version, bumped in zip(keys, versions, modified):
+            if bumped is None:
+                # First sight of this counter (or Redis lost it): date it now
+                # so its validators cannot match anything served before
+                now = time.time()
+                if not await self.client.hsetnx(self.modified_key, key, repr(now)):
+                    now = float(await self.client.hget(self.modified_key, key))
+                bumped = now
+            result.append((int(version or 0), float(bumped)))
+        return result
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        now = repr(time.time())
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.hincrby(self.versions_key, key, 1)
+        pipe.hset(self.modified_key, mapping={key: now for key in keys})
+        await pipe.execute()
+
+
+class ListingVersions:
+    def __init__(self, backend: VersionBackend):
+        self.backend = backend
+
+    @staticmethod
+    def keys(category: Optional[str], sort: str) -> List[str]:
+        return [f"cat:{category or ALL_CATEGORIES}", f"sort:{sort}"]
+
+    async def current(self, category: Optional[str], sort: str) -> Tuple[str, float]:
+        """(ETag, Last-Modified as a Unix time) of the listing of ``category`` by ``sort``"""
+        (category_version, category_modified), (sort_version, sort_modified) = await self.backend.get(
+            self.keys(category, sort)
+        )
+        modified = max(category_modified, sort_modified)
+        # Weak: compressed and identity bodies of one version are equivalent, not identical
+        return f'W/"{category_version:x}.{sort_version:x}.{int(modified * 1000):x}"', modified
+
+    async def bump_categories(self, categories: Iterable[Optional[str]]) -> None:
+        """Invalidate every listing an idea of these categories appears or could appear on"""
+        await self.backend.bump(
+            {f"cat:{category or ALL_CATEGORIES}" for category in categories} | {f"cat:{ALL_CATEGORIES}"}
+        )
+
+    async def bump_sort(self, sort: str) -> None:
+        """Invalidate the listings ordered by ``sort``, in every category"""
+        await self.backend.bump([f"sort:{sort}"])
+
+
+def create_listing_versions() -> ListingVersions:
+    if settings.HTTP_CACHE_BACKEND == "redis":
+        # Optional dependency, only needed for the shared backend
+        import redis.asyncio as redis
+        backend = RedisVersionBackend(redis.from_url(settings.HTTP_CACHE_REDIS_URL))
+    else:
+        backend = MemoryVersionBackend(settings.HTTP_CACHE_MAX_STALE_SECONDS)
+    return ListingVersions(backend)
+
+
+listing_versions = create_listing_versions()
@@ -0,0 +1,130 @@
+# app/services/ranking.py
+"""
+Stored ranking scores for approved ideas.
+
+``net_score``, ``wilson_score`` and ``controversy`` are pure functions of
+the vote counters and are rewritten in the same UPDATE that changes the
+counters. ``hot_score`` also depends on the idea's age, so it is refreshed
+in bulk by ``recompute_hot_scores`` on a timer.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.idea import Idea
+from app.services.listing_versions import ListingVersions
+
+logger = logging.getLogger(__name__)
+
+# 95% confidence for the Wilson score interval
+WILSON_Z = 1.96
+# Hacker News style decay: score / (age_hours + 2) ** gravity
+HOT_GRAVITY = 1.8
+
+
+def score_values(upvotes, downvotes) -> List[Tuple]:
+    """
+    ``(column, expression)`` pairs for the stored scores, given SQL
+    expressions for the *new* counter values.
+
+    Meant for ``update().ordered_values()`` ahead of the counter columns
+    themselves: MySQL evaluates single-table SET clauses left to right, so
+    the scores must be assigned while the counters still hold old values.
+    """
+    up = upvotes * 1.0
+    down = downvotes * 1.0
+    total = up + down
+    z2 = WILSON_Z * WILSON_Z
+
+    wilson = case(
+        (total == 0, 0.0),
+        else_=(up + z2 / 2 - WILSON_Z * func.sqrt(up * down / total + z2 / 4)) / (total + z2)
+    )
+    # magnitude ** balance: many votes split evenly scores highest
+    controversy = case(
+        ((up <= 0) | (down <= 0), 0.0),
+        (up > down, func.power(total, down / up)),
+        else_=func.power(total, up / down)
+    )
+    return [
+        (Idea.net_score, upvotes - downvotes),
+        (Idea.wilson_score, wilson),
+        (Idea.controversy, controversy),
+    ]
+
+
+def hot_divisor(created_at: Optional[datetime], now: datetime) -> float:
+    age_hours = 0.0
+    if created_at is not None:
+        age_hours = max((now - created_at).total_seconds(), 0.0) / 3600
+    return (age_hours + 2) ** HOT_GRAVITY
+
+
+async def recompute_hot_scores(
+        session_factory: async_sessionmaker,
+        batch_size: int = 1000,
+        now: Optional[datetime] = None
+) -> int:
+    """
+    Refresh ``hot_score`` for all approved ideas in primary-key batches,
+    one short transaction per batch. Returns the number of rows updated.
+    """
+    now = now or datetime.utcnow()
+    table = Idea.__table__
+    # hot_score is derived from the live net_score, so a vote landing
+    # between the SELECT and the UPDATE is never overwritten
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam('b_id'))
+        .values(
+            hot_score=table.c.net_score / bindparam('b_divisor'),
+            updated_at=table.c.updated_at
+        )
+    )
+
+    updated = 0
+    last_id = ''
+    while True:
+        async with session_factory() as session, session.begin():
+            rows = (await session.execute(
+                select(Idea.id, Idea.created_at)
+                .where(Idea.status == 'approved', Idea.id > last_id)
+                .order_by(Idea.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                return updated
+
+            await session.execute(
+                stmt,
+                [{'b_id': row.id, 'b_divisor': hot_divisor(row.created_at, now)} for row in rows]
+            )
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+async def hot_score_job(
+        session_factory: async_sessionmaker,
+        interval: float,
+        batch_size: int,
+        versions: Optional[ListingVersions] = None
+):
+    """
+    Background task: recompute hot scores every ``interval`` seconds,
+    bumping the ``hot`` listing version whenever scores changed.
+    """
+    while True:
+        try:
+            updated = await recompute_hot_scores(session_factory, batch_size)
+            logger.debug("Recomputed hot scores for %d ideas", updated)
+            if updated and versions is not None:
+                await versions.bump_sort('hot')
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Hot score recomputation failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,362 @@
+# app/services/rate_limit.py
+"""
+Token-bucket rate limiting storage for the slowapi limiters.
+
+slowapi delegates every check to a ``limits`` strategy, so this module
+registers a ``token-bucket`` strategy plus three storage schemes it can
+run on, selected through the limiter's ``storage_uri``:
+
+* ``bucket-memory://`` - per worker, bounded LRU of buckets; a bucket is
+  dropped once it would have refilled completely anyway.
+* ``bucket-mmap:///path?slots=N`` - a fixed-size table in a shared memory
+  mapped file, so every worker on the host enforces one limit. Slots are
+  grouped into stripes guarded by ``fcntl`` byte-range locks.
+* ``bucket-redis://host:port/db`` - a single Lua script per check, so
+  workers on different hosts share limits at one round trip each. Any
+  client with the ``redis.Redis`` API (e.g. ``fakeredis[lua]``) can be
+  passed as the ``client`` storage option instead.
+
+A limit of ``N/period`` becomes a bucket holding ``N`` tokens that refills
+at ``N/period`` tokens per second. Each backend refills and spends in one
+atomic step. Storage errors fail open: a broken backend must not take the
+API down with it.
+"""
+import abc
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+import urllib.parse
+from typing import NamedTuple, Optional
+
+from limits import RateLimitItem
+from limits.errors import ConfigurationError
+from limits.storage import Storage
+from limits.strategies import STRATEGIES, RateLimiter
+from limits.util import WindowStats
+from slowapi import Limiter
+
+from app.config import settings
+from app.metrics import RATE_LIMIT_DECISION_SECONDS, RATE_LIMIT_DECISIONS
+from app.utils.stages import stage
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class Bucket(NamedTuple):
+    allowed: bool
+    # Tokens left after this decision
+    remaining: float
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class BucketStorage(Storage):
+    """
+    Base for storages that keep token buckets instead of window counters.
+
+    They are for the ``token-bucket`` strategy only, which talks to them
+    through ``acquire``. The window counters of the ``limits`` storage
+    interface (``incr``, ``get``, ``get_expiry``) have no meaning for a
+    bucket and always raise; ``create_limiter`` pairs the two, and
+    ``TokenBucketRateLimiter`` refuses any other storage when the limiter
+    is built.
+    """
+
+    @property
+    def base_exceptions(self):
+        return Exception
+
+    @abc.abstractmethod
+    def acquire(self, key: str, capacity: float, rate: float, cost: float) -> Bucket:
+        """Refill ``key`` and take ``cost`` tokens from it if enough are left"""
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        raise NotImplementedError("bucket storages only support the token-bucket strategy")
+
+    def get(self, key: str) -> int:
+        raise NotImplementedError("bucket storages only support the token-bucket strategy")
+
+    def get_expiry(self, key: str) -> float:
+        raise NotImplementedError("bucket storages only support the token-bucket strategy")
+
+    def check(self) -> bool:
+        return True
+
+
+class MemoryBucketStorage(BucketStorage):
+    STORAGE_SCHEME = ["bucket-memory"]
+
+    def __init__(self, uri: Optional[str] = None, max_keys: int = 100000, **options):
+        super().__init__(uri, **options)
+        self.backend = "memory"
+        # key -> (tokens, updated); expires when the bucket would be full again
+        self._buckets = TTLCache(maxsize=int(max_keys), ttl=0)
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: float) -> Bucket:
+        now = time.time()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = _refill(tokens, updated, now, capacity, rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        if cost:
+            self._buckets.set(key, (tokens, now), ttl=(capacity - tokens) / rate)
+        return Bucket(allowed, tokens)
+
+    def reset(self) -> Optional[int]:
+        count = len(self._buckets)
+        self._buckets.clear()
+        return count
+
+    def clear(self, key: str) -> None:
+        self._buckets.pop(key)
+
+
+class MmapBucketStorage(BucketStorage):
+    """
+    Buckets in a memory mapped file shared by every process that opens it.
+
+    Each key hashes to one stripe of ``STRIPE_SLOTS`` slots and is placed
+    by linear probing inside it; a full stripe recycles its least recently
+    updated slot. A check costs one byte-range lock on that stripe.
+    """
+
+    STORAGE_SCHEME = ["bucket-mmap"]
+    STRIPE_SLOTS = 32
+    # key fingerprint (0 = free), tokens, updated (epoch seconds)
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, uri: str, slots: int = 65536, **options):
+        super().__init__(uri, **options)
+        self.backend = "mmap"
+        parsed = urllib.parse.urlparse(uri)
+        self.path = parsed.path
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        slots = int(query.get("slots", slots))
+        self.stripes = max(1, -(-slots // self.STRIPE_SLOTS))
+        self.stripe_size = self.STRIPE_SLOTS * self.SLOT.size
+        self.size = self.stripes * self.stripe_size
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _open(self) -> mmap.mmap:
+        if self._map is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < self.size:
+                    os.ftruncate(fd, self.size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, self.size, mmap.MAP_SHARED)
+        return self._map
+
+    def _locate(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        fingerprint = int.from_bytes(digest[:8], "little") or 1
+        stripe = int.from_bytes(digest[8:], "little") % self.stripes
+        return fingerprint, stripe
+
+    def _find_slot(self, mapped: mmap.mmap, stripe_offset: int, fingerprint: int, start: int):
+        """Offset of ``fingerprint``'s slot in the stripe, and its (tokens, updated) if present"""
+        oldest_offset, oldest_updated = None, None
+        for probe in range(self.STRIPE_SLOTS):
+            offset = stripe_offset + ((start + probe) % self.STRIPE_SLOTS) * self.SLOT.size
+            slot_key, tokens, updated = self.SLOT.unpack_from(mapped, offset)
+            if slot_key == fingerprint:
+                return offset, (tokens, updated)
+            if slot_key == 0:
+                return offset, None
+            if oldest_updated is None or updated < oldest_updated:
+                oldest_offset, oldest_updated = offset, updated
+        return oldest_offset, None
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: float) -> Bucket:
+        mapped = self._open()
+        fingerprint, stripe = self._locate(key)
+        stripe_offset = stripe * self.stripe_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.stripe_size, stripe_offset)
+        try:
+            now = time.time()
+            offset, state = self._find_slot(mapped, stripe_offset, fingerprint, fingerprint % self.STRIPE_SLOTS)
+            tokens, updated = state if state is not None else (capacity, now)
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            if cost:
+                self.SLOT.pack_into(mapped, offset, fingerprint, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.stripe_size, stripe_offset)
+        return Bucket(allowed, tokens)
+
+    def check(self) -> bool:
+        try:
+            self._open()
+        except OSError:
+            return False
+        return True
+
+    def reset(self) -> Optional[int]:
+        mapped = self._open()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            mapped[:] = bytes(self.size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return None
+
+    def clear(self, key: str) -> None:
+        mapped = self._open()
+        fingerprint, stripe = self._locate(key)
+        stripe_offset = stripe * self.stripe_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.stripe_size, stripe_offset)
+        try:
+            offset, state = self._find_slot(mapped, stripe_offset, fingerprint, fingerprint % self.STRIPE_SLOTS)
+            if state is not None:
+                # A full bucket behaves exactly like a missing one
+                self.SLOT.pack_into(mapped, offset, fingerprint, float("inf"), 0.0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.stripe_size, stripe_offset)
+
+
+# KEYS[1] bucket; ARGV capacity, refill rate (tokens/s), cost. Uses the
+# server clock so every client agrees on elapsed time.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+if cost > 0 then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+end
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStorage(BucketStorage):
+    STORAGE_SCHEME = ["bucket-redis", "bucket-rediss"]
+
+    def __init__(self, uri: str, client=None, prefix: str = "ideahub:ratelimit", **options):
+        super().__init__(uri, **options)
+        self.backend = "redis"
+        if client is None:
+            # Optional dependency, only needed for the shared backend
+            import redis
+            client = redis.Redis.from_url(uri.replace("bucket-", "", 1))
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: float) -> Bucket:
+        allowed, tokens = self._script(keys=[f"{self.prefix}:{key}"], args=[capacity, rate, cost])
+        return Bucket(bool(allowed), float(tokens))
+
+    def check(self) -> bool:
+        try:
+            return bool(self.client.ping())
+        except Exception:
+            return False
+
+    def reset(self) -> Optional[int]:
+        count = 0
+        for key in self.client.scan_iter(match=f"{self.prefix}:*"):
+            count += self.client.delete(key)
+        return count
+
+    def clear(self, key: str) -> None:
+        self.client.delete(f"{self.prefix}:{key}")
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """``limits`` strategy spending from a ``BucketStorage`` token bucket"""
+
+    def __init__(self, storage: Storage):
+        if not isinstance(storage, BucketStorage):
+            raise ConfigurationError(
+                f"the token-bucket strategy needs a bucket-* storage, not {type(storage).__name__}"
+            )
+        super().__init__(storage)
+
+    def _acquire(self, item: RateLimitItem, identifiers, cost: float) -> Optional[Bucket]:
+        # slowapi scopes limits by request path, too many values for a label
+        limit = str(item)
+        backend = getattr(self.storage, "backend", type(self.storage).__name__)
+        capacity = item.amount
+        started = time.perf_counter()
+        try:
+            with stage("security", "rate_limit"):
+                bucket = self.storage.acquire(
+                    item.key_for(*identifiers), capacity, capacity / item.get_expiry(), cost
+                )
+        except Exception:
+            logger.exception("Rate limit storage %s failed; allowing request", backend)
+            RATE_LIMIT_DECISIONS.labels(limit, "error").inc()
+            return None
+        finally:
+            RATE_LIMIT_DECISION_SECONDS.labels(backend).observe(time.perf_counter() - started)
+        if cost:
+            RATE_LIMIT_DECISIONS.labels(limit, "allowed" if bucket.allowed else "rejected").inc()
+        return bucket
+
+    def hit(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        bucket = self._acquire(item, identifiers, cost)
+        return bucket is None or bucket.allowed
+
+    def test(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        bucket = self._acquire(item, identifiers, 0)
+        return bucket is None or bucket.remaining >= cost
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: str) -> WindowStats:
+        bucket = self._acquire(item, identifiers, 0)
+        if bucket is None:
+            return WindowStats(time.time(), item.amount)
+        refill_seconds = (item.amount - bucket.remaining) * item.get_expiry() / item.amount
+        return WindowStats(time.time() + refill_seconds, int(bucket.remaining))
+
+
+STRATEGIES["token-bucket"] = TokenBucketRateLimiter
+
+
+def rate_limit_storage_uri() -> str:
+    """``storage_uri`` for the configured ``RATE_LIMIT_BACKEND``"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return "bucket-" + settings.RATE_LIMIT_REDIS_URL
+    if settings.RATE_LIMIT_BACKEND == "mmap":
+        return f"bucket-mmap://{settings.RATE_LIMIT_MMAP_PATH}?slots={settings.RATE_LIMIT_MMAP_SLOTS}"
+    return "bucket-memory://"
+
+
+def rate_limit_storage_options() -> dict:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return {"max_keys": settings.RATE_LIMIT_MEMORY_MAX_KEYS}
+    return {}
+
+
+def create_limiter(key_func) -> Limiter:
+    """slowapi limiter spending from token buckets on the configured storage"""
+    return Limiter(
+        key_func=key_func,
+        strategy="token-bucket",
+        storage_uri=rate_limit_storage_uri(),
+        storage_options=rate_limit_storage_options()
+    )
@@ -0,0 +1,306 @@
+# app/services/search.py
+"""
+Full-text search over approved ideas.
+
+On MySQL, ``fulltext_search`` ranks with ``MATCH (title, summary, details)
+AGAINST (... IN NATURAL LANGUAGE MODE)`` on the ``ft_ideas_search`` index.
+Other dialects (SQLite test and benchmark databases) have no such index, so
+``InvertedIndex`` stands in: a per-worker, pure-Python index built from the
+``ideas`` table on first use and extended as ideas are submitted through
+this worker. Ideas submitted through other workers are picked up by the
+next search after ``refresh_interval`` seconds, which indexes everything
+created past a (created_at, id) watermark. It ranks with BM25 over every
+idea and leaves the approval check to the database, so moderation never
+has to touch it.
+
+Both rank by relevance and page with the same (relevance, id) cursor.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import re
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Row, and_, or_, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.idea import Idea
+from app.utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+CURSOR_KIND = 'search'
+
+# Mirrors InnoDB's defaults (innodb_ft_min_token_size, default stopword list)
+MIN_TOKEN_LENGTH = 3
+STOPWORDS = frozenset((
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www',
+))
+_TOKEN = re.compile(r"\w+")
+
+# Rescanned behind the watermark, for ideas committed after a later-created one
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in _TOKEN.findall(text.lower())
+        if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS
+    ]
+
+
+def has_fulltext(db: AsyncSession) -> bool:
+    """Whether ``db`` has the ``ft_ideas_search`` FULLTEXT index"""
+    return db.get_bind().dialect.name in ('mysql', 'mariadb')
+
+
+def encode_search_cursor(relevance: float, idea_id: str) -> str:
+    return encode_cursor(CURSOR_KIND, (relevance, idea_id))
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str]:
+    relevance, idea_id = decode_cursor(cursor, CURSOR_KIND, (float, str))
+    return float(relevance), idea_id
+
+
+async def fulltext_search(
+        db: AsyncSession,
+        columns,
+        query: str,
+        category: Optional[str],
+        per_page: int,
+        after: Optional[Tuple[float, str]]
+) -> List[Row]:
+    """MySQL: ``columns`` plus ``relevance`` for the best approved matches after ``after``"""
+    relevance = match(Idea.title, Idea.summary, Idea.details, against=query).in_natural_language_mode()
+    stmt = select(*columns, relevance.label('relevance')).where(Idea.status == 'approved', relevance > 0)
+    if category:
+        stmt = stmt.where(Idea.category == category)
+    if after is not None:
+        last_relevance, last_id = after
+        stmt = stmt.where(or_(
+            relevance < last_relevance,
+            and_(relevance == last_relevance, Idea.id > last_id)
+        ))
+    stmt = stmt.order_by(relevance.desc(), Idea.id.asc()).limit(per_page)
+    return list((await db.execute(stmt)).all())
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over idea title, summary and details.
+
+    Ideas are numbered in insertion order; each term's postings are two
+    parallel arrays (idea numbers, term frequencies), about 6 bytes per
+    entry, so a million ideas fit in well under a GB. Equal scores are
+    ordered by idea number. Not thread-safe; used from the event loop.
+    """
+
+    def __init__(self, refresh_interval: float = 5.0):
+        self.refresh_interval = refresh_interval
+        self._lock = asyncio.Lock()
+        self.loaded = False
+        self._refreshed_at = 0.0
+        self._clear()
+
+    def _clear(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_ids: List[str] = []
+        self._categories: List[Optional[str]] = []
+        self._lengths = array('I')
+        # BM25 length normalisation per idea, for _norm_average
+        self._norms = array('d')
+        self._norm_average = 1.0
+        self._docs: Dict[str, int] = {}
+        self._total_length = 0
+        # (created_at, id) of the newest idea read from the table
+        self.watermark: Optional[Tuple[datetime, str]] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, idea_id: str, category: str, title: str, summary: str, details: str):
+        """Index (or re-index) one idea"""
+        if idea_id in self._docs:
+            self._remove(self._docs[idea_id])
+        doc = len(self._doc_ids)
+        terms = Counter(tokenize(f"{title} {summary} {details}"))
+        length = sum(terms.values())
+        self._doc_ids.append(idea_id)
+        self._categories.append(category)
+        self._lengths.append(length)
+        self._norms.append(_K1 * (1 - _B + _B * length / self._norm_average))
+        self._docs[idea_id] = doc
+        self._total_length += length
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('I'), array('H'))
+            postings[0].append(doc)
+            postings[1].append(min(frequency, 65535))
+
+    def _remove(self, doc: int):
+        # Postings of a superseded slot are left in place; ranking skips
+        # slots whose category has been cleared
+        self._total_length -= self._lengths[doc]
+        self._lengths[doc] = 0
+        self._categories[doc] = None
+
+    def _refresh_norms(self):
+        # Recomputed only once the average length has drifted by 5%
+        average = self._total_length / len(self._docs) or 1.0
+        if abs(average - self._norm_average) > 0.05 * self._norm_average:
+            self._norm_average = average
+            self._norms = array('d', (_K1 * (1 - _B + _B * length / average) for length in self._lengths))
+
+    async def ensure_loaded(self, db: AsyncSession, batch_size: int = 5000):
+        """Build the index from the ``ideas`` table on first use"""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            # Ideas submitted while this runs are added on commit, and adding
+            # one the scan also returns just re-indexes it
+            self._clear()
+            result = await db.stream(
+                select(Idea.id, Idea.category, Idea.title, Idea.summary, Idea.details, Idea.created_at)
+                .order_by(Idea.created_at, Idea.id)
+                .execution_options(yield_per=batch_size)
+            )
+            async for row in result:
+                self.add(row.id, row.category, row.title, row.summary, row.details)
+                if row.created_at is not None:
+                    self.watermark = (row.created_at, row.id)
+            self._refresh_norms()
+            self._refreshed_at = time.monotonic()
+            self.loaded = True
+            logger.info("Built in-memory search index over %d ideas", len(self))
+
+    async def refresh(self, db: AsyncSession, batch_size: int = 1000) -> int:
+        """Index ideas created since the watermark; returns how many were added"""
+        async with self._lock:
+            self._refreshed_at = time.monotonic()
+            added = 0
+            start = self.watermark
+            if start is not None:
+                start = (start[0] - REFRESH_OVERLAP, start[1])
+            while True:
+                stmt = (
+                    select(Idea.id, Idea.category, Idea.title, Idea.summary, Idea.details, Idea.created_at)
+                    .where(Idea.created_at.isnot(None))
+                )
+                if start is not None:
+                    stmt = stmt.where(
+                        Idea.created_at >= start[0],
+                        or_(Idea.created_at > start[0], Idea.id > start[1])
+                    )
+                rows = (await db.execute(stmt.order_by(Idea.created_at, Idea.id).limit(batch_size))).all()
+                for row in rows:
+                    # Ideas already indexed, e.g. submitted through this worker, are skipped
+                    if row.id not in self._docs:
+                        self.add(row.id, row.category, row.title, row.summary, row.details)
+                        added += 1
+                if rows and (self.watermark is None or (rows[-1].created_at, rows[-1].id) > self.watermark):
+                    self.watermark = (rows[-1].created_at, rows[-1].id)
+                if len(rows) < batch_size:
+                    return added
+                start = (rows[-1].created_at, rows[-1].id)
+
+    def ranked(
+            self,
+            query: str,
+            category: Optional[str] = None,
+            after: Optional[Tuple[float, str]] = None,
+            first: int = 20
+    ) -> Iterator[Tuple[float, str]]:
+        """
+        (score, idea_id) of the ideas matching ``query`` after ``after``,
+        best first. Only the best ``first`` are selected up front; the rest
+        are sorted if the caller reads past them.
+        """
+        live = len(self._docs)
+        if not live:
+            return
+        self._refresh_norms()
+        norms = self._norms
+        scores: Dict[int, float] = {}
+        # Fixed term order keeps float sums, and so cursors, reproducible
+        for term in sorted(set(tokenize(query))):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            docs, frequencies = postings
+            weight = (_K1 + 1) * math.log(1 + (live - len(docs) + 0.5) / (len(docs) + 0.5))
+            if not scores:
+                scores = {doc: weight * tf / (tf + norms[doc]) for doc, tf in zip(docs, frequencies)}
+                continue
+            get = scores.get
+            for doc, tf in zip(docs, frequencies):
+                scores[doc] = get(doc, 0.0) + weight * tf / (tf + norms[doc])
+
+        categories = self._categories
+        keys = [
+            (-score, doc) for doc, score in scores.items()
+            if categories[doc] is not None and (not category or categories[doc] == category)
+        ]
+        if after is not None:
+            last = (-after[0], self._docs.get(after[1], -1))
+            keys = [key for key in keys if key > last]
+
+        doc_ids = self._doc_ids
+        head = heapq.nsmallest(first, keys)
+        for negative_score, doc in head:
+            yield -negative_score, doc_ids[doc]
+        if len(head) < len(keys):
+            for negative_score, doc in sorted(keys)[len(head):]:
+                yield -negative_score, doc_ids[doc]
+
+    async def search(
+            self,
+            db: AsyncSession,
+            columns,
+            query: str,
+            category: Optional[str],
+            per_page: int,
+            after: Optional[Tuple[float, str]]
+    ) -> List[Tuple[Row, float]]:
+        """(row of ``columns``, relevance) for the best approved matches after ``after``"""
+        await self.ensure_loaded(db)
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            await self.refresh(db)
+        candidates = self.ranked(query, category, after, first=per_page * 2)
+
+        results = []
+        while len(results) < per_page:
+            chunk = [candidate for _, candidate in zip(range(per_page * 2), candidates)]
+            if not chunk:
+                break
+            # Status is checked here rather than in SQL, where SQLite's planner
+            # would rather scan the status index than look up the ids
+            rows = await db.execute(
+                select(*columns, Idea.status).where(Idea.id.in_([idea_id for _, idea_id in chunk]))
+            )
+            by_id = {row.id: row for row in rows if row.status == 'approved'}
+            for score, idea_id in chunk:
+                if idea_id in by_id:
+                    results.append((by_id[idea_id], score))
+                    if len(results) == per_page:
+                        break
+        return results
+
+
+search_index = InvertedIndex(settings.SEARCH_FALLBACK_REFRESH_SECONDS)
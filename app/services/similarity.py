@@ -0,0 +1,421 @@
+# app/services/similarity.py
+"""
+Near-duplicate detection for ideas with a MinHash LSH index.
+
+An idea's shingles are the content words of its title and summary
+(tokenized as for search) plus adjacent word pairs. Its signature holds
+``NUM_PERM`` 16-bit minima, one SHAKE-128 digest per shingle supplying
+all ``NUM_PERM`` hash functions at once. Signatures are cut into
+``BANDS`` bands of ``ROWS`` values; ideas sharing any band are candidates,
+ranked by the share of equal signature values, which estimates their
+Jaccard similarity. With 16 bands of 4, a pair at similarity 0.5 becomes
+a candidate 64% of the time, at 0.8 more than 99.9%.
+
+The index is one sealed segment, memory-mapped read-only from
+``SIMILARITY_INDEX_PATH``, plus an in-memory tail of ideas added since:
+
+    header | idea ids (16-byte UUIDs) | signatures (uint16 x NUM_PERM)
+           | per band: sorted uint32 band keys, uint32 idea numbers
+
+``save`` merges the tail into a new file, written aside and renamed into
+place, so pre-forked workers share one copy in the page cache. Each
+worker warm-loads the file at startup and catches up on newer ideas from
+the database by (created_at, id) watermark on a timer. Only the worker
+running the host jobs (``RUN_HOST_JOBS``) saves; the others reload the
+file whenever it has been replaced.
+"""
+import asyncio
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from operator import eq
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.models.idea import Idea
+from app.services.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_MAGIC = b"IHMH"
+_VERSION = 1
+# magic, version, num_perm, bands, count, watermark (epoch seconds, 0 = none), watermark id
+_HEADER = struct.Struct("<4sHHH2xQd16s20x")
+_DIGEST = struct.Struct(f"<{NUM_PERM}H")
+_EPOCH = datetime(1970, 1, 1)
+
+# Ideas created this long before the watermark are rescanned, in case they
+# committed after a refresh had already passed them
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+
+def shingles(text: str) -> set:
+    tokens = tokenize(text)
+    return set(tokens).union(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+
+
+def signature(text: str) -> Optional[array]:
+    """MinHash signature of ``text``, or None when it has no content words"""
+    digests = [_DIGEST.unpack(hashlib.shake_128(shingle.encode()).digest(_DIGEST.size)) for shingle in shingles(text)]
+    if not digests:
+        return None
+    return array('H', map(min, zip(*digests)))
+
+
+def idea_text(title: str, summary: str) -> str:
+    return f"{title} {summary}"
+
+
+def _band_keys(sig) -> List[int]:
+    return [zlib.crc32(sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class _Segment:
+    """Read-only view of an index file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        # Saving replaces the file, so a new (device, inode) means a newer index
+        self.file_id = (stat.st_dev, stat.st_ino)
+        view = memoryview(self._map)
+        magic, version, num_perm, bands, count, watermark_ts, watermark_id = _HEADER.unpack_from(view)
+        if (magic, version, num_perm, bands) != (_MAGIC, _VERSION, NUM_PERM, BANDS):
+            self.close()
+            raise ValueError("incompatible similarity index file")
+        self.count = count
+        self.watermark = (
+            (_EPOCH + timedelta(seconds=watermark_ts), str(uuid.UUID(bytes=watermark_id)))
+            if watermark_ts else None
+        )
+        offset = _HEADER.size
+        self.ids = view[offset:offset + 16 * count]
+        offset += 16 * count
+        self.signatures = view[offset:offset + 2 * NUM_PERM * count].cast('H')
+        offset += 2 * NUM_PERM * count
+        self.band_keys = []
+        self.band_docs = []
+        for _ in range(BANDS):
+            self.band_keys.append(view[offset:offset + 4 * count].cast('I'))
+            offset += 4 * count
+            self.band_docs.append(view[offset:offset + 4 * count].cast('I'))
+            offset += 4 * count
+        if offset > len(view):
+            self.close()
+            raise ValueError("truncated similarity index file")
+
+    def close(self):
+        # Views must be released before the map can be closed
+        for name in ("ids", "signatures", "band_keys", "band_docs"):
+            views = getattr(self, name, None)
+            for item in views if isinstance(views, list) else [views]:
+                if item is not None:
+                    item.release()
+        self._map.close()
+
+
+class MinHashIndex:
+    """
+    MinHash LSH index of idea ids. Ideas are numbered in insertion order;
+    the sealed segment holds the first ``segment.count`` of them and the
+    tail the rest. Not thread-safe; used from the event loop.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self._segment: Optional[_Segment] = None
+        self._tail_ids: List[bytes] = []
+        self._tail_signatures = array('H')
+        self._tail_bands: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+        # (created_at, id) of the newest idea indexed, and ideas added near it
+        self.watermark: Optional[Tuple[datetime, str]] = None
+        self._recent: Dict[str, datetime] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def _base_count(self) -> int:
+        return self._segment.count if self._segment is not None else 0
+
+    def __len__(self) -> int:
+        return self._base_count + len(self._tail_ids)
+
+    @property
+    def tail_size(self) -> int:
+        return len(self._tail_ids)
+
+    def load(self) -> bool:
+        """Map the saved index, if there is a compatible one; drops the tail"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            segment = _Segment(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring similarity index %s: %s", self.path, e)
+            return False
+        self._replace_segment(segment)
+        self.watermark = segment.watermark
+        # Ideas past the file's watermark were in the dropped tail; let refresh find them again
+        self._recent = {
+            idea_id: created_at for idea_id, created_at in self._recent.items()
+            if self.watermark is not None and (created_at, idea_id) <= self.watermark
+        }
+        logger.info("Loaded similarity index of %d ideas from %s", segment.count, self.path)
+        return True
+
+    def saved_elsewhere(self) -> bool:
+        """Whether another process has saved a newer index file than the one mapped"""
+        try:
+            stat = os.stat(self.path) if self.path else None
+        except OSError:
+            return False
+        if stat is None:
+            return False
+        return self._segment is None or self._segment.file_id != (stat.st_dev, stat.st_ino)
+
+    def _replace_segment(self, segment: Optional[_Segment]):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = segment
+        self._tail_ids = []
+        self._tail_signatures = array('H')
+        self._tail_bands = [{} for _ in range(BANDS)]
+
+    def add(self, idea_id: str, sig: array, created_at: Optional[datetime] = None):
+        """Index ``idea_id`` with signature ``sig`` (see ``signature``)"""
+        if idea_id in self._recent:
+            return
+        doc = len(self)
+        self._tail_ids.append(uuid.UUID(idea_id).bytes)
+        self._tail_signatures.extend(sig)
+        for band, key in enumerate(_band_keys(sig)):
+            self._tail_bands[band].setdefault(key, []).append(doc)
+        if created_at is not None:
+            self._recent[idea_id] = created_at
+            if self.watermark is None or (created_at, idea_id) > self.watermark:
+                self.watermark = (created_at, idea_id)
+
+    def _signature(self, doc: int):
+        base = self._base_count
+        if doc < base:
+            return self._segment.signatures[doc * NUM_PERM:(doc + 1) * NUM_PERM]
+        start = (doc - base) * NUM_PERM
+        return self._tail_signatures[start:start + NUM_PERM]
+
+    def _idea_id(self, doc: int) -> str:
+        base = self._base_count
+        raw = self._segment.ids[doc * 16:(doc + 1) * 16].tobytes() if doc < base else self._tail_ids[doc - base]
+        return str(uuid.UUID(bytes=raw))
+
+    def query(
+            self,
+            sig: array,
+            threshold: float,
+            limit: int = 10,
+            exclude: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """(idea_id, estimated similarity) of up to ``limit`` ideas at or above ``threshold``, best first"""
+        candidates = set()
+        segment = self._segment
+        for band, key in enumerate(_band_keys(sig)):
+            if segment is not None and segment.count:
+                keys = segment.band_keys[band]
+                start = bisect_left(keys, key)
+                if start < len(keys) and keys[start] == key:
+                    end = bisect_right(keys, key, start)
+                    candidates.update(segment.band_docs[band][start:end].tolist())
+            candidates.update(self._tail_bands[band].get(key, ()))
+
+        best: Dict[str, float] = {}
+        for doc in candidates:
+            similarity = sum(map(eq, sig, self._signature(doc))) / NUM_PERM
+            if similarity >= threshold:
+                idea_id = self._idea_id(doc)
+                if idea_id != exclude and similarity > best.get(idea_id, -1.0):
+                    best[idea_id] = similarity
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def save(self) -> bool:
+        """Merge the tail into a new index file and map it; returns whether anything was written"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return False
+        self._write_file(snapshot)
+        self._install(len(snapshot[1]))
+        return True
+
+    async def save_async(self) -> bool:
+        """``save`` with the file written from a worker thread"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return False
+        await asyncio.to_thread(self._write_file, snapshot)
+        self._install(len(snapshot[1]))
+        return True
+
+    def _snapshot(self):
+        # Taken on the event loop, so ideas added while the file is being
+        # written stay in the tail rather than racing the writer
+        if not self.path or (not self._tail_ids and self._segment is not None):
+            return None
+        tail_bands = [
+            sorted((key, doc) for key, docs in band.items() for doc in docs)
+            for band in self._tail_bands
+        ]
+        return (
+            self._segment, list(self._tail_ids), array('H', self._tail_signatures),
+            tail_bands, self.watermark
+        )
+
+    def _write_file(self, snapshot):
+        tmp_path = f"{self.path}.tmp"
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with open(tmp_path, "wb") as f:
+                self._write(f, *snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _write(f, segment, tail_ids, tail_signatures, tail_bands, watermark):
+        count = (segment.count if segment is not None else 0) + len(tail_ids)
+        if watermark is not None:
+            watermark_ts = (watermark[0] - _EPOCH).total_seconds()
+            watermark_id = uuid.UUID(watermark[1]).bytes
+        else:
+            watermark_ts, watermark_id = 0.0, bytes(16)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, NUM_PERM, BANDS, count, watermark_ts, watermark_id))
+        if segment is not None:
+            f.write(segment.ids)
+        f.write(b"".join(tail_ids))
+        if segment is not None:
+            f.write(segment.signatures)
+        f.write(tail_signatures)
+
+        for band, tail in enumerate(tail_bands):
+            # Sorted merge: slices of the sealed band between tail insertions
+            keys, docs = array('I'), array('I')
+            base_keys = segment.band_keys[band] if segment is not None else array('I')
+            base_docs = segment.band_docs[band] if segment is not None else array('I')
+            position = 0
+            for key, doc in tail:
+                insert_at = bisect_right(base_keys, key, position)
+                keys.frombytes(base_keys[position:insert_at].tobytes())
+                docs.frombytes(base_docs[position:insert_at].tobytes())
+                keys.append(key)
+                docs.append(doc)
+                position = insert_at
+            keys.frombytes(base_keys[position:].tobytes())
+            docs.frombytes(base_docs[position:].tobytes())
+            f.write(keys)
+            f.write(docs)
+
+    def _install(self, written: int):
+        """Map the file just written, keeping tail ideas added after the snapshot"""
+        ids = self._tail_ids[written:]
+        signatures = self._tail_signatures[written * NUM_PERM:]
+        self._replace_segment(_Segment(self.path))
+        self._tail_ids = ids
+        self._tail_signatures = signatures
+        base = self._segment.count
+        for offset in range(len(ids)):
+            sig = signatures[offset * NUM_PERM:(offset + 1) * NUM_PERM]
+            for band, key in enumerate(_band_keys(sig)):
+                self._tail_bands[band].setdefault(key, []).append(base + offset)
+        logger.info("Saved similarity index of %d ideas to %s", len(self), self.path)
+
+    def close(self):
+        self._replace_segment(None)
+
+    async def refresh(
+            self,
+            session_factory: async_sessionmaker,
+            batch_size: int = 1000,
+            max_tail: Optional[int] = None
+    ) -> int:
+        """
+        Index ideas created since the watermark; returns how many were added.
+        Stops early once the tail holds ``max_tail`` ideas, so that it can be
+        saved before catching up further (tail entries cost ~3KB each, sealed
+        ones 272 bytes).
+        """
+        async with self._lock:
+            added = 0
+            start = self.watermark
+            if start is not None:
+                start = (start[0] - REFRESH_OVERLAP, start[1])
+                # Forget ideas that can no longer show up in a rescan
+                self._recent = {
+                    idea_id: created_at for idea_id, created_at in self._recent.items()
+                    if created_at >= start[0]
+                }
+            while True:
+                stmt = select(Idea.id, Idea.title, Idea.summary, Idea.created_at).where(Idea.created_at.isnot(None))
+                if start is not None:
+                    stmt = stmt.where(
+                        Idea.created_at >= start[0],
+                        or_(Idea.created_at > start[0], Idea.id > start[1])
+                    )
+                stmt = stmt.order_by(Idea.created_at, Idea.id).limit(batch_size)
+                async with session_factory() as session:
+                    rows = (await session.execute(stmt)).all()
+                for row in rows:
+                    if row.id not in self._recent:
+                        sig = signature(idea_text(row.title, row.summary))
+                        if sig is not None:
+                            self.add(row.id, sig, row.created_at)
+                            added += 1
+                if len(rows) < batch_size or (max_tail is not None and self.tail_size >= max_tail):
+                    return added
+                start = (rows[-1].created_at, rows[-1].id)
+                # Building from scratch is CPU-bound; let requests through
+                await asyncio.sleep(0)
+
+
+async def similarity_job(
+        index: MinHashIndex,
+        session_factory: async_sessionmaker,
+        interval: float,
+        save_every: int,
+        save: bool = True
+):
+    """
+    Background task: catch up with new ideas every ``interval`` seconds,
+    saving as the tail grows. Without ``save`` (every worker but one), the
+    index is reloaded whenever the saving process has written a new file.
+    """
+    while True:
+        try:
+            added = 0
+            if not save and index.saved_elsewhere():
+                index.load()
+            while True:
+                added += await index.refresh(session_factory, max_tail=save_every if save else None)
+                if not save or index.tail_size < save_every or not await index.save_async():
+                    break
+            if added:
+                logger.debug("Indexed %d new ideas for similarity", added)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Similarity index refresh failed")
+        await asyncio.sleep(interval)
+
+
+similarity_index = MinHashIndex(settings.SIMILARITY_INDEX_PATH)
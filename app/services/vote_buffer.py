@@ -0,0 +1,301 @@
+# app/services/vote_buffer.py
+"""
+Optional write-behind aggregation of idea vote counters.
+
+Vote rows are still written in the request's transaction; only the
+``ideas`` counter/score update is deferred. Deltas are merged per idea in
+process memory once the vote commits, and a background task flushes them
+as a single ``UPDATE ... CASE`` every ``flush_interval`` seconds, or
+sooner once ``max_votes`` are pending. This turns a storm of row-locking
+updates on one hot idea into one update per flush.
+
+Counts returned to voters are this worker's best view (database base +
+in-flight + pending deltas); other workers' pending deltas show up after
+their next flush.
+
+The vote rows behind a delta are already committed, so a delta that still
+fails after ``max_retries`` flushes is not simply dropped: its idea's
+counters are recounted from ``votes`` by a later flush instead. The votes
+are counted under a lock that holds off new votes on the idea until the
+recount commits, and this buffer's deltas for it, all covered by then, are
+dropped as soon as it does. Other workers may still hold deltas for votes
+the recount included, so the idea is recounted once more by the next
+reconciliation pass, every ``reconcile_interval`` seconds, once they have
+flushed them; only votes buffered elsewhere at that very moment can still
+be counted twice. Recounts that keep failing are retried by those passes
+too rather than given up on.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.metrics import (
+    VOTE_BUFFER_BATCH_SIZE,
+    VOTE_BUFFER_DROPPED,
+    VOTE_BUFFER_FLUSH_LAG_SECONDS,
+    VOTE_BUFFER_PENDING,
+    VOTE_BUFFER_RETRIES,
+)
+from app.models.idea import Idea
+from app.services.votes import counter_deltas_update, recount_counters
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+Deltas = Dict[str, List[int]]
+
+
+class VoteBuffer:
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            flush_interval: float = 0.2,
+            max_votes: int = 500,
+            max_retries: int = 3,
+            reconcile_interval: float = 60.0,
+            base_ttl: float = 5.0
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_votes = max_votes
+        self.max_retries = max_retries
+        self.reconcile_interval = reconcile_interval
+        # idea_id -> (upvotes, downvotes, category) as last read from the database
+        self._base = TTLCache(maxsize=10000, ttl=base_ttl)
+        # idea_id -> [upvotes delta, downvotes delta, flush attempts, votes]
+        self._pending: Deltas = {}
+        self._inflight: Deltas = {}
+        # Ideas whose deltas ran out of retries, to recount from their votes
+        self._recount: Set[str] = set()
+        self._recount_attempts: Dict[str, int] = {}
+        # idea_id -> when to recount it again, by a reconciliation pass
+        self._reconcile: Dict[str, float] = {}
+        self._pending_votes = 0
+        self._oldest_pending: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        # Resolved by the end of the next flush to start
+        self._flush_waiters: List[asyncio.Future] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def _buffered(self, idea_id: str) -> Tuple[int, int]:
+        up = down = 0
+        for deltas in (self._inflight, self._pending):
+            if idea_id in deltas:
+                up += deltas[idea_id][0]
+                down += deltas[idea_id][1]
+        return up, down
+
+    async def record(self, db: AsyncSession, idea_id: str, deltas: Dict[str, int]) -> Optional[Tuple[int, int, str]]:
+        """
+        Queue ``deltas`` for an approved idea once ``db`` commits.
+
+        Returns the buffered (upvotes, downvotes) including this vote and
+        the idea's category, or None when no approved idea with that id
+        exists.
+        """
+        base = self._base.get(idea_id)
+        if base is None:
+            row = (await db.execute(
+                select(Idea.upvotes, Idea.downvotes, Idea.category)
+                .where(Idea.id == idea_id, Idea.status == 'approved')
+            )).first()
+            if row is None:
+                return None
+            base = (row.upvotes, row.downvotes, row.category)
+            self._base.set(idea_id, base)
+
+        up_delta, down_delta = deltas['upvotes'], deltas['downvotes']
+        if up_delta or down_delta:
+            # Only count the vote if the request's transaction actually lands
+            event.listen(
+                db.sync_session,
+                'after_commit',
+                lambda session: self._add(idea_id, up_delta, down_delta),
+                once=True
+            )
+
+        buffered_up, buffered_down = self._buffered(idea_id)
+        return (base[0] + buffered_up + up_delta, base[1] + buffered_down + down_delta, base[2])
+
+    def _add(self, idea_id: str, up_delta: int, down_delta: int, attempts: int = 0, votes: int = 1):
+        entry = self._pending.setdefault(idea_id, [0, 0, attempts, 0])
+        entry[0] += up_delta
+        entry[1] += down_delta
+        entry[2] = max(entry[2], attempts)
+        entry[3] += votes
+        self._pending_votes += votes
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+        VOTE_BUFFER_PENDING.set(self._pending_votes)
+        if self._pending_votes >= self.max_votes:
+            self._wakeup.set()
+
+    async def wait_flushed(self):
+        """Wait until the deltas queued so far are in the database (or dropped)"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._flush_waiters.append(waiter)
+        await waiter
+
+    async def flush(self) -> int:
+        """Write all pending deltas in one statement; returns ideas updated"""
+        waiters, self._flush_waiters = self._flush_waiters, []
+        updated = None
+        try:
+            updated = await self._flush()
+        finally:
+            if updated is None:
+                # Failed; the requeued deltas go out with a later flush
+                self._flush_waiters.extend(waiters)
+        if updated is None:
+            return 0
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        return updated
+
+    async def _flush(self) -> Optional[int]:
+        reconciled = self._due_reconciliation()
+        if reconciled:
+            # Does not hold up waiters: their deltas are not in it
+            await self._recount_counters(reconciled, reconciling=True)
+        if not self._pending and not self._recount:
+            return 0
+
+        batch, self._pending = self._pending, {}
+        votes, self._pending_votes = self._pending_votes, 0
+        oldest, self._oldest_pending = self._oldest_pending, None
+        VOTE_BUFFER_PENDING.set(0)
+        recount, self._recount = self._recount, set()
+        # A recount covers every committed vote, including these deltas'
+        batch = {
+            idea_id: entry for idea_id, entry in batch.items()
+            if (entry[0] or entry[1]) and idea_id not in recount
+        }
+        # A failed recount is retried by a later flush, so waiters wait for that
+        recounted = await self._recount_counters(recount) if recount else True
+        if not batch:
+            return len(recount) if recounted else None
+        self._inflight = batch
+
+        stmt = counter_deltas_update({idea_id: (entry[0], entry[1]) for idea_id, entry in batch.items()})
+
+        try:
+            async with self.session_factory() as session, session.begin():
+                await session.execute(stmt)
+        except Exception:
+            logger.exception("Vote buffer flush of %d ideas failed", len(batch))
+            self._requeue(batch)
+            return None
+        finally:
+            self._inflight = {}
+
+        for idea_id in batch:
+            # The database now includes these deltas; re-read on next vote
+            self._base.pop(idea_id)
+        VOTE_BUFFER_BATCH_SIZE.observe(votes)
+        if oldest is not None:
+            VOTE_BUFFER_FLUSH_LAG_SECONDS.observe(time.monotonic() - oldest)
+        return len(batch) + len(recount) if recounted else None
+
+    def _due_reconciliation(self) -> Set[str]:
+        now = time.monotonic()
+        due = {idea_id for idea_id, due_at in self._reconcile.items() if due_at <= now}
+        for idea_id in due:
+            del self._reconcile[idea_id]
+        return due
+
+    def _reconcile_later(self, idea_ids: Set[str]):
+        due_at = time.monotonic() + self.reconcile_interval
+        for idea_id in idea_ids:
+            self._reconcile.setdefault(idea_id, due_at)
+
+    async def _recount_counters(self, idea_ids: Set[str], reconciling: bool = False) -> bool:
+        """Reset the counters of ``idea_ids`` from their votes; False (and kept for later) on failure"""
+        try:
+            async with self.session_factory() as session, session.begin():
+                await recount_counters(session, idea_ids)
+        except Exception:
+            logger.exception("Vote counter recount of %d ideas failed", len(idea_ids))
+            if reconciling:
+                self._reconcile_later(idea_ids)
+                return False
+            for idea_id in idea_ids:
+                attempts = self._recount_attempts.get(idea_id, 0) + 1
+                if attempts >= self.max_retries:
+                    logger.error("Deferring the vote recount of idea %s to the next reconciliation pass", idea_id)
+                    self._recount_attempts.pop(idea_id, None)
+                    self._reconcile_later({idea_id})
+                    continue
+                self._recount_attempts[idea_id] = attempts
+                self._recount.add(idea_id)
+            return False
+
+        # The recount covers every vote committed before it, so drop the
+        # deltas queued meanwhile, with no await since the commit
+        for idea_id in idea_ids:
+            self._recount_attempts.pop(idea_id, None)
+            self._base.pop(idea_id)
+            entry = self._pending.pop(idea_id, None)
+            if entry is not None:
+                self._pending_votes -= entry[3]
+        VOTE_BUFFER_PENDING.set(self._pending_votes)
+        if not self._pending:
+            self._oldest_pending = None
+        if not reconciling:
+            # Other workers may still flush deltas for votes it counted
+            self._reconcile_later(idea_ids)
+        logger.warning("Recounted the vote counters of %d ideas", len(idea_ids))
+        return True
+
+    def _requeue(self, batch: Deltas):
+        for idea_id, (up_delta, down_delta, attempts, votes) in batch.items():
+            if attempts + 1 >= self.max_retries:
+                logger.error(
+                    "Giving up on buffered votes for idea %s after %d attempts (%+d/%+d); recounting it",
+                    idea_id, attempts + 1, up_delta, down_delta
+                )
+                VOTE_BUFFER_DROPPED.inc()
+                self._recount.add(idea_id)
+                continue
+            VOTE_BUFFER_RETRIES.inc()
+            self._add(idea_id, up_delta, down_delta, attempts + 1, votes)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is still pending"""
+        if self._task is not None:
+            # Let an in-progress flush finish rather than cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+vote_buffer = VoteBuffer(
+    AsyncSessionLocal,
+    flush_interval=settings.VOTE_BUFFER_FLUSH_MS / 1000,
+    max_votes=settings.VOTE_BUFFER_MAX_VOTES,
+    max_retries=settings.VOTE_BUFFER_MAX_RETRIES,
+    reconcile_interval=settings.VOTE_BUFFER_RECONCILE_SECONDS
+)
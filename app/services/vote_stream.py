@@ -0,0 +1,304 @@
+# app/services/vote_stream.py
+"""
+Live vote counts for ``GET /api/ideas/stream`` (server-sent events).
+
+Votes publish an idea's fresh (upvotes, downvotes) once they commit. Each
+connection subscribes to a set of idea ids and/or categories and keeps
+only the latest counts per idea until its next send, so a client gets at
+most one update per idea per ``interval`` however hot the idea is. Counts
+are absolute, so a dropped or coalesced update never leaves a client off
+by a delta.
+
+Backpressure is per connection: a client that reads slowly just has more
+ideas coalesced into its next event. One whose backlog reaches
+``max_pending`` ideas is sent a ``reset`` instead, telling it to refetch
+the listing, and its backlog is dropped.
+
+An idle connection is one coroutine parked on its event, plus a task
+waiting for the disconnect, with no timer besides the heartbeat; the
+endpoint is bare ASGI to keep it at that (see ``routes.core``).
+
+With a ``BroadcastBackend``, updates also reach the subscribers of the
+other workers; the publishing worker batches them per ``interval`` too.
+``LocalBroadcastBackend`` stands in for Redis between hubs of one process.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Protocol, Set, Tuple
+
+from app.config import settings
+from app.metrics import VOTE_STREAM_CONNECTIONS, VOTE_STREAM_EVENTS, VOTE_STREAM_RESETS
+from app.schemas.idea import dump_ideas
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# (idea_id, category, upvotes, downvotes)
+CountUpdate = Tuple[str, str, int, int]
+
+RETRY_MS = 5000
+_HEARTBEAT = b": ping\n\n"
+_RESET = b"event: reset\ndata: {}\n\n"
+
+
+class BroadcastBackend(Protocol):
+    async def publish(self, message: bytes) -> None: ...
+
+    def listen(self) -> AsyncIterator[bytes]:
+        """Messages published by any worker, including this one"""
+
+    async def close(self) -> None: ...
+
+
+class LocalBroadcastBackend:
+    """In-process fake of a broadcast channel: every hub attached to it hears every message"""
+
+    def __init__(self, max_queued: int = 1000):
+        self.max_queued = max_queued
+        self._queues: List[asyncio.Queue] = []
+
+    async def publish(self, message: bytes) -> None:
+        for queue in self._queues:
+            if queue.full():
+                # A stalled listener loses its oldest batch, not the publisher's time
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        queue = asyncio.Queue(self.max_queued)
+        self._queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(queue)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBroadcastBackend:
+    """Redis pub/sub channel, over a ``redis.asyncio.Redis``-compatible client"""
+
+    def __init__(self, client, channel: str = "ideahub:votes"):
+        self.client = client
+        self.channel = channel
+
+    async def publish(self, message: bytes) -> None:
+        await self.client.publish(self.channel, message)
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=None)
+                if message is not None:
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class Subscription:
+    """One connection's interest and the counts waiting to be sent to it"""
+
+    __slots__ = ("idea_ids", "categories", "pending", "overflowed", "closed", "ready")
+
+    def __init__(self, idea_ids: Tuple[str, ...], categories: Tuple[str, ...]):
+        self.idea_ids = idea_ids
+        self.categories = categories
+        self.pending: Dict[str, Tuple[int, int]] = {}
+        self.overflowed = False
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def close(self):
+        """Wake ``VoteStream.events`` so that it ends"""
+        self.closed = True
+        self.ready.set()
+
+    def offer(self, idea_id: str, upvotes: int, downvotes: int, max_pending: int):
+        if self.overflowed:
+            return
+        if idea_id not in self.pending and len(self.pending) >= max_pending:
+            self.overflowed = True
+            self.pending = {}
+        else:
+            self.pending[idea_id] = (upvotes, downvotes)
+        self.ready.set()
+
+    def take(self) -> Optional[bytes]:
+        """The next event to send, or None when there is nothing new"""
+        self.ready.clear()
+        if self.overflowed:
+            self.overflowed = False
+            VOTE_STREAM_RESETS.inc()
+            return _RESET
+        if not self.pending:
+            return None
+        pending, self.pending = self.pending, {}
+        VOTE_STREAM_EVENTS.inc()
+        return b"event: counts\ndata: " + dump_ideas(
+            {"id": idea_id, "upvotes": up, "downvotes": down} for idea_id, (up, down) in pending.items()
+        ) + b"\n\n"
+
+
+class VoteStream:
+    def __init__(
+            self,
+            interval: float = 1.0,
+            heartbeat: float = 15.0,
+            max_connections: int = 10000,
+            max_pending: int = 500,
+            backend: Optional[BroadcastBackend] = None
+    ):
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_connections = max_connections
+        self.max_pending = max_pending
+        self.backend = backend
+        # Ideas never change category; votes look theirs up here first
+        self.categories = TTLCache(maxsize=100000, ttl=3600)
+        self._by_idea: Dict[str, Set[Subscription]] = {}
+        self._by_category: Dict[str, Set[Subscription]] = {}
+        self._connections = 0
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # idea_id -> (category, upvotes, downvotes) waiting to be broadcast
+        self._outbox: Dict[str, Tuple[str, int, int]] = {}
+        self._outbox_ready = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    def subscribe(self, idea_ids: Iterable[str], categories: Iterable[str]) -> Optional[Subscription]:
+        """Register a connection; None when this worker is at ``max_connections``"""
+        if self._connections >= self.max_connections:
+            return None
+        # Deduplicated, and interned so connections following the same ideas share the strings
+        subscription = Subscription(
+            tuple(dict.fromkeys(map(sys.intern, idea_ids))), tuple(dict.fromkeys(map(sys.intern, categories)))
+        )
+        for idea_id in subscription.idea_ids:
+            self._by_idea.setdefault(idea_id, set()).add(subscription)
+        for category in subscription.categories:
+            self._by_category.setdefault(category, set()).add(subscription)
+        self._connections += 1
+        VOTE_STREAM_CONNECTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for index, keys in ((self._by_idea, subscription.idea_ids), (self._by_category, subscription.categories)):
+            for key in keys:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del index[key]
+        self._connections -= 1
+        VOTE_STREAM_CONNECTIONS.dec()
+
+    async def events(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """SSE chunks for ``subscription`` until it is closed"""
+        loop = asyncio.get_running_loop()
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                # Unlike wait_for, no task per waiting connection
+                async with asyncio.timeout(self.heartbeat):
+                    await subscription.ready.wait()
+            except TimeoutError:
+                yield _HEARTBEAT
+                continue
+            if subscription.closed:
+                return
+            sent_at = loop.time()
+            chunk = subscription.take()
+            if chunk is not None:
+                yield chunk
+            # Let further votes coalesce until the interval is up
+            await asyncio.sleep(max(0.0, sent_at + self.interval - loop.time()))
+
+    async def publish(self, updates: Iterable[CountUpdate]) -> None:
+        """Fresh counts of committed votes, for this worker's subscribers and the others'"""
+        updates = list(updates)
+        self._deliver(updates)
+        if self.backend is not None and updates:
+            for idea_id, category, upvotes, downvotes in updates:
+                self._outbox[idea_id] = (category, upvotes, downvotes)
+            self._outbox_ready.set()
+
+    def _deliver(self, updates: Iterable[CountUpdate]):
+        max_pending = self.max_pending
+        for idea_id, category, upvotes, downvotes in updates:
+            for subscription in self._by_idea.get(idea_id, ()):
+                subscription.offer(idea_id, upvotes, downvotes, max_pending)
+            for subscription in self._by_category.get(category, ()):
+                subscription.offer(idea_id, upvotes, downvotes, max_pending)
+
+    def start(self):
+        """Connect to the broadcast backend, if any"""
+        if self.backend is not None and not self._tasks:
+            self._tasks = [asyncio.create_task(self._send_loop()), asyncio.create_task(self._listen_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.backend is not None:
+            await self.backend.close()
+
+    async def _send_loop(self):
+        while True:
+            await self._outbox_ready.wait()
+            self._outbox_ready.clear()
+            outbox, self._outbox = self._outbox, {}
+            message = json.dumps({
+                "origin": self._origin,
+                "updates": [[idea_id, *values] for idea_id, values in outbox.items()],
+            }).encode()
+            try:
+                await self.backend.publish(message)
+            except Exception:
+                logger.exception("Vote broadcast failed; %d updates not sent to other workers", len(outbox))
+            await asyncio.sleep(self.interval)
+
+    async def _listen_loop(self):
+        while True:
+            try:
+                async for message in self.backend.listen():
+                    payload = json.loads(message)
+                    if payload["origin"] != self._origin:
+                        self._deliver(payload["updates"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Vote broadcast listener failed; reconnecting")
+                await asyncio.sleep(self.interval)
+
+
+def create_vote_stream() -> VoteStream:
+    backend = None
+    if settings.VOTE_STREAM_BACKEND == "redis":
+        # Optional dependency, only needed for the cross-worker backend
+        import redis.asyncio as redis
+        backend = RedisBroadcastBackend(redis.from_url(settings.VOTE_STREAM_REDIS_URL))
+    return VoteStream(
+        interval=settings.VOTE_STREAM_INTERVAL_MS / 1000,
+        heartbeat=settings.VOTE_STREAM_HEARTBEAT_SECONDS,
+        max_connections=settings.VOTE_STREAM_MAX_CONNECTIONS,
+        max_pending=settings.VOTE_STREAM_MAX_PENDING,
+        backend=backend,
+    )
+
+
+vote_stream = create_vote_stream()
@@ -0,0 +1,258 @@
+# app/services/votes.py
+"""
+Low-level vote persistence.
+
+On MySQL a vote costs two statements and no SELECT:
+
+1. ``INSERT ... ON DUPLICATE KEY UPDATE`` into ``votes``. The update clause
+   wraps the old ``vote_type`` in ``LAST_INSERT_ID(expr)``, so the cursor's
+   ``lastrowid`` reports the previous vote (0 = none, 1 = upvote,
+   2 = downvote) without reading the row back.
+2. An ``UPDATE ideas`` applying the exact counter delta, which hands the
+   fresh counters back the same way, packed into one ``LAST_INSERT_ID``.
+
+The ``ideas`` row lock is therefore only held from the second statement to
+the commit. Dialects with ``UPDATE ... RETURNING`` (SQLite, used as a local
+stand-in) use ``INSERT ... ON CONFLICT DO NOTHING`` and only read the
+previous vote back when the voter had already voted.
+
+Batches of votes from one voter lock and read the voter's previous votes
+on those ideas, write every change with one multi-row upsert, and apply
+all counter deltas with one ``UPDATE ... CASE`` (``counter_deltas_update``,
+shared with the write-behind vote buffer).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.idea import Idea, Vote
+from app.services.ranking import score_values
+
+VOTE_TYPES = ('upvote', 'downvote')
+VOTE_COUNTERS = {'upvote': 'upvotes', 'downvote': 'downvotes'}
+
+# Counters are packed as upvotes << 32 | downvotes into a BIGINT UNSIGNED
+_COUNTER_SHIFT = 4294967296
+
+
+def vote_delta(previous: Optional[str], vote_type: str) -> Dict[str, int]:
+    """
+    Counter change for casting ``vote_type`` over ``previous``: +1 for a new
+    vote, a -1/+1 switch when the type changes, nothing when repeated.
+    """
+    deltas = {'upvotes': 0, 'downvotes': 0}
+    if previous == vote_type:
+        return deltas
+    if previous is not None:
+        deltas[VOTE_COUNTERS[previous]] -= 1
+    deltas[VOTE_COUNTERS[vote_type]] += 1
+    return deltas
+
+
+def _is_mysql(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name in ('mysql', 'mariadb')
+
+
+def _generic_insert(db: AsyncSession):
+    """``INSERT`` construct supporting ``ON CONFLICT`` for non-MySQL dialects"""
+    if db.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(Vote)
+    return sqlite.insert(Vote)
+
+
+def mysql_vote_upsert(idea_id: str, voter_hash: str, vote_type: str):
+    """
+    MySQL ``INSERT ... ON DUPLICATE KEY UPDATE`` of one vote whose
+    ``lastrowid`` is the replaced vote's position in ``VOTE_TYPES`` (0 = none).
+
+    The CASE has the same value either way; it is there so the update
+    clause evaluates ``LAST_INSERT_ID(FIELD(...))`` on every duplicate,
+    including a repeated vote that changes nothing. A fresh insert never
+    evaluates it and, with no auto-increment column, reports 0.
+    """
+    stmt = mysql.insert(Vote).values(idea_id=idea_id, voter_hash=voter_hash, vote_type=vote_type)
+    previous_code = func.last_insert_id(func.field(Vote.vote_type, *VOTE_TYPES))
+    return stmt.on_duplicate_key_update(
+        vote_type=case((previous_code > 0, stmt.inserted.vote_type), else_=stmt.inserted.vote_type)
+    )
+
+
+async def upsert_vote(db: AsyncSession, idea_id: str, voter_hash: str, vote_type: str) -> Optional[str]:
+    """Insert or switch the voter's vote; returns the vote it replaced, if any"""
+    if _is_mysql(db):
+        result = await db.execute(mysql_vote_upsert(idea_id, voter_hash, vote_type))
+        code = result.lastrowid or 0
+        return VOTE_TYPES[code - 1] if code else None
+
+    # Write first so concurrent votes from the same voter serialise on the
+    # row instead of racing between a read and an insert
+    stmt = _generic_insert(db).values(
+        idea_id=idea_id, voter_hash=voter_hash, vote_type=vote_type
+    ).on_conflict_do_nothing()
+    if (await db.execute(stmt)).rowcount:
+        return None
+
+    previous = await db.scalar(
+        select(Vote.vote_type).where(Vote.idea_id == idea_id, Vote.voter_hash == voter_hash)
+    )
+    if previous != vote_type:
+        await db.execute(
+            update(Vote)
+            .where(Vote.idea_id == idea_id, Vote.voter_hash == voter_hash)
+            .values(vote_type=vote_type)
+        )
+    return previous
+
+
+def mysql_counter_update(idea_id: str, deltas: Dict[str, int]):
+    """
+    MySQL ``UPDATE ideas`` applying ``deltas`` to an approved idea, whose
+    ``lastrowid`` packs the fresh counters as upvotes << 32 | downvotes
+    """
+    new_upvotes = Idea.upvotes + deltas['upvotes']
+    new_downvotes = Idea.downvotes + deltas['downvotes']
+    # SET runs left to right: scores see the old counters, and by the
+    # downvotes clause ``upvotes`` already holds its new value
+    packed = func.last_insert_id(Idea.upvotes * _COUNTER_SHIFT + new_downvotes)
+    return update(Idea).where(Idea.id == idea_id, Idea.status == 'approved').ordered_values(
+        *score_values(new_upvotes, new_downvotes),
+        (Idea.upvotes, new_upvotes),
+        (Idea.downvotes, packed % _COUNTER_SHIFT)
+    )
+
+
+async def apply_counter_delta(
+        db: AsyncSession, idea_id: str, deltas: Dict[str, int]
+) -> Optional[Tuple[int, int, Optional[str]]]:
+    """
+    Atomically apply ``deltas`` and the derived scores to an approved idea.
+
+    Returns the fresh (upvotes, downvotes) and the idea's category, or None
+    when no approved idea with that id exists. On MySQL the category is
+    None: only the counters fit in ``LAST_INSERT_ID``.
+    """
+    if _is_mysql(db):
+        result = await db.execute(mysql_counter_update(idea_id, deltas))
+        # SQLAlchemy connects with CLIENT_FOUND_ROWS: matched rows, changed or not
+        if not result.rowcount:
+            return None
+        return (*divmod(result.lastrowid, _COUNTER_SHIFT), None)
+
+    new_upvotes = Idea.upvotes + deltas['upvotes']
+    new_downvotes = Idea.downvotes + deltas['downvotes']
+    row = (await db.execute(
+        update(Idea).where(Idea.id == idea_id, Idea.status == 'approved').ordered_values(
+            *score_values(new_upvotes, new_downvotes),
+            (Idea.upvotes, new_upvotes),
+            (Idea.downvotes, new_downvotes)
+        ).returning(Idea.upvotes, Idea.downvotes, Idea.category)
+    )).first()
+    return (row.upvotes, row.downvotes, row.category) if row else None
+
+
+async def previous_votes(db: AsyncSession, voter_hash: str, idea_ids: List[str]) -> Dict[str, str]:
+    """
+    The voter's current votes on ``idea_ids``, locked until commit so a
+    concurrent batch from the same voter cannot apply the same deltas
+    """
+    rows = await db.execute(
+        select(Vote.idea_id, Vote.vote_type)
+        .where(Vote.voter_hash == voter_hash, Vote.idea_id.in_(sorted(idea_ids)))
+        .order_by(Vote.idea_id)
+        .with_for_update()
+    )
+    return dict(rows.all())
+
+
+async def upsert_votes(db: AsyncSession, voter_hash: str, votes: Dict[str, str]):
+    """Insert or switch the voter's votes (idea_id -> vote_type) in one statement"""
+    rows = [
+        {"idea_id": idea_id, "voter_hash": voter_hash, "vote_type": vote_type}
+        for idea_id, vote_type in sorted(votes.items())
+    ]
+    if _is_mysql(db):
+        stmt = mysql.insert(Vote).values(rows)
+        stmt = stmt.on_duplicate_key_update(vote_type=stmt.inserted.vote_type)
+    else:
+        stmt = _generic_insert(db).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Vote.idea_id, Vote.voter_hash],
+            set_={"vote_type": stmt.excluded.vote_type}
+        )
+    await db.execute(stmt)
+
+
+def counter_deltas_update(deltas: Dict[str, Tuple[int, int]]):
+    """
+    ``UPDATE ideas`` adding per-idea (upvotes, downvotes) deltas, with the
+    derived scores, in a single statement
+    """
+    up_case = case({idea_id: up for idea_id, (up, _) in deltas.items()}, value=Idea.id, else_=0)
+    down_case = case({idea_id: down for idea_id, (_, down) in deltas.items()}, value=Idea.id, else_=0)
+    new_upvotes = Idea.upvotes + up_case
+    new_downvotes = Idea.downvotes + down_case
+    return (
+        update(Idea)
+        .where(Idea.id.in_(list(deltas)))
+        .ordered_values(
+            *score_values(new_upvotes, new_downvotes),
+            (Idea.upvotes, new_upvotes),
+            (Idea.downvotes, new_downvotes)
+        )
+    )
+
+
+def counter_values_update(counts: Dict[str, Tuple[int, int]]):
+    """
+    ``UPDATE ideas`` setting per-idea (upvotes, downvotes), with the derived
+    scores, in a single statement
+    """
+    upvotes = case({idea_id: up for idea_id, (up, _) in counts.items()}, value=Idea.id)
+    downvotes = case({idea_id: down for idea_id, (_, down) in counts.items()}, value=Idea.id)
+    return (
+        update(Idea)
+        .where(Idea.id.in_(list(counts)))
+        .ordered_values(
+            *score_values(upvotes, downvotes),
+            (Idea.upvotes, upvotes),
+            (Idea.downvotes, downvotes)
+        )
+    )
+
+
+async def recount_counters(db: AsyncSession, idea_ids: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+    """
+    Reset the counters, with the derived scores, of ``idea_ids`` to the
+    votes recorded for them, and return them.
+
+    The votes are counted with a locking read, so no vote on those ideas can
+    be cast or switched between the count and the commit.
+    """
+    counts = {idea_id: [0, 0] for idea_id in sorted(idea_ids)}
+    rows = await db.execute(
+        select(Vote.idea_id, Vote.vote_type, func.count())
+        .where(Vote.idea_id.in_(list(counts)))
+        .group_by(Vote.idea_id, Vote.vote_type)
+        .with_for_update()
+    )
+    for idea_id, vote_type, votes in rows:
+        counts[idea_id][VOTE_TYPES.index(vote_type)] = votes
+    counts = {idea_id: (up, down) for idea_id, (up, down) in counts.items()}
+    await db.execute(counter_values_update(counts))
+    return counts
+
+
+async def apply_counter_deltas(db: AsyncSession, idea_ids: Iterable[str], deltas: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[int, int]]:
+    """
+    Apply ``deltas`` to the approved ideas among them and return the fresh
+    (upvotes, downvotes) of every approved idea in ``idea_ids``
+    """
+    if deltas:
+        await db.execute(counter_deltas_update(deltas).where(Idea.status == 'approved'))
+    rows = await db.execute(
+        select(Idea.id, Idea.upvotes, Idea.downvotes)
+        .where(Idea.id.in_(list(idea_ids)), Idea.status == 'approved')
+    )
+    return {row.id: (row.upvotes, row.downvotes) for row in rows}
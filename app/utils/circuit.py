@@ -0,0 +1,69 @@
+# app/utils/circuit.py
+import time
+from typing import Callable, Optional
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    ``allow()`` refuses calls for ``reset_timeout`` seconds. Then a single
+    probe is let through (half-open): its success closes the circuit, its
+    failure re-opens it for another ``reset_timeout``. A caller that claimed
+    the probe must end it with ``record_success``, ``record_failure`` or,
+    when it gives up without a verdict (e.g. it was cancelled), ``release``.
+
+    Not thread-safe; intended to be used from the event loop thread only.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            failure_threshold: int,
+            reset_timeout: float,
+            timer: Callable[[], float] = time.monotonic
+    ):
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._timer = timer
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._probing or self._timer() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; claims the probe when half-open"""
+        if self._opened_at is None:
+            return True
+        if self._probing or self._timer() - self._opened_at < self.reset_timeout:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            self._opened_at = self._timer()
+        self._probing = False
+
+    def release(self):
+        """Give back a claimed probe without a verdict; the next call may probe"""
+        self._probing = False
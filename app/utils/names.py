@@ -1,7 +1,19 @@
 # app/utils/names.py
+import json
+import logging
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from random import randrange
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = Path(__file__).parent / 'data' / 'animals_names.txt'
+ADJECTIVES = ("Red", "Swift", "Clever", "Mighty", "Golden", "Silver")
 
 
 def load_animal_names(file_path: Path) -> List[str]:
@@ -16,7 +28,7 @@ def load_animal_names(file_path: Path) -> List[str]:
         in_parentheses = False
 
         for part in re.split(r',|\((.*?)\)', content):
-            part = part.strip()
+            part = (part or '').strip()
             if not part:
                 continue
 
@@ -58,10 +70,67 @@ def load_animal_names(file_path: Path) -> List[str]:
         raise RuntimeError(f"Error processing animal names: {str(e)}")
 
 
+class NamePool:
+    """Immutable adjective x animal pool with O(1) random selection"""
+    __slots__ = ("adjectives", "animals")
+
+    def __init__(self, adjectives: Tuple[str, ...], animals: Tuple[str, ...]):
+        self.adjectives = adjectives
+        self.animals = animals
+
+    def __len__(self) -> int:
+        return len(self.adjectives) * len(self.animals)
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < len(self):
+            raise IndexError("name pool index out of range")
+        adjective, animal = divmod(index, len(self.animals))
+        return f"{self.adjectives[adjective]}{self.animals[animal]}"
+
+    def __repr__(self) -> str:
+        return f"NamePool({len(self.adjectives)} adjectives x {len(self.animals)} animals)"
+
+    def choice(self) -> str:
+        return self[randrange(len(self))]
+
+
+def load_animal_names_cached(file_path: Path, cache_path: Optional[Path]) -> List[str]:
+    """
+    Load animal names, reusing a precompiled JSON artifact when it is still
+    fresh for the source file's mtime and size.
+    """
+    if cache_path is None:
+        return load_animal_names(file_path)
+
+    stat = os.stat(file_path)
+    fingerprint = [stat.st_mtime_ns, stat.st_size]
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+        if artifact.get('source') == fingerprint:
+            return artifact['names']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    names = load_animal_names(file_path)
+    try:
+        tmp_path = cache_path.with_suffix(cache_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': fingerprint, 'names': names}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write animal name cache %s: %s", cache_path, e)
+    return names
+
+
+@lru_cache(maxsize=1)
+def get_name_pool() -> NamePool:
+    """Parse the animal name file once per process"""
+    cache_path = Path(settings.ANIMAL_NAMES_CACHE) if settings.ANIMAL_NAMES_CACHE else None
+    names = load_animal_names_cached(DATA_FILE, cache_path)
+    return NamePool(ADJECTIVES, tuple(names))
+
+
 def generate_animal_name() -> str:
     """Generate a random animal name from the processed list."""
-    from random import choice
-    data_file = Path(__file__).parent / 'data' / 'animal_names.txt'
-    names = load_animal_names(data_file)
-    adjectives = ["Red", "Swift", "Clever", "Mighty", "Golden", "Silver"]
-    return f"{choice(adjectives)}{choice(names)}"
+    return get_name_pool().choice()
@@ -0,0 +1,53 @@
+# app/utils/pagination.py
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """Opaque, URL-safe cursor holding the sort mode and the last row's keys"""
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps([sort, payload], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, types: Optional[Sequence[type]] = None) -> Tuple[Any, ...]:
+    """
+    Inverse of ``encode_cursor``; raises ``ValueError`` for malformed cursors
+    or cursors issued for a different sort mode. With ``types``, the cursor
+    must hold exactly one value of each (``float`` also accepts ints) so no
+    client-supplied value reaches a query with the wrong type.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, payload = json.loads(raw)
+        if not isinstance(payload, list):
+            raise TypeError("cursor payload is not a list")
+        values = tuple(
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Malformed cursor") from e
+
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match sort order")
+    if types is not None and (
+            len(values) != len(types)
+            or not all(_is_type(value, expected) for value, expected in zip(values, types))
+    ):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+def _is_type(value: Any, expected: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, expected)
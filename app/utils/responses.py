@@ -0,0 +1,12 @@
+# app/utils/responses.py
+from fastapi.responses import Response
+
+
+class PreSerializedJSONResponse(Response):
+    """
+    JSON response whose body is already encoded bytes.
+
+    Returning it from a route bypasses ``response_model`` validation and
+    re-encoding; the route's ``response_model`` still documents the shape.
+    """
+    media_type = "application/json"
@@ -0,0 +1,114 @@
+# app/utils/stages.py
+"""
+Per-stage latency timing for the request hot paths.
+
+    with stage("vote", "counters"):
+        counts = await apply_counter_delta(...)
+
+Each stage is observed in ``ideahub_stage_seconds{component, stage}``,
+logged when slower than ``SLOW_STAGE_SECONDS`` and, once
+``configure_tracing`` has found an OTLP collector, exported as a span.
+With ``ENABLE_STAGE_TIMING`` off, ``stage()`` returns a shared no-op
+context manager, so an instrumented call costs a settings lookup.
+"""
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_tracer_provider = None
+_histograms: Dict[Tuple[str, str], object] = {}
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("component", "name", "histogram", "span", "started")
+
+    def __init__(self, component: str, name: str):
+        self.component = component
+        self.name = name
+        key = (component, name)
+        self.histogram = _histograms.get(key)
+        if self.histogram is None:
+            self.histogram = _histograms[key] = STAGE_SECONDS.labels(component, name)
+        self.span = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.span = _tracer.start_as_current_span(f"{self.component}.{self.name}")
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.histogram.observe(elapsed)
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc, tb)
+        if 0 < settings.SLOW_STAGE_SECONDS <= elapsed:
+            logger.warning("Slow stage %s.%s: %.1fms", self.component, self.name, elapsed * 1e3)
+        return False
+
+
+def stage(component: str, name: str):
+    """Context manager timing one stage of a request (sync or async code)"""
+    if not settings.ENABLE_STAGE_TIMING:
+        return _NOOP
+    return _Stage(component, name)
+
+
+def configure_tracing(endpoint: Optional[str] = None) -> bool:
+    """
+    Export stage spans to an OTLP/HTTP collector at ``endpoint``
+    (``OTEL_EXPORTER_OTLP_ENDPOINT``). Returns whether export is active.
+    """
+    global _tracer, _tracer_provider
+    endpoint = settings.OTEL_EXPORTER_OTLP_ENDPOINT if endpoint is None else endpoint
+    if not endpoint:
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk and "
+            "opentelemetry-exporter-otlp-proto-http are not installed; spans are not exported"
+        )
+        return False
+
+    _tracer_provider = TracerProvider(resource=Resource.create({"service.name": settings.PROJECT_NAME}))
+    _tracer_provider.add_span_processor(
+        BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint.rstrip('/')}/v1/traces"))
+    )
+    trace.set_tracer_provider(_tracer_provider)
+    _tracer = trace.get_tracer("ideahub")
+    logger.info("Exporting stage spans to %s", endpoint)
+    return True
+
+
+def shutdown_tracing():
+    """Flush buffered spans"""
+    global _tracer, _tracer_provider
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+    _tracer = _tracer_provider = None
@@ -0,0 +1,100 @@
+# app/utils/startup_profile.py
+"""
+Startup profiling for ``python -m app.server --profile-startup``.
+
+Cold start is what autoscaling pays for, so two things are measured, each
+in a fresh interpreter: how long importing the app takes module by module
+(``python -X importtime``), and how long a newly launched single-worker
+server takes to answer its first request. Any HTTP response counts, so a
+``503`` from ``/health`` with the database down still marks the server as
+serving.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def import_times(module: str = "app.factory") -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Seconds to import ``module`` and (name, self ms, cumulative ms) of every
+    module it pulled in, slowest cumulative first
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_environment(), check=True
+    )
+    modules = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.rstrip(), int(own) / 1000, int(cumulative) / 1000))
+        if name.strip() == module:
+            total = int(cumulative) / 1e6
+    modules.sort(key=lambda row: row[2], reverse=True)
+    return total, modules
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(path: str = "/health", timeout: float = 60.0) -> Tuple[float, Optional[int]]:
+    """Seconds from launching the server to its first response, and that response's status"""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", "1", "--host", "127.0.0.1", "--port", str(port)],
+        env=_environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with status {server.returncode} before serving")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    return time.perf_counter() - started, response.status
+            except urllib.error.HTTPError as e:
+                return time.perf_counter() - started, e.code
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        return time.perf_counter() - started, None
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def report(top: int = 20, budget: float = 0.0) -> int:
+    """Print the startup profile; non-zero exit when ``budget`` seconds are exceeded"""
+    total, modules = import_times()
+    print(f"import app.factory: {total * 1e3:.0f}ms")
+    print(f"{'cumulative':>12}{'self':>10}  module")
+    for name, own, cumulative in modules[:top]:
+        print(f"{cumulative:10.1f}ms{own:8.1f}ms  {name}")
+
+    elapsed, status = time_to_first_request()
+    if status is None:
+        print(f"time to first request: no response after {elapsed:.1f}s")
+        return 1
+    print(f"time to first request: {elapsed * 1e3:.0f}ms (HTTP {status})")
+    if budget and elapsed > budget:
+        print(f"startup exceeded the {budget:.2f}s budget")
+        return 1
+    return 0
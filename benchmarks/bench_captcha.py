@@ -0,0 +1,87 @@
+# benchmarks/bench_captcha.py
+"""
+reCAPTCHA verification against a local stub verifier.
+
+1. Latency of a fresh ``httpx.AsyncClient`` per call (the previous
+   behaviour) versus the shared pooled client.
+2. A hanging verifier: the read timeout bounds the first calls, then the
+   circuit breaker answers instantly with the fail-open/closed policy.
+3. Retries of an already verified token never reach the verifier.
+
+    python -m benchmarks.bench_captcha [--calls 200] [--fail-open]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.services.captcha import CaptchaVerifier
+from app.utils.circuit import CircuitBreaker
+from benchmarks.common import quiet_logging
+from benchmarks.stub_recaptcha import StubVerifier
+
+
+async def per_call_client(url: str, token: str) -> bool:
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, data={"secret": "secret", "response": token})
+        result = response.json()
+        return result.get("success", False) and result.get("score", 0) >= 0.5
+
+
+async def time_calls(verify, calls: int) -> float:
+    samples = []
+    for i in range(calls):
+        started = time.perf_counter()
+        assert await verify(f"token-{i}-{time.perf_counter_ns()}")
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+async def main(calls: int, fail_open: bool):
+    quiet_logging()
+    async with StubVerifier() as stub:
+        verifier = CaptchaVerifier(
+            stub.url, "secret",
+            connect_timeout=0.5, read_timeout=0.5,
+            fail_open=fail_open,
+            breaker=CircuitBreaker(failure_threshold=3, reset_timeout=1.0)
+        )
+        await verifier.start()
+
+        print("1. median verification latency")
+        fresh = await time_calls(lambda token: per_call_client(stub.url, token), calls)
+        pooled = await time_calls(verifier.verify, calls)
+        print(f"   client per call {fresh * 1e3:8.2f}ms")
+        print(f"   pooled client   {pooled * 1e3:8.2f}ms")
+
+        print(f"2. hanging verifier ({'fail open' if fail_open else 'fail closed'})")
+        stub.mode = "hang"
+        for i in range(6):
+            started = time.perf_counter()
+            verdict = await verifier.verify(f"hang-{i}")
+            print(
+                f"   call {i + 1}: {verdict!s:<5} in {(time.perf_counter() - started) * 1e3:7.1f}ms"
+                f"  circuit {verifier.breaker.state}"
+            )
+        stub.mode = "ok"
+        await asyncio.sleep(verifier.breaker.reset_timeout)
+        verdict = await verifier.verify("after-recovery")
+        print(f"   probe after {verifier.breaker.reset_timeout:.0f}s: {verdict}  circuit {verifier.breaker.state}")
+
+        print("3. retried token")
+        before = stub.requests
+        for _ in range(5):
+            assert await verifier.verify("retried-token")
+        print(f"   5 verifications, {stub.requests - before} upstream request(s)")
+
+        await verifier.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--fail-open", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.fail_open))
@@ -0,0 +1,147 @@
+# benchmarks/bench_compression.py
+"""
+Response compression: codec cost and ratio, precompressed listing pages, middleware overhead.
+
+Seeds ``--rows`` approved ideas, then:
+
+* compresses a ``per_page=20`` and a ``per_page=100`` listing body with every
+  available codec at its configured level, reporting ratio and time;
+* times ``GET /api/ideas`` through the whole app per ``Accept-Encoding``,
+  compressed by the middleware on every request (listing cache off) and
+  served from a cached compressed variant, checking each decodes to the
+  identity body;
+* times a tiny endpoint behind no middleware, behind this app's pure ASGI
+  stack (security headers, compression, HTTP cache), and behind the same
+  header logic as ``BaseHTTPMiddleware``, which is what the never
+  registered ``security_headers`` helper would have needed.
+
+    python -m benchmarks.bench_compression [--rows 20000] [--requests 300]
+"""
+import argparse
+import asyncio
+import gzip
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.middleware.base import BaseHTTPMiddleware
+
+import app.db.session as db_session
+from app import app
+from app.compression import CompressionMiddleware, brotli, compressor, zstandard
+from app.config import settings
+from app.http_cache import HTTPCacheMiddleware
+from app.security import SECURITY_HEADERS, SecurityHeadersMiddleware
+from benchmarks.common import Timer, asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+DECODERS = {"gzip": gzip.decompress}
+if brotli is not None:
+    DECODERS["br"] = brotli.decompress
+if zstandard is not None:
+    DECODERS["zstd"] = zstandard.ZstdDecompressor().decompress
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+async def fetch_raw(client, path: str, params: dict, encoding: str):
+    """(status, headers, body as sent on the wire)"""
+    async with client.stream("GET", path, params=params, headers={"Accept-Encoding": encoding}) as response:
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response.status_code, response.headers, raw
+
+
+async def time_listing(client, requests: int, params: dict, encoding: str):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        _, headers, raw = await fetch_raw(client, "/api/ideas", params, encoding)
+        samples.append(time.perf_counter() - started)
+    return headers, raw, *percentiles(samples)
+
+
+def tiny_app(stack: str) -> FastAPI:
+    bench_app = FastAPI()
+
+    @bench_app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if stack == "pure ASGI":
+        bench_app.add_middleware(HTTPCacheMiddleware, policies=settings.HTTP_CACHE_POLICIES)
+        bench_app.add_middleware(CompressionMiddleware)
+        bench_app.add_middleware(SecurityHeadersMiddleware)
+    elif stack == "BaseHTTPMiddleware":
+        async def security_headers(request, call_next):
+            response = await call_next(request)
+            response.headers.update({name.decode(): value.decode() for name, value in SECURITY_HEADERS})
+            return response
+
+        bench_app.add_middleware(BaseHTTPMiddleware, dispatch=security_headers)
+    return bench_app
+
+
+async def main(rows: int, requests: int):
+    quiet_logging()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        print(f"seeding {rows} ideas...")
+        await seed_ideas(engine, rows)
+        db_session.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        print(f"codecs available: {', '.join(compressor.encodings)}")
+
+        async with asgi_client(app) as client:
+            for per_page in (20, 100):
+                params = {"sort": "popular", "per_page": per_page}
+                _, _, identity = await fetch_raw(client, "/api/ideas", params, "identity")
+                print(f"\nper_page={per_page}: {len(identity)} bytes of JSON")
+                print(f"{'codec':<8}{'bytes':>8}{'ratio':>8}{'compress':>12}")
+                for encoding in compressor.encodings:
+                    with Timer() as timer:
+                        for _ in range(50):
+                            compressed = compressor.compress(identity, encoding)
+                    print(f"{encoding:<8}{len(compressed):>8}{len(identity) / len(compressed):>7.1f}x"
+                          f"{timer.elapsed / 50 * 1e3:10.2f}ms")
+
+                print(f"{'GET /api/ideas':<32}{'p50':>10}{'p99':>10}{'bytes':>8}")
+                cases = [("identity", "listing cache", True)]
+                for encoding in compressor.encodings:
+                    cases += [(encoding, "middleware", False), (encoding, "cached variant", True)]
+                for encoding, source, cached in cases:
+                    settings.LISTING_CACHE_ENABLED = cached
+                    # Warm the cache (and its variant) first
+                    await fetch_raw(client, "/api/ideas", params, encoding)
+                    headers, raw, p50, p99 = await time_listing(client, requests, params, encoding)
+                    decoded = DECODERS[encoding](raw) if encoding in DECODERS else raw
+                    assert decoded == identity, (encoding, source)
+                    assert headers.get("content-encoding", "identity") == encoding, headers
+                    print(f"{encoding + ', ' + source:<32}{p50 * 1e3:8.2f}ms{p99 * 1e3:8.2f}ms{len(raw):>8}")
+                settings.LISTING_CACHE_ENABLED = True
+        await engine.dispose()
+
+    print(f"\n{'GET /ping (tiny app)':<32}{'p50':>10}{'p99':>10}")
+    for stack in ("no middleware", "pure ASGI", "BaseHTTPMiddleware"):
+        async with asgi_client(tiny_app(stack)) as client:
+            for _ in range(100):
+                await client.get("/ping")
+            samples = []
+            for _ in range(requests * 5):
+                started = time.perf_counter()
+                await client.get("/ping", headers={"Accept-Encoding": "gzip, br, zstd"})
+                samples.append(time.perf_counter() - started)
+        p50, p99 = percentiles(samples)
+        print(f"{stack:<32}{p50 * 1e6:8.0f}us{p99 * 1e6:8.0f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.requests))
@@ -0,0 +1,70 @@
+# benchmarks/bench_concurrency.py
+"""
+Vote throughput at 1, 10 and 100 concurrent voters.
+
+Each simulated voter has its own User-Agent, so the per-voter rate limit
+never triggers and every request performs a real vote transaction.
+
+    python -m benchmarks.bench_concurrency [--votes 2000] [--ideas 200]
+"""
+import argparse
+import asyncio
+import itertools
+import tempfile
+from pathlib import Path
+
+from app import app
+from benchmarks.common import (
+    Timer, asgi_client, create_schema, make_sqlite_engine, override_db, quiet_logging, seed_ideas
+)
+
+
+async def run_level(client, idea_ids, concurrency: int, total_votes: int, voter_seq) -> float:
+    queue = asyncio.Queue()
+    for i in range(total_votes):
+        queue.put_nowait(idea_ids[i % len(idea_ids)])
+    failures = 0
+
+    async def voter():
+        nonlocal failures
+        while not queue.empty():
+            idea_id = queue.get_nowait()
+            response = await client.post(
+                f"/api/ideas/{idea_id}/vote",
+                json={"vote_type": "upvote"},
+                headers={"User-Agent": f"bench-voter-{next(voter_seq)}"},
+            )
+            if response.status_code != 200:
+                failures += 1
+
+    with Timer() as timer:
+        await asyncio.gather(*(voter() for _ in range(concurrency)))
+    if failures:
+        print(f"  warning: {failures} failed votes at concurrency {concurrency}")
+    return total_votes / timer.elapsed
+
+
+async def main(votes: int, ideas: int):
+    quiet_logging()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        idea_ids = await seed_ideas(engine, ideas)
+        override_db(app, engine)
+        voter_seq = itertools.count()
+
+        async with asgi_client(app) as client:
+            for concurrency in (1, 10, 100):
+                rps = await run_level(client, idea_ids, concurrency, votes, voter_seq)
+                print(f"concurrency={concurrency:<4} {rps:10.1f} votes/sec")
+
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--votes", type=int, default=2000)
+    parser.add_argument("--ideas", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.votes, args.ideas))
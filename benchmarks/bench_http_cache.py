@@ -0,0 +1,133 @@
+# benchmarks/bench_http_cache.py
+"""
+Conditional GET /api/ideas: cost of a 304 vs a full response, and invalidation.
+
+Seeds ``--rows`` approved ideas and times ``GET /api/ideas`` through the
+whole middleware stack for ``--per-page`` 20 and 100:
+
+* without the listing cache (a database query per request);
+* served from the listing cache;
+* revalidated with the ``If-None-Match`` of a previous response (304).
+
+Then checks which revalidations stop matching after a vote in one
+category, a buffered vote once its flush lands, the hot score job, and
+un-approving an idea.
+
+    python -m benchmarks.bench_http_cache [--rows 100000] [--requests 500]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.db.session as db_session
+from app import app
+from app.config import settings
+from app.dependencies import voting_limiter
+from app.security import security_service
+from app.services.listing_versions import listing_versions
+from app.services.ranking import recompute_hot_scores
+from app.services.vote_buffer import vote_buffer
+from benchmarks.common import CATEGORIES, asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+
+async def latency(client, requests: int, params: dict, headers=None):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get("/api/ideas", params=params, headers=headers)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return response, statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+async def etags(client, listings):
+    return {label: (await client.get("/api/ideas", params=params)).headers["etag"] for label, params in listings}
+
+
+async def revalidated(client, listings, before) -> str:
+    statuses = []
+    for label, params in listings:
+        response = await client.get("/api/ideas", params=params, headers={"If-None-Match": before[label]})
+        statuses.append(f"{label} {response.status_code}")
+    return ", ".join(statuses)
+
+
+async def main(rows: int, requests: int):
+    quiet_logging()
+    security_service.hash_mode = "blake2"
+    voting_limiter.enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        print(f"seeding {rows} ideas...")
+        idea_ids = await seed_ideas(engine, rows)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        db_session.AsyncSessionLocal = session_factory
+
+        async with asgi_client(app) as client:
+            print(f"{'per_page':<10}{'response':<16}{'p50':>10}{'p99':>10}{'bytes':>9}")
+            for per_page in (20, 100):
+                params = {"sort": "popular", "per_page": per_page}
+                settings.LISTING_CACHE_ENABLED = False
+                response, p50, p99 = await latency(client, requests, params)
+                print(f"{per_page:<10}{'database':<16}{p50 * 1e3:8.2f}ms{p99 * 1e3:8.2f}ms{len(response.content):>9}")
+                settings.LISTING_CACHE_ENABLED = True
+                response, p50, p99 = await latency(client, requests, params)
+                print(f"{per_page:<10}{'listing cache':<16}{p50 * 1e3:8.2f}ms{p99 * 1e3:8.2f}ms{len(response.content):>9}")
+                conditional = {"If-None-Match": response.headers["etag"]}
+                response, p50, p99 = await latency(client, requests, params, conditional)
+                assert response.status_code == 304, response.status_code
+                print(f"{per_page:<10}{'304':<16}{p50 * 1e3:8.2f}ms{p99 * 1e3:8.2f}ms{len(response.content):>9}")
+            print(f"headers: cache-control={response.headers['cache-control']!r}, "
+                  f"last-modified={response.headers['last-modified']!r}")
+
+            listings = [
+                ("all/recent", {}),
+                ("all/hot", {"sort": "hot"}),
+                *((f"{category}/recent", {"category": category}) for category in CATEGORIES[:2]),
+            ]
+            # seed_ideas spreads ideas over the categories round robin
+            voted = idea_ids[0]
+
+            before = await etags(client, listings)
+            await client.post(f"/api/ideas/{voted}/vote", json={"vote_type": "upvote"},
+                              headers={"User-Agent": "bench-voter-1"})
+            await asyncio.sleep(0.05)
+            print(f"\nafter a vote in {CATEGORIES[0]}: {await revalidated(client, listings, before)}")
+
+            settings.VOTE_BUFFER_ENABLED = True
+            vote_buffer.session_factory = session_factory
+            before = await etags(client, listings)
+            await client.post(f"/api/ideas/{voted}/vote", json={"vote_type": "downvote"},
+                              headers={"User-Agent": "bench-voter-1"})
+            await asyncio.sleep(0.05)
+            after_commit = await etags(client, listings)
+            await vote_buffer.flush()
+            await asyncio.sleep(0.05)
+            print(f"buffered vote, before its flush: {await revalidated(client, listings, before)}")
+            print(f"buffered vote, after its flush:  {await revalidated(client, listings, after_commit)}")
+            settings.VOTE_BUFFER_ENABLED = False
+
+            before = await etags(client, listings)
+            updated = await recompute_hot_scores(session_factory)
+            await listing_versions.bump_sort("hot")
+            print(f"hot score job ({updated} ideas): {await revalidated(client, listings, before)}")
+
+            before = await etags(client, listings)
+            await client.delete(f"/api/admin/reject/{idea_ids[1]}")
+            await asyncio.sleep(0.05)
+            print(f"un-approving an idea in {CATEGORIES[1]}: {await revalidated(client, listings, before)}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.requests))
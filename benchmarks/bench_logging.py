@@ -0,0 +1,174 @@
+# benchmarks/bench_logging.py
+"""
+Request latency with file logging enabled, old vs queued logging.
+
+``before`` rebuilds the previous setup: synchronous StreamHandler and
+FileHandler on the event loop, and every submission's full payload logged.
+``after`` is ``configure_logging()``: a QueueListener thread does the
+writing, records are JSON, and payloads are sampled and truncated. Both
+modes write INFO records to the log file, and console output goes to a
+file as well (as under a container log collector).
+
+``--sink-latency-ms`` adds a delay to every write, standing in for a slow
+or contended disk, which is where writing on the event loop really hurts.
+
+    python -m benchmarks.bench_logging [--requests 2000] [--concurrency 20] [--sink-latency-ms 0 1]
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import logging
+import statistics
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from sqlalchemy import event
+
+from app import app
+from app.config import settings
+from app.dependencies import submission_limiter
+from app.logging_config import configure_logging, stop_logging
+from benchmarks.common import asgi_client, create_schema, make_sqlite_engine, override_db
+
+OLD_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class SlowFile:
+    """Text file whose writes take at least ``latency`` seconds"""
+
+    def __init__(self, path: Path, latency: float):
+        self.file = open(path, "a", encoding="utf-8")
+        self.latency = latency
+
+    def write(self, text: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def old_logging(tmp: Path, latency: float):
+    """The previous dictConfig: synchronous handlers, every payload logged in full"""
+    stop_logging()
+    formatter = logging.Formatter(OLD_FORMAT)
+    console = logging.StreamHandler(SlowFile(tmp / "console-before.log", latency))
+    file = logging.StreamHandler(SlowFile(tmp / "app-before.log", latency))
+    for handler in (console, file):
+        handler.setFormatter(formatter)
+    for name in ("", "app"):
+        logger = logging.getLogger(name)
+        logger.handlers[:] = [console, file]
+        logger.setLevel(logging.INFO)
+    logging.getLogger("app").propagate = False
+    settings.LOG_PAYLOAD_SAMPLE_RATE = 1.0
+    settings.LOG_PAYLOAD_MAX_CHARS = 1 << 20
+    return [console.stream, file.stream]
+
+
+def new_logging(tmp: Path, latency: float):
+    settings.LOG_FORMAT = "json"
+    settings.LOG_FILE = str(tmp / "app-after.log")
+    settings.LOG_FILE_LEVEL = "INFO"
+    settings.LOG_PAYLOAD_SAMPLE_RATE = 0.01
+    settings.LOG_PAYLOAD_MAX_CHARS = 512
+    configure_logging()
+    from app import logging_config
+    streams = []
+    for handler in logging_config._listener.handlers:
+        if isinstance(handler, RotatingFileHandler) and not latency:
+            continue  # the real rotating file
+        streams.append(SlowFile(tmp / f"{type(handler).__name__}-after.log", latency))
+        handler.setStream(streams[-1])
+    return streams
+
+
+async def run(client, requests: int, concurrency: int, seq) -> list:
+    latencies = []
+    pending = iter(range(requests))
+    failures = 0
+    details = "A detailed plan with plenty of explanation. " * 220  # ~10 KB
+
+    async def submitter():
+        nonlocal failures
+        for _ in pending:
+            n = next(seq)
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/ideas",
+                json={
+                    "title": f"Logging benchmark idea {n}",
+                    "summary": "Measuring request latency with file logging enabled.",
+                    "details": details,
+                    "category": "technology",
+                    "is_new": True,
+                },
+                # One voter, so its hash is cached and the limiter is off anyway
+                headers={"User-Agent": "bench-submitter"},
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                failures += 1
+
+    await asyncio.gather(*(submitter() for _ in range(concurrency)))
+    if failures:
+        print(f"   warning: {failures} failed submissions")
+    return sorted(latencies)
+
+
+async def main(requests: int, concurrency: int, latencies_ms):
+    submission_limiter.enabled = False
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # the benchmark client
+    seq = itertools.count()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        # One connection: requests queue on the pool instead of SQLite's
+        # busy-wait backoff, whose sleeps would swamp the tail latencies
+        engine = make_sqlite_engine(tmp / "bench.db", pool_size=1, max_overflow=0)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _no_fsync(dbapi_connection, connection_record):
+            # Commit fsyncs would dwarf the logging cost being measured
+            dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+        await create_schema(engine)
+        override_db(app, engine)
+
+        print(f"{requests} submissions with ~10 KB details, concurrency {concurrency}")
+        print(f"{'sink latency':>13}{'mode':>8}{'p50':>10}{'p99':>10}{'max':>10}")
+        async with asgi_client(app) as client:
+            logging.disable(logging.INFO)
+            await run(client, 50, concurrency, seq)  # warm up
+            logging.disable(logging.NOTSET)
+            for latency_ms in latencies_ms:
+                for mode, setup in (("before", old_logging), ("after", new_logging)):
+                    streams = setup(tmp, latency_ms / 1000)
+                    samples = await run(client, requests, concurrency, seq)
+                    stop_logging()
+                    for stream in streams:
+                        stream.close()
+                    print(
+                        f"{latency_ms:>11}ms{mode:>8}"
+                        f"{statistics.median(samples) * 1e3:8.2f}ms"
+                        f"{samples[int(len(samples) * 0.99)] * 1e3:8.2f}ms"
+                        f"{samples[-1] * 1e3:8.2f}ms"
+                    )
+        logging.disable(logging.CRITICAL)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--sink-latency-ms", type=float, nargs="+", default=[0, 1])
+    args = parser.parse_args()
+    with contextlib.redirect_stderr(open("/dev/null", "w")):
+        asyncio.run(main(args.requests, args.concurrency, args.sink_latency_ms))
@@ -0,0 +1,66 @@
+# benchmarks/bench_moderation.py
+"""
+Clearing a moderation backlog: per-idea status updates vs set-based ones.
+
+1. ``update_idea_status`` per idea (one entity load and flush each).
+2. ``moderate_ideas`` with the same ids (chunked ``UPDATE ... WHERE id IN``).
+3. ``moderate_matching`` over the pending filter (keyset walk of the
+   status index).
+
+Each run starts from ``--ideas`` pending ideas and commits once.
+
+    python -m benchmarks.bench_moderation [--ideas 5000]
+"""
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.idea import Idea
+from app.services.ideas import IdeaService
+from app.services.listing_cache import ListingCache, MemoryCacheBackend
+from benchmarks.common import Timer, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+
+async def per_idea(service: IdeaService, idea_ids):
+    for idea_id in idea_ids:
+        await service.update_idea_status(idea_id, 'approved')
+
+
+async def main(ideas: int):
+    quiet_logging()
+    runs = (
+        ("update_idea_status per idea", per_idea),
+        ("moderate_ideas", lambda service, ids: service.moderate_ideas(ids, 'approved')),
+        ("moderate_matching", lambda service, ids: service.moderate_matching('approved', limit=len(ids))),
+    )
+    print(f"approving {ideas} pending ideas")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        idea_ids = await seed_ideas(engine, ideas)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        for label, run in runs:
+            async with engine.begin() as conn:
+                await conn.execute(Idea.__table__.update().values(status='pending'))
+            cache = ListingCache(MemoryCacheBackend(1000), ttl=30)
+            async with sessions() as session:
+                with Timer() as timer:
+                    await run(IdeaService(session, listing_cache=cache), idea_ids)
+                    await session.commit()
+                approved = await session.scalar(
+                    select(func.count()).select_from(Idea).where(Idea.status == 'approved')
+                )
+            print(f"  {label:<30}{timer.elapsed * 1e3:9.1f}ms   {approved} approved")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ideas", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.ideas))
@@ -0,0 +1,36 @@
+# benchmarks/bench_names.py
+"""
+Per-submission cost of picking an anonymous animal name.
+
+Compares re-parsing the name file on every call (the old behaviour) with
+the process-wide ``NamePool``.
+
+    python -m benchmarks.bench_names
+"""
+import timeit
+from random import choice
+
+from app.utils.names import ADJECTIVES, DATA_FILE, get_name_pool, load_animal_names
+
+
+def reparse_every_call() -> str:
+    names = load_animal_names(DATA_FILE)
+    return f"{choice(ADJECTIVES)}{choice(names)}"
+
+
+def pooled() -> str:
+    return get_name_pool().choice()
+
+
+def main():
+    get_name_pool()
+    for label, func, number in (
+        ("re-parse per call", reparse_every_call, 200),
+        ("cached pool", pooled, 200_000),
+    ):
+        best = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f"{label:<20} {best * 1e6:10.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
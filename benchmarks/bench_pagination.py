@@ -0,0 +1,74 @@
+# benchmarks/bench_pagination.py
+"""
+Offset vs keyset (cursor) pagination for GET /api/ideas.
+
+Seeds an approved-ideas table and times fetching page 1 and a deep page
+with both strategies for every sort mode, at the service layer.
+
+    python -m benchmarks.bench_pagination [--rows 1000000] [--page 5000]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.ideas import SORT_KEYS, IdeaService
+from benchmarks.common import create_schema, make_sqlite_engine, override_db, quiet_logging, seed_ideas
+from app import app
+
+
+async def time_fetch(session_factory, repeat: int, **kwargs) -> float:
+    samples = []
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await IdeaService(session).get_approved_ideas(**kwargs)
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+async def cursor_for_page(session_factory, sort: str, page: int, per_page: int) -> str:
+    """Cursor pointing just before ``page`` (setup only, not timed)"""
+    async with session_factory() as session:
+        previous = await IdeaService(session).get_approved_ideas(
+            sort=sort, page=(page - 1) * per_page, per_page=1
+        )
+    return IdeaService.next_cursor(previous, sort, 1)
+
+
+async def main(rows: int, page: int, per_page: int, repeat: int):
+    quiet_logging()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        print(f"seeding {rows} ideas...")
+        await seed_ideas(engine, rows)
+        session_factory = override_db(app, engine)
+
+        print(f"{'sort':<14}{'strategy':<10}{'page 1':>12}{f'page {page}':>14}")
+        for sort in SORT_KEYS:
+            deep_cursor = await cursor_for_page(session_factory, sort, page, per_page)
+            first = await time_fetch(session_factory, repeat, sort=sort, per_page=per_page)
+            deep_offset = await time_fetch(
+                session_factory, repeat, sort=sort, page=page, per_page=per_page
+            )
+            deep_keyset = await time_fetch(
+                session_factory, repeat, sort=sort, per_page=per_page, cursor=deep_cursor
+            )
+            print(f"{sort:<14}{'offset':<10}{first * 1e3:10.2f}ms{deep_offset * 1e3:12.2f}ms")
+            print(f"{sort:<14}{'cursor':<10}{first * 1e3:10.2f}ms{deep_keyset * 1e3:12.2f}ms")
+
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=5000)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.page, args.per_page, args.repeat))
@@ -0,0 +1,136 @@
+# benchmarks/bench_projection.py
+"""
+Rows/sec and peak memory of loading one idea list page.
+
+Compares full entity loads with ``details`` undeferred (the previous list
+query), entity loads with ``details`` deferred, and the column projection
+``IdeaService.get_approved_ideas`` uses. Each strategy runs in a fresh
+process so its peak RSS is not inflated by the others; the Python heap
+peak of a single page load is taken with tracemalloc.
+
+    python -m benchmarks.bench_projection [--per-page 500] [--details 10000]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import undefer
+
+from app.models.idea import Idea
+from app.services.ideas import IdeaService
+from benchmarks.common import create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+PAGE_QUERY = (
+    select(Idea).where(Idea.status == 'approved')
+    .order_by(Idea.created_at.desc(), Idea.id.desc())
+)
+
+
+async def load_entities(session, per_page: int):
+    stmt = PAGE_QUERY.options(undefer(Idea.details)).limit(per_page)
+    return (await session.scalars(stmt)).all()
+
+
+async def load_deferred(session, per_page: int):
+    return (await session.scalars(PAGE_QUERY.limit(per_page))).all()
+
+
+async def load_projection(session, per_page: int):
+    return await IdeaService(session).get_approved_ideas(per_page=per_page)
+
+
+STRATEGIES = {
+    "entities": load_entities,
+    "deferred": load_deferred,
+    "projection": load_projection,
+}
+
+
+def _peak_rss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def measure(db_path: str, strategy: str, per_page: int, repeat: int) -> dict:
+    quiet_logging()
+    load = STRATEGIES[strategy]
+    engine = make_sqlite_engine(Path(db_path))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        await load(session, per_page)  # warm up connections and statement caches
+
+    rss_before = _peak_rss_kib()
+    tracemalloc.start()
+    async with session_factory() as session:
+        rows = await load(session, per_page)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        async with session_factory() as session:
+            await load(session, per_page)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    return {
+        "rows_per_sec": per_page * repeat / elapsed,
+        "heap_peak_kib": heap_peak / 1024,
+        "rss_growth_kib": _peak_rss_kib() - rss_before,
+        "peak_rss_kib": _peak_rss_kib(),
+    }
+
+
+def _worker(db_path: str, strategy: str, per_page: int, repeat: int, results):
+    results.put(asyncio.run(measure(db_path, strategy, per_page, repeat)))
+
+
+async def prepare(db_path: Path, rows: int, details: int):
+    quiet_logging()
+    engine = make_sqlite_engine(db_path)
+    await create_schema(engine)
+    await seed_ideas(engine, rows)
+    async with engine.begin() as conn:
+        await conn.execute(update(Idea.__table__).values(details="x" * details))
+    await engine.dispose()
+
+
+def main(rows: int, per_page: int, details: int, repeat: int):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        asyncio.run(prepare(db_path, max(rows, per_page), details))
+
+        print(f"{per_page}-item page, {details}-char details")
+        print(f"{'strategy':<12}{'rows/sec':>12}{'heap peak':>14}{'RSS growth':>14}{'peak RSS':>14}")
+        for strategy in STRATEGIES:
+            results = context.Queue()
+            process = context.Process(
+                target=_worker, args=(str(db_path), strategy, per_page, repeat, results)
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            print(
+                f"{strategy:<12}{result['rows_per_sec']:>12,.0f}"
+                f"{result['heap_peak_kib']:>11,.0f}KiB"
+                f"{result['rss_growth_kib']:>11,.0f}KiB"
+                f"{result['peak_rss_kib']:>11,.0f}KiB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--per-page", type=int, default=500)
+    parser.add_argument("--details", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.per_page, args.details, args.repeat)
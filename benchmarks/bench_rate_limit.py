@@ -0,0 +1,97 @@
+# benchmarks/bench_rate_limit.py
+"""
+Token-bucket rate limit storages.
+
+1. Decision latency per backend (Redis runs on fakeredis, which needs
+   ``fakeredis[lua]`` for the script; skipped otherwise).
+2. Effective limit when several worker processes check the same voter:
+   per-worker memory buckets admit N times the limit, the shared mmap
+   table admits it once.
+3. Memory stays bounded under a flood of unique voter keys.
+
+    python -m benchmarks.bench_rate_limit [--checks 20000] [--workers 4]
+"""
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from limits import parse
+from limits.storage import storage_from_string
+
+from app.services.rate_limit import TokenBucketRateLimiter
+from benchmarks.common import quiet_logging
+
+
+def latency(storage, checks: int):
+    limiter = TokenBucketRateLimiter(storage)
+    item = parse("1000000/second")
+    samples = []
+    for i in range(checks):
+        started = time.perf_counter()
+        limiter.hit(item, f"voter-{i % 1000}", "/api/ideas/vote")
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def _hammer(uri: str, attempts: int, results):
+    limiter = TokenBucketRateLimiter(storage_from_string(uri))
+    item = parse("100/hour")
+    results.put(sum(limiter.hit(item, "same-voter", "/api/ideas/vote") for _ in range(attempts)))
+
+
+def admitted(uri: str, workers: int, attempts: int) -> int:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=_hammer, args=(uri, attempts, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total
+
+
+def main(checks: int, workers: int):
+    quiet_logging()
+    with tempfile.TemporaryDirectory() as tmp:
+        mmap_uri = f"bucket-mmap://{Path(tmp) / 'ratelimit.bin'}?slots=65536"
+
+        print("1. decision latency")
+        storages = {
+            "memory": storage_from_string("bucket-memory://"),
+            "mmap": storage_from_string(mmap_uri),
+        }
+        try:
+            import fakeredis
+            import lupa  # noqa: F401  (fakeredis runs Lua scripts through it)
+        except ImportError:
+            print("   redis: skipped (needs fakeredis[lua])")
+        else:
+            storages["redis"] = storage_from_string("bucket-redis://fake", client=fakeredis.FakeRedis())
+        for name, storage in storages.items():
+            median, p99 = latency(storage, checks)
+            print(f"   {name:<8} median {median * 1e6:7.1f}us  p99 {p99 * 1e6:7.1f}us")
+
+        print(f"2. '100/hour' for one voter, {workers} workers x 200 attempts")
+        print(f"   memory per worker: {admitted('bucket-memory://', workers, 200)} admitted")
+        print(f"   shared mmap:       {admitted(mmap_uri, workers, 200)} admitted")
+
+        print("3. 1,000,000 unique voters, memory storage capped at 100,000 keys")
+        storage = storage_from_string("bucket-memory://", max_keys=100000)
+        limiter = TokenBucketRateLimiter(storage)
+        item = parse("5/minute")
+        for i in range(1_000_000):
+            limiter.hit(item, f"voter-{i}", "/api/ideas")
+        print(f"   buckets held: {len(storage._buckets)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    main(args.checks, args.workers)
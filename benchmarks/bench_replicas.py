@@ -0,0 +1,218 @@
+# benchmarks/bench_replicas.py
+"""
+Read replicas: listing traffic off the primary's pool, read-your-writes, failover.
+
+Seeds ``--rows`` approved ideas into one SQLite file and copies it to a
+second, opened read-only, standing in for a replica. The copy never
+catches up by itself; the benchmark replays writes into it where a real
+replica would have applied them. Then:
+
+* runs ``--readers`` clients paging through ``GET /api/ideas`` (listing
+  cache off) beside ``--voters`` clients voting, for ``--seconds``, once
+  with every read on the primary (the replica marked down) and once with
+  reads on the replica, both engines with a pool of ``--pool-size`` and no
+  overflow, reporting latencies and pool checkout waits per engine;
+* votes, then reads the idea back as the voter (pinned to the primary by
+  the ``ideahub_rw`` cookie) and as another client (replica), before and
+  after the read-your-writes window;
+* breaks the replica's file and shows reads failing over to the primary,
+  then returning once a health check passes.
+
+    python -m benchmarks.bench_replicas [--rows 20000] [--seconds 10] [--readers 16] [--voters 4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.db.session as db_session
+from app.config import settings
+from app.db.instrumentation import InstrumentedPool, instrument_engine
+from app.db.replicas import READ_YOUR_WRITES_COOKIE
+from app.dependencies import voting_limiter
+from app.factory import create_app
+from app.models.idea import Idea
+from app.security import security_service
+from benchmarks.common import asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+WINDOW = 1.0
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def pool_waits(engine_name: str):
+    return (
+        sample("ideahub_db_pool_wait_seconds_count", engine=engine_name),
+        sample("ideahub_db_pool_wait_seconds_sum", engine=engine_name),
+    )
+
+
+async def reader(client, until: float, samples: list):
+    rng = random.Random(id(samples))
+    while time.perf_counter() < until:
+        params = {"sort": "popular", "per_page": 20, "page": rng.randint(1, 50)}
+        started = time.perf_counter()
+        response = await client.get("/api/ideas", params=params)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+
+
+async def voter(client, idea_ids, until: float, samples: list):
+    rng = random.Random(len(samples))
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        response = await client.post(
+            f"/api/ideas/{rng.choice(idea_ids)}/vote", json={"vote_type": rng.choice(("upvote", "downvote"))}
+        )
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+
+
+async def mixed_load(bench_app, idea_ids, seconds: float, readers: int, voters: int):
+    reads, votes = [], []
+    clients = [asgi_client(bench_app, headers={"User-Agent": f"bench-{n}"}) for n in range(readers + voters)]
+    until = time.perf_counter() + seconds
+    try:
+        await asyncio.gather(
+            *(reader(client, until, reads) for client in clients[:readers]),
+            *(voter(client, idea_ids, until, votes) for client in clients[readers:]),
+        )
+    finally:
+        for client in clients:
+            await client.aclose()
+    return reads, votes
+
+
+async def idea_counts(client, idea_id: str):
+    idea = (await client.get(f"/api/ideas/{idea_id}")).json()
+    return idea["upvotes"], idea["downvotes"]
+
+
+async def replicate(primary, replica_writer, idea_id: str):
+    """Apply the primary's counters of ``idea_id`` to the replica, as replication would"""
+    async with primary.connect() as conn:
+        row = (await conn.execute(select(Idea.upvotes, Idea.downvotes).where(Idea.id == idea_id))).one()
+    async with replica_writer.begin() as conn:
+        await conn.execute(update(Idea).where(Idea.id == idea_id).values(upvotes=row.upvotes, downvotes=row.downvotes))
+
+
+async def main(rows: int, seconds: float, readers: int, voters: int, pool_size: int):
+    quiet_logging()
+    security_service.hash_mode = "blake2"
+    voting_limiter.enabled = False
+    settings.LISTING_CACHE_ENABLED = False
+    settings.ENABLE_STAGE_TIMING = True
+    settings.DB_READ_YOUR_WRITES_SECONDS = WINDOW
+    replicas = db_session.replicas
+
+    with tempfile.TemporaryDirectory() as tmp:
+        primary_path, replica_path = Path(tmp) / "primary.db", Path(tmp) / "replica.db"
+        seeder = make_sqlite_engine(primary_path)
+        await create_schema(seeder)
+        print(f"seeding {rows} ideas...")
+        idea_ids = await seed_ideas(seeder, rows)
+        await seeder.dispose()
+        shutil.copy(primary_path, replica_path)
+
+        pool = {"poolclass": InstrumentedPool, "pool_size": pool_size, "max_overflow": 0}
+        primary = make_sqlite_engine(primary_path, **pool)
+        instrument_engine(primary, "primary")
+        # Read-only, and failing to connect once the file is gone
+        replica = make_sqlite_engine(f"file:{replica_path}?mode=ro&uri=true", **pool)
+        instrument_engine(replica, "replica1")
+        replica_writer = make_sqlite_engine(replica_path)
+        db_session.AsyncSessionLocal = async_sessionmaker(primary, expire_on_commit=False)
+        replicas.add("replica1", replica)
+        # After the replica is added, so the read-your-writes middleware is registered
+        bench_app = create_app()
+
+        print(f"\n{readers} readers + {voters} voters for {seconds:.0f}s, pool_size={pool_size} per engine")
+        print(f"{'reads from':<12}{'listings':>8}{'p50':>9}{'p99':>9}{'votes':>7}{'p50':>9}{'p99':>9}"
+              f"  pool waits (checkouts, total wait)")
+        for label in ("primary", "replica"):
+            if label == "primary":
+                replicas.mark_down("replica1", "benchmark: primary only")
+            else:
+                await replicas.check()
+            before = {name: pool_waits(name) for name in ("primary", "replica1")}
+            reads, votes = await mixed_load(bench_app, idea_ids, seconds, readers, voters)
+            read_p50, read_p99 = percentiles(reads)
+            vote_p50, vote_p99 = percentiles(votes)
+            waits = []
+            for name in ("primary", "replica1"):
+                count, total = pool_waits(name)
+                waits.append(f"{name} {count - before[name][0]:.0f}, {(total - before[name][1]) * 1e3:.0f}ms")
+            print(f"{label:<12}{len(reads):>8}{read_p50 * 1e3:7.1f}ms{read_p99 * 1e3:7.1f}ms"
+                  f"{len(votes):>7}{vote_p50 * 1e3:7.1f}ms{vote_p99 * 1e3:7.1f}ms  {'; '.join(waits)}")
+        # Let the after-commit passes of the load's votes finish
+        await asyncio.sleep(WINDOW + 0.5)
+
+        routed = {
+            reason: sample("ideahub_db_read_sessions_total", engine=engine, reason=reason)
+            for engine, reason in (("replica1", "replica"), ("primary", "pinned"), ("primary", "failover"))
+        }
+        voted = idea_ids[0]
+        await replicate(primary, replica_writer, voted)
+        async with asgi_client(bench_app, headers={"User-Agent": "bench-voter"}) as voter_client, \
+                asgi_client(bench_app, headers={"User-Agent": "bench-reader"}) as other_client:
+            before = await idea_counts(other_client, voted)
+            response = await voter_client.post(f"/api/ideas/{voted}/vote", json={"vote_type": "upvote"})
+            print(f"\nvote: {before} -> {tuple(response.json()[key] for key in ('upvotes', 'downvotes'))}, "
+                  f"cookie {READ_YOUR_WRITES_COOKIE}={voter_client.cookies.get(READ_YOUR_WRITES_COOKIE)}")
+            print(f"read back as the voter:    {await idea_counts(voter_client, voted)} (primary)")
+            print(f"read back as other client: {await idea_counts(other_client, voted)} (replica, not caught up)")
+            await replicate(primary, replica_writer, voted)
+            await asyncio.sleep(WINDOW + 0.1)
+            print(f"after {WINDOW:.0f}s and replication: voter {await idea_counts(voter_client, voted)}, "
+                  f"other {await idea_counts(other_client, voted)} (both replica)")
+
+            await replica.dispose()
+            os.rename(replica_path, f"{replica_path}.moved")
+            failures = 0
+            for _ in range(20):
+                failures += (await other_client.get("/api/ideas")).status_code != 200
+            health = (await other_client.get("/health")).json()
+            print(f"\nreplica file gone: 20 listings, {failures} failed; replica healthy gauge "
+                  f"{sample('ideahub_db_replica_healthy', engine='replica1'):.0f}; "
+                  f"health {health['services']}")
+            os.rename(f"{replica_path}.moved", replica_path)
+            await replicas.check()
+            await other_client.get("/api/ideas")
+            health = (await other_client.get("/health")).json()
+            print(f"restored, after a health check: healthy gauge "
+                  f"{sample('ideahub_db_replica_healthy', engine='replica1'):.0f}; health {health['services']}")
+            print("read sessions since the mixed load: " + ", ".join(
+                f"{reason} {sample('ideahub_db_read_sessions_total', engine=engine, reason=reason) - routed[reason]:.0f}"
+                for engine, reason in (("replica1", "replica"), ("primary", "pinned"), ("primary", "failover"))
+            ))
+        await asyncio.sleep(WINDOW + 0.5)
+        await db_session.drain_after_commit_tasks(timeout=5)
+        for engine in (primary, replica, replica_writer):
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--voters", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.seconds, args.readers, args.voters, args.pool_size))
@@ -0,0 +1,165 @@
+# benchmarks/bench_search.py
+"""
+Search latency: LIKE scans vs the search index, at the service layer.
+
+Seeds ``--rows`` approved ideas whose text is drawn from a Zipf-distributed
+vocabulary, then times, per query (a common, a mid-frequency and a rare
+term, and a two-term query):
+
+* ``LIKE '%term%'`` over title, summary and details, newest first - what
+  ops runs by hand today;
+* ``IdeaService.search_ideas`` for page 1, and for page 3 from its cursor.
+
+On SQLite the search runs on the in-memory ``InvertedIndex``; its build
+time and memory are reported too. ``--database-url`` runs the same against
+MySQL and its FULLTEXT index instead. The tables there are DROPPED and
+recreated, so point it at a scratch database.
+
+    python -m benchmarks.bench_search [--rows 1000000] [--database-url mysql+aiomysql://...]
+"""
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.idea import Idea
+from app.services.ideas import LIST_COLUMNS, IdeaService
+from app.services.search import InvertedIndex
+from benchmarks.common import CATEGORIES, Timer, create_schema, make_sqlite_engine, quiet_logging
+
+SYLLABLES = ("ka", "lo", "mi", "ren", "tu", "sol", "vex", "dra", "pim", "qua", "zor", "bel", "nit", "gro")
+
+
+def vocabulary(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda word: (rng.random(), word))
+
+
+async def seed(engine, rows: int, words, batch_size: int = 5000):
+    rng = random.Random(1234)
+    # Zipf: the word at rank r turns up ~1/r as often as the most common one
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+    now = datetime.utcnow()
+
+    def text(count):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=count))
+
+    async with engine.begin() as conn:
+        for start in range(0, rows, batch_size):
+            await conn.execute(insert(Idea.__table__), [
+                {
+                    "id": f"00000000-0000-4000-8000-{i:012d}",
+                    "title": f"Idea {i}: {text(5)}",
+                    "slug": f"search-idea-{i}",
+                    "summary": f"{text(10)} {'.' * 50}"[:500],
+                    "details": text(40),
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "is_new": bool(i % 2),
+                    "status": "approved",
+                    "submitted_by": "SwiftBenchmark",
+                    "created_at": now - timedelta(seconds=i),
+                }
+                for i in range(start, min(start + batch_size, rows))
+            ])
+
+
+async def like_scan(session, term: str):
+    pattern = f"%{term}%"
+    await session.execute(
+        select(*LIST_COLUMNS)
+        .where(Idea.status == 'approved', or_(
+            Idea.title.like(pattern), Idea.summary.like(pattern), Idea.details.like(pattern)
+        ))
+        .order_by(Idea.created_at.desc())
+        .limit(20)
+    )
+
+
+async def search_page(session, index, query: str, cursor=None):
+    await IdeaService(session, search_index=index).search_ideas(query, per_page=20, cursor=cursor)
+
+
+async def cursor_for_page(session_factory, index, query: str, page: int):
+    """Cursor of ``page`` (setup only, not timed)"""
+    cursor = None
+    async with session_factory() as session:
+        for _ in range(page - 1):
+            _, cursor = await IdeaService(session, search_index=index).search_ideas(query, per_page=20, cursor=cursor)
+    return cursor
+
+
+async def percentiles(session_factory, repeat: int, func, *args):
+    samples = []
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await func(session, *args)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+async def main(rows: int, repeat: int, database_url: str):
+    quiet_logging()
+    words = vocabulary(20000)
+    queries = (
+        ("common", words[2]),
+        ("mid", words[300]),
+        ("rare", words[15000]),
+        ("two terms", f"{words[40]} {words[900]}"),
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        if database_url:
+            engine = create_async_engine(database_url)
+        else:
+            engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        print(f"seeding {rows} ideas on {engine.dialect.name}...")
+        await seed(engine, rows, words)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        index = InvertedIndex()
+        if not database_url:
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            async with session_factory() as session:
+                with Timer() as timer:
+                    await index.ensure_loaded(session)
+            rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+            print(f"index build: {timer.elapsed:.1f}s, ~{rss_growth:.0f}MB")
+
+        print(f"{'query':<12}{'strategy':<16}{'p50':>10}{'p99':>10}")
+        for label, query in queries:
+            cases = [
+                ("LIKE scan", like_scan, query.split()[0], max(1, repeat // 10)),
+                ("search p1", search_page, index, query, None, repeat),
+                ("search p3", search_page, index, query,
+                 await cursor_for_page(session_factory, index, query, 3), repeat),
+            ]
+            for strategy, func, *args, times in cases:
+                p50, p99 = await percentiles(session_factory, times, func, *args)
+                print(f"{label:<12}{strategy:<16}{p50 * 1e3:8.1f}ms{p99 * 1e3:8.1f}ms")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default="", help="scratch MySQL database (tables are dropped)")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat, args.database_url))
@@ -0,0 +1,82 @@
+# benchmarks/bench_serialization.py
+"""
+CPU cost of rendering a GET /api/ideas page.
+
+Compares the previous path (ORM entities -> ``List[IdeaResponse]``
+validation -> FastAPI's stdlib JSON encoding) with the current one
+(column-only rows -> ``dump_ideas``) and checks that both emit the same
+bytes. Times are process CPU per page, query included.
+
+    python -m benchmarks.bench_serialization [--sizes 20 100 500]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.idea import Idea
+from app.schemas.idea import IdeaResponse, dump_ideas, orjson, rows_to_dicts
+from app.services.ideas import IdeaService
+from benchmarks.common import create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+IDEA_LIST = TypeAdapter(List[IdeaResponse])
+
+
+async def render_orm(session, per_page: int) -> bytes:
+    ideas = (await session.scalars(
+        select(Idea).where(Idea.status == 'approved')
+        .order_by(Idea.created_at.desc(), Idea.id.desc())
+        .limit(per_page)
+    )).all()
+    validated = IDEA_LIST.validate_python(ideas, from_attributes=True)
+    return JSONResponse(content=jsonable_encoder(validated)).body
+
+
+async def render_rows(session, per_page: int) -> bytes:
+    rows = await IdeaService(session).get_approved_ideas(per_page=per_page)
+    return dump_ideas(rows_to_dicts(rows))
+
+
+async def cpu_per_page(session_factory, render, per_page: int, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        async with session_factory() as session:
+            await render(session, per_page)
+    return (time.process_time() - started) / repeat
+
+
+async def main(rows: int, sizes: List[int], repeat: int):
+    quiet_logging()
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        await seed_ideas(engine, max(rows, max(sizes)))
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        print(f"{'items':>6}{'orm+pydantic':>16}{'rows+dump':>14}{'speedup':>10}  identical")
+        for per_page in sizes:
+            async with session_factory() as session:
+                identical = await render_orm(session, per_page) == await render_rows(session, per_page)
+            old = await cpu_per_page(session_factory, render_orm, per_page, repeat)
+            new = await cpu_per_page(session_factory, render_rows, per_page, repeat)
+            print(f"{per_page:>6}{old * 1e3:14.3f}ms{new * 1e3:12.3f}ms{old / new:9.1f}x  {identical}")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.sizes, args.repeat))
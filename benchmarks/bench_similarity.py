@@ -0,0 +1,174 @@
+# benchmarks/bench_similarity.py
+"""
+Near-duplicate index: build cost, size, query latency and recall.
+
+Indexes ``--ideas`` synthetic ideas (title and summary drawn from the same
+Zipf vocabulary as ``bench_search``) straight into a ``MinHashIndex``,
+saving every ``--save-every`` ideas as ``similarity_job`` does, then maps
+the file into a fresh index as a restarted worker would and reports:
+
+* signature and build time, file size and bytes per idea;
+* resident memory of the mapped index, before and after querying;
+* query latency (signature included, as in ``submit_idea``) at the
+  submit threshold and the ``/similar`` threshold, for exact copies,
+  paraphrases and unrelated text;
+* recall of the original idea for each kind of paraphrase.
+
+The database is left out: ``refresh`` only adds a keyset scan on top.
+
+    python -m benchmarks.bench_similarity [--ideas 1000000] [--queries 1000]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from app.config import settings
+from app.services.similarity import MinHashIndex, idea_text, signature
+from benchmarks.bench_search import vocabulary
+from benchmarks.common import Timer
+
+PARAPHRASES = ("exact copy", "word replaced", "word dropped", "words appended", "two replaced")
+
+
+def paraphrase(kind: str, rng: random.Random, words, vocab):
+    """Summary ``words`` edited as ``kind``"""
+    words = list(words)
+    if kind == "word replaced":
+        words[rng.randrange(len(words))] = rng.choice(vocab)
+    elif kind == "word dropped":
+        del words[rng.randrange(len(words))]
+    elif kind == "words appended":
+        words.extend(rng.choices(vocab, k=3))
+    elif kind == "two replaced":
+        for position in rng.sample(range(len(words)), 2):
+            words[position] = rng.choice(vocab)
+    return words
+
+
+class Corpus:
+    """Deterministic idea text by number, so paraphrases can be rebuilt on demand"""
+
+    def __init__(self, words):
+        self.words = words
+        self.cum_weights = []
+        total = 0.0
+        for rank in range(1, len(words) + 1):
+            total += 1 / rank
+            self.cum_weights.append(total)
+
+    def parts(self, number: int):
+        rng = random.Random(number)
+        title = rng.choices(self.words, cum_weights=self.cum_weights, k=5)
+        summary = rng.choices(self.words, cum_weights=self.cum_weights, k=12)
+        return title, summary
+
+    def text(self, number: int) -> str:
+        title, summary = self.parts(number)
+        return idea_text(" ".join(title), " ".join(summary))
+
+
+def idea_id(number: int) -> str:
+    return str(uuid.UUID(int=number))
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def build(index: MinHashIndex, corpus: Corpus, ideas: int, save_every: int):
+    signing = saving = 0.0
+    for number in range(ideas):
+        started = time.perf_counter()
+        sig = signature(corpus.text(number))
+        signing += time.perf_counter() - started
+        index.add(idea_id(number), sig)
+        if index.tail_size >= save_every or number == ideas - 1:
+            with Timer() as timer:
+                index.save()
+            saving += timer.elapsed
+            print(f"  {number + 1:>9} ideas indexed, last save {timer.elapsed:.2f}s", end="\r")
+    print()
+    return signing, saving
+
+
+def latency(index: MinHashIndex, texts, threshold: float):
+    samples = []
+    for text in texts:
+        started = time.perf_counter()
+        sig = signature(text)
+        index.query(sig, threshold)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main(ideas: int, queries: int, save_every: int):
+    corpus = Corpus(vocabulary(20000))
+    rng = random.Random(99)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "minhash.bin")
+        print(f"indexing {ideas} ideas, saving every {save_every}")
+        builder = MinHashIndex(path)
+        with Timer() as timer:
+            signing, saving = build(builder, corpus, ideas, save_every)
+        builder.close()
+        size = os.path.getsize(path)
+        print(f"build: {timer.elapsed:.1f}s ({signing / ideas * 1e6:.0f}us/signature, {saving:.1f}s saving)")
+        print(f"file: {size / 2 ** 20:.1f}MB, {size / ideas:.0f} bytes/idea, "
+              f"{size / ideas * 1e6 / 2 ** 20:.0f}MB per million ideas")
+
+        rss_before = rss_mb()
+        index = MinHashIndex(path)
+        with Timer() as timer:
+            index.load()
+        print(f"load: {timer.elapsed * 1e3:.1f}ms, +{rss_mb() - rss_before:.1f}MB resident")
+
+        sample = rng.sample(range(ideas), min(queries, ideas))
+        paraphrased = {}
+        for kind in PARAPHRASES:
+            texts = []
+            for number in sample:
+                title, summary = corpus.parts(number)
+                texts.append(idea_text(" ".join(title), " ".join(paraphrase(kind, rng, summary, corpus.words))))
+            paraphrased[kind] = texts
+        unrelated = [corpus.text(ideas + number) for number in range(len(sample))]
+
+        print(f"\n{'query (signature included)':<28}{'threshold':>10}{'p50':>10}{'p99':>10}")
+        for label, texts in (("exact copy", paraphrased["exact copy"]),
+                             ("word replaced", paraphrased["word replaced"]),
+                             ("unrelated", unrelated)):
+            for threshold in (settings.NEAR_DUPLICATE_THRESHOLD, settings.SIMILAR_IDEAS_THRESHOLD):
+                p50, p99 = latency(index, texts, threshold)
+                print(f"{label:<28}{threshold:>10.2f}{p50 * 1e6:8.0f}us{p99 * 1e6:8.0f}us")
+        print(f"resident after querying: +{rss_mb() - rss_before:.1f}MB")
+
+        print(f"\n{'recall of the original':<28}" + "".join(
+            f"{threshold:>10.2f}"
+            for threshold in (settings.NEAR_DUPLICATE_THRESHOLD, settings.SIMILAR_IDEAS_THRESHOLD)
+        ))
+        for kind, texts in paraphrased.items():
+            cells = []
+            for threshold in (settings.NEAR_DUPLICATE_THRESHOLD, settings.SIMILAR_IDEAS_THRESHOLD):
+                found = sum(
+                    idea_id(number) in {match_id for match_id, _ in index.query(signature(text), threshold, limit=50)}
+                    for number, text in zip(sample, texts)
+                )
+                cells.append(f"{found / len(texts):>10.1%}")
+            print(f"{kind:<28}" + "".join(cells))
+        flagged = sum(bool(index.query(signature(text), settings.NEAR_DUPLICATE_THRESHOLD)) for text in unrelated)
+        print(f"unrelated text flagged as a duplicate: {flagged / len(unrelated):.2%}")
+        index.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ideas", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--save-every", type=int, default=settings.SIMILARITY_SAVE_EVERY)
+    args = parser.parse_args()
+    main(args.ideas, args.queries, args.save_every)
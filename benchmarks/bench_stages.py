@@ -0,0 +1,114 @@
+# benchmarks/bench_stages.py
+"""
+Per-stage instrumentation: what it reports and what it costs.
+
+1. Cost of one ``stage()`` block with timing on and off.
+2. Vote throughput with timing on and off.
+3. Where a vote's time goes: mean per stage and pool wait, as read back
+   from the Prometheus registry.
+
+Votes go through the real ``get_db`` dependency against an instrumented
+aiosqlite engine; every voter is distinct, so hashing and the limiter run
+for each vote (BLAKE2 voter hashes, as PBKDF2 would dominate).
+
+    python -m benchmarks.bench_stages [--votes 2000] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.db.session as db_session
+from app import app
+from app.config import settings
+from app.db.instrumentation import InstrumentedPool, instrument_engine
+from app.security import security_service
+from app.utils.stages import stage
+from benchmarks.common import Timer, asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+STAGES = (
+    ("security", "voter_hash"),
+    ("security", "rate_limit"),
+    ("vote", "upsert"),
+    ("vote", "counters"),
+    ("db", "commit"),
+)
+
+
+def stage_overhead(calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        with stage("bench", "noop"):
+            pass
+    return (time.perf_counter() - started) / calls
+
+
+async def vote(client, idea_ids, votes: int, concurrency: int, voters) -> float:
+    pending = iter(range(votes))
+
+    async def voter():
+        for i in pending:
+            await client.post(
+                f"/api/ideas/{idea_ids[i % len(idea_ids)]}/vote",
+                json={"vote_type": "upvote"},
+                headers={"User-Agent": f"bench-voter-{next(voters)}"},
+            )
+
+    with Timer() as timer:
+        await asyncio.gather(*(voter() for _ in range(concurrency)))
+    return votes / timer.elapsed
+
+
+def mean(metric: str, **labels) -> float:
+    total = REGISTRY.get_sample_value(f"{metric}_sum", labels) or 0.0
+    count = REGISTRY.get_sample_value(f"{metric}_count", labels) or 0.0
+    return total / count if count else 0.0
+
+
+async def main(votes: int, concurrency: int):
+    quiet_logging()
+    security_service.hash_mode = "blake2"
+
+    print("1. one stage() block")
+    for enabled in (False, True):
+        settings.ENABLE_STAGE_TIMING = enabled
+        print(f"   timing {'on ' if enabled else 'off'}: {stage_overhead(200000) * 1e9:7.0f}ns")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(
+            Path(tmp) / "bench.db", poolclass=InstrumentedPool, pool_size=5, max_overflow=5
+        )
+        instrument_engine(engine, "bench")
+        await create_schema(engine)
+        idea_ids = await seed_ideas(engine, 200)
+        # Exercise the real get_db dependency (commit stage included)
+        db_session.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        voters = itertools.count()
+
+        print(f"2. {votes} votes at concurrency {concurrency}")
+        async with asgi_client(app) as client:
+            await vote(client, idea_ids, 200, concurrency, voters)  # warm up
+            for enabled in (False, True, False, True):
+                settings.ENABLE_STAGE_TIMING = enabled
+                rps = await vote(client, idea_ids, votes, concurrency, voters)
+                print(f"   timing {'on ' if enabled else 'off'}: {rps:8.1f} votes/sec")
+
+        print("3. mean time per stage")
+        for component, name in STAGES:
+            value = mean("ideahub_stage_seconds", component=component, stage=name)
+            print(f"   {component + '.' + name:<20}{value * 1e3:8.3f}ms")
+        print(f"   {'pool wait':<20}{mean('ideahub_db_pool_wait_seconds', engine='bench') * 1e3:8.3f}ms")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--votes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.votes, args.concurrency))
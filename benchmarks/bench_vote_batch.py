@@ -0,0 +1,116 @@
+# benchmarks/bench_vote_batch.py
+"""
+Batch vote ingestion vs one request per vote.
+
+Every voter casts ``--per-voter`` votes, either as that many
+``POST /api/ideas/{id}/vote`` calls or as batches of ``--batch-size``
+items on ``POST /api/ideas/votes``. Both paths go through the real
+``get_db`` dependency against aiosqlite; the final counters are checked
+against the ``votes`` table afterwards. The voting limiter is switched
+off (the per-voter single-vote limit would otherwise throttle the
+baseline); its per-check cost is covered by ``bench_rate_limit``.
+
+    python -m benchmarks.bench_vote_batch [--voters 200] [--per-voter 20] [--batch-size 20]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.db.session as db_session
+from app import app
+from app.dependencies import voting_limiter
+from app.models.idea import Idea, Vote
+from app.security import security_service
+from benchmarks.common import Timer, asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+
+def plan(idea_ids, voters: int, per_voter: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        [(idea_id, rng.choice(("upvote", "downvote"))) for idea_id in rng.sample(idea_ids, per_voter)]
+        for _ in range(voters)
+    ]
+
+
+async def run(client, votes, batch_size: int, concurrency: int, voter_ids) -> float:
+    pending = iter(votes)
+
+    async def worker():
+        for ballot in pending:
+            headers = {"User-Agent": f"bench-voter-{next(voter_ids)}"}
+            if batch_size <= 1:
+                for idea_id, vote_type in ballot:
+                    response = await client.post(
+                        f"/api/ideas/{idea_id}/vote", json={"vote_type": vote_type}, headers=headers
+                    )
+                    response.raise_for_status()
+                continue
+            for start in range(0, len(ballot), batch_size):
+                items = ballot[start:start + batch_size]
+                response = await client.post(
+                    "/api/ideas/votes",
+                    json={"votes": [{"idea_id": i, "vote_type": t} for i, t in items]},
+                    headers=headers,
+                )
+                response.raise_for_status()
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sum(len(ballot) for ballot in votes) / timer.elapsed
+
+
+async def counters_match(engine) -> bool:
+    async with engine.connect() as conn:
+        tallied = {
+            (row.idea_id, row.vote_type): row.n
+            for row in await conn.execute(
+                select(Vote.idea_id, Vote.vote_type, func.count().label("n")).group_by(Vote.idea_id, Vote.vote_type)
+            )
+        }
+        ideas = (await conn.execute(select(Idea.id, Idea.upvotes, Idea.downvotes))).all()
+    return all(
+        tallied.get((row.id, "upvote"), 0) == row.upvotes and tallied.get((row.id, "downvote"), 0) == row.downvotes
+        for row in ideas
+    )
+
+
+async def main(voters: int, per_voter: int, batch_size: int, concurrency: int):
+    quiet_logging()
+    security_service.hash_mode = "blake2"
+    voting_limiter.enabled = False
+    voter_ids = itertools.count()
+
+    print(f"{voters} voters x {per_voter} votes, concurrency {concurrency}")
+    for label, size in (("single", 1), (f"batch of {batch_size}", batch_size)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_sqlite_engine(Path(tmp) / "bench.db", pool_size=5, max_overflow=5)
+            await create_schema(engine)
+            # Start from zeroed counters so they can be checked against the votes table
+            idea_ids = await seed_ideas(engine, max(200, per_voter))
+            async with engine.begin() as conn:
+                await conn.execute(Idea.__table__.update().values(upvotes=0, downvotes=0))
+            db_session.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+            async with asgi_client(app) as client:
+                # Warm up
+                await run(client, plan(idea_ids, 20, per_voter, seed=1), size, concurrency, voter_ids)
+                rate = await run(client, plan(idea_ids, voters, per_voter, seed=2), size, concurrency, voter_ids)
+            consistent = await counters_match(engine)
+            print(f"  {label:<14}{rate:9.1f} votes/sec   counters {'ok' if consistent else 'MISMATCH'}")
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--voters", type=int, default=200)
+    parser.add_argument("--per-voter", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.voters, args.per_voter, args.batch_size, args.concurrency))
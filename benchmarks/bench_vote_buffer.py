@@ -0,0 +1,90 @@
+# benchmarks/bench_vote_buffer.py
+"""
+Single-hot-idea vote throughput with and without the write-behind buffer.
+
+Every request comes from a distinct voter and targets the same idea, so
+without buffering each vote serialises on that idea's row. Counters are
+checked against ``COUNT(*)`` of votes after each run.
+
+    python -m benchmarks.bench_vote_buffer [--votes 2000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from app import app
+from app.dependencies import get_vote_buffer
+from app.models.idea import Idea, Vote
+from app.security import security_service
+from app.services.vote_buffer import VoteBuffer
+from benchmarks.common import (
+    Timer, asgi_client, create_schema, make_sqlite_engine, override_db, quiet_logging, seed_ideas
+)
+
+
+async def run(session_factory, idea_id: str, votes: int, concurrency: int, tag: str) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def cast(client, n):
+        nonlocal failures
+        async with semaphore:
+            response = await client.post(
+                f"/api/ideas/{idea_id}/vote",
+                json={"vote_type": "upvote" if n % 3 else "downvote"},
+                headers={"User-Agent": f"{tag}-voter-{n}"},
+            )
+            failures += response.status_code != 200
+
+    async with asgi_client(app) as client:
+        with Timer() as timer:
+            await asyncio.gather(*(cast(client, n) for n in range(votes)))
+    if failures:
+        print(f"  warning: {failures} failed votes")
+    return votes / timer.elapsed
+
+
+async def counters_match(session_factory, idea_id: str) -> bool:
+    async with session_factory() as session:
+        idea = await session.get(Idea, idea_id)
+        counted = await session.scalar(select(func.count()).where(Vote.idea_id == idea_id))
+        return idea.upvotes + idea.downvotes == counted
+
+
+async def main(votes: int, concurrency: int):
+    quiet_logging()
+    # Measure the counter path, not PBKDF2
+    security_service.hash_mode = "blake2"
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db")
+        await create_schema(engine)
+        direct_idea, buffered_idea = await seed_ideas(engine, 2)
+        session_factory = override_db(app, engine)
+        async with session_factory() as session, session.begin():
+            for idea_id in (direct_idea, buffered_idea):
+                idea = await session.get(Idea, idea_id)
+                idea.upvotes = idea.downvotes = 0
+
+        rps = await run(session_factory, direct_idea, votes, concurrency, "direct")
+        print(f"direct counters   {rps:10.1f} votes/sec  consistent={await counters_match(session_factory, direct_idea)}")
+
+        buffer = VoteBuffer(session_factory, flush_interval=0.05, max_votes=500)
+        app.dependency_overrides[get_vote_buffer] = lambda: buffer
+        buffer.start()
+        rps = await run(session_factory, buffered_idea, votes, concurrency, "buffered")
+        await buffer.stop()
+        print(f"write-behind      {rps:10.1f} votes/sec  consistent={await counters_match(session_factory, buffered_idea)}")
+
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--votes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.votes, args.concurrency))
@@ -0,0 +1,219 @@
+# benchmarks/bench_vote_stream.py
+"""
+Live vote count streams: idle connection cost, coalescing and relaying.
+
+Opens ``--connections`` ``GET /api/ideas/stream`` requests against the
+real ASGI app, in-process but through the whole middleware stack as
+uvicorn would call it, each following ``--follow`` random ideas or, for
+one in ten, a whole category. One in a hundred takes ``--slow`` seconds
+to read each chunk. Then:
+
+* resident memory per idle connection;
+* batch votes on Zipf-hot ideas through ``POST /api/ideas/votes`` with the
+  streams open vs with none, and what the streams received: events,
+  idea updates, resets, and any idea updated twice within one interval;
+* two hubs joined by ``LocalBroadcastBackend``, standing in for two
+  workers on Redis: updates published on one reaching the other.
+
+    python -m benchmarks.bench_vote_stream [--connections 10000] [--votes 5000]
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import random
+import tempfile
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.db.session as db_session
+from app import app
+from app.dependencies import voting_limiter
+from app.security import security_service
+from app.services.vote_stream import LocalBroadcastBackend, VoteStream, vote_stream
+from benchmarks.common import CATEGORIES, Timer, asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class StreamClient:
+    """One SSE connection driven straight through the ASGI interface"""
+
+    def __init__(self, query: str, interval: float, slow: float = 0.0):
+        self.query = query
+        self.interval = interval
+        self.slow = slow
+        self.opened = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.events = self.updates = self.resets = self.too_soon = 0
+        self._last_update = {}
+
+    async def run(self):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/api/ideas/stream",
+            "raw_path": b"/api/ideas/stream",
+            "query_string": self.query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+
+        async def receive():
+            await self.closed.wait()
+            return {"type": "http.disconnect"}
+
+        await app(scope, receive, self.send)
+
+    async def send(self, message):
+        if message["type"] != "http.response.body" or not message.get("body"):
+            return
+        body = message["body"]
+        if body.startswith(b"retry:"):
+            self.opened.set()
+        elif body.startswith(b"event: reset"):
+            self.resets += 1
+        elif body.startswith(b"event: counts"):
+            self.events += 1
+            now = asyncio.get_running_loop().time()
+            for update in json.loads(body.split(b"data: ", 1)[1]):
+                self.updates += 1
+                last = self._last_update.get(update["id"])
+                # Some slack for timer granularity
+                if last is not None and now - last < self.interval * 0.9:
+                    self.too_soon += 1
+                self._last_update[update["id"]] = now
+        if self.slow:
+            await asyncio.sleep(self.slow)
+
+
+async def cast_votes(client, idea_ids, votes: int, batch_size: int, concurrency: int, seed: int) -> float:
+    # Fresh voters per run, or repeated votes would be no-ops
+    rng = random.Random(seed)
+    # Zipf-hot ideas, as on a busy front page
+    weights = [1 / rank for rank in range(1, len(idea_ids) + 1)]
+    voters = itertools.count()
+    batches = [
+        [{"idea_id": idea_id, "vote_type": rng.choice(("upvote", "downvote"))}
+         for idea_id in set(rng.choices(idea_ids, weights=weights, k=batch_size))]
+        for _ in range(votes // batch_size)
+    ]
+    pending = iter(batches)
+
+    async def worker():
+        for batch in pending:
+            response = await client.post(
+                "/api/ideas/votes", json={"votes": batch}, headers={"User-Agent": f"bench-voter-{seed}-{next(voters)}"}
+            )
+            response.raise_for_status()
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sum(len(batch) for batch in batches) / timer.elapsed
+
+
+async def relay(updates: int):
+    """Two hubs over the local fake backend: one publishes, the other's subscribers receive"""
+    channel = LocalBroadcastBackend()
+    publisher = VoteStream(interval=0.05, backend=channel)
+    receiver = VoteStream(interval=0.05, max_pending=1000, backend=channel)
+    publisher.start()
+    receiver.start()
+    await asyncio.sleep(0)
+    subscription = receiver.subscribe([], CATEGORIES)
+    ideas = [f"relay-{i}" for i in range(1000)]
+    received = set()
+    with Timer() as timer:
+        for i in range(updates):
+            await publisher.publish([(ideas[i % len(ideas)], CATEGORIES[i % len(CATEGORIES)], i, 0)])
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        while len(received) < len(ideas):
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), 5)
+            except asyncio.TimeoutError:
+                break
+            received.update(subscription.pending)
+            subscription.take()
+    receiver.unsubscribe(subscription)
+    await publisher.stop()
+    await receiver.stop()
+    return len(received), len(ideas), timer.elapsed
+
+
+async def main(connections: int, follow: int, slow: float, votes: int, batch_size: int, concurrency: int):
+    quiet_logging()
+    security_service.hash_mode = "blake2"
+    voting_limiter.enabled = False
+    interval = vote_stream.interval
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "bench.db", pool_size=5, max_overflow=5)
+        await create_schema(engine)
+        idea_ids = await seed_ideas(engine, 1000)
+        db_session.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with asgi_client(app) as client:
+            # Warm up
+            await cast_votes(client, idea_ids, votes // 5, batch_size, concurrency, seed=0)
+            baseline = await cast_votes(client, idea_ids, votes, batch_size, concurrency, seed=1)
+
+            rng = random.Random(3)
+            gc.collect()
+            rss_before = rss_mb()
+            clients = []
+            for number in range(connections):
+                if number % 10 == 0:
+                    query = f"category={CATEGORIES[number % len(CATEGORIES)]}"
+                else:
+                    query = "&".join(f"ids={idea_id}" for idea_id in rng.sample(idea_ids, follow))
+                clients.append(StreamClient(query, interval, slow if rng.random() < 0.01 else 0.0))
+            tasks = [asyncio.create_task(stream_client.run()) for stream_client in clients]
+            await asyncio.gather(*(stream_client.opened.wait() for stream_client in clients))
+            gc.collect()
+            per_connection = (rss_mb() - rss_before) * 2 ** 20 / connections
+            print(f"{connections} idle streams: +{rss_mb() - rss_before:.1f}MB, "
+                  f"~{per_connection / 1024:.1f}KB each ({vote_stream.connections} subscribed)")
+
+            with_streams = await cast_votes(client, idea_ids, votes, batch_size, concurrency, seed=2)
+            await asyncio.sleep(interval * 2)
+            print(f"votes/sec: {baseline:.0f} without streams, {with_streams:.0f} with them")
+
+            events = sum(stream_client.events for stream_client in clients)
+            updates = sum(stream_client.updates for stream_client in clients)
+            resets = sum(stream_client.resets for stream_client in clients)
+            too_soon = sum(stream_client.too_soon for stream_client in clients)
+            print(f"sent {events} events carrying {updates} idea updates, {resets} resets; "
+                  f"{too_soon} ideas updated twice within an interval")
+
+            for stream_client in clients:
+                stream_client.closed.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print(f"after disconnecting: {vote_stream.connections} subscribed")
+        await engine.dispose()
+
+    received, expected, elapsed = await relay(20000)
+    print(f"relay: 20000 updates over 1000 ideas, {received}/{expected} ideas reached the other hub "
+          f"in {elapsed * 1e3:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--follow", type=int, default=10, help="idea ids per connection")
+    parser.add_argument("--slow", type=float, default=1.0, help="seconds a slow client takes per chunk")
+    parser.add_argument("--votes", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.connections, args.follow, args.slow, args.votes, args.batch_size, args.concurrency))
@@ -0,0 +1,157 @@
+# benchmarks/common.py
+"""
+Shared helpers for the offline benchmarks.
+
+The benchmarks run the real ASGI app in-process against an aiosqlite
+database standing in for MySQL, so they need ``aiosqlite`` and ``httpx``
+but no running servers.
+"""
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, List
+
+import httpx
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.session import Base, get_db
+from app.models.idea import Idea, Vote
+from app.services.ranking import recompute_hot_scores, score_values
+
+CATEGORIES = ("industry", "technology", "problem_area")
+
+
+def quiet_logging() -> None:
+    """Per-request INFO logs would dominate the measurements"""
+    logging.disable(logging.WARNING)
+
+
+def make_sqlite_engine(path: Path, **engine_options) -> AsyncEngine:
+    """aiosqlite engine with the MySQL functions our CHECK constraints rely on"""
+    # Writers queue on SQLite's single database lock, so allow long busy waits
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 60}, **engine_options)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("char_length", 1, len)
+
+    return engine
+
+
+async def create_schema(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_ideas(engine: AsyncEngine, count: int, batch_size: int = 5000) -> List[str]:
+    """Insert ``count`` approved ideas with random vote counters; returns their ids"""
+    rng = random.Random(1234)
+    now = datetime.utcnow()
+    ids = []
+    async with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, count)):
+                idea_id = f"00000000-0000-4000-8000-{i:012d}"
+                ids.append(idea_id)
+                rows.append({
+                    "id": idea_id,
+                    "title": f"Benchmark idea number {i}",
+                    "slug": f"benchmark-idea-{i}",
+                    "summary": "A seeded idea used for benchmarking the IdeaHub API. " * 2,
+                    "details": "Lorem ipsum dolor sit amet. " * 40,
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "is_new": bool(i % 2),
+                    "status": "approved",
+                    "submitted_by": "SwiftBenchmark",
+                    "upvotes": rng.randint(0, 500),
+                    "downvotes": rng.randint(0, 500),
+                    "created_at": now - timedelta(seconds=i),
+                })
+            await conn.execute(insert(Idea.__table__), rows)
+        await conn.execute(
+            update(Idea.__table__).values(dict(score_values(Idea.upvotes, Idea.downvotes)))
+        )
+    await recompute_hot_scores(async_sessionmaker(engine), batch_size=batch_size)
+    return ids
+
+
+async def seed_votes(
+        engine: AsyncEngine,
+        idea_ids: List[str],
+        count: int,
+        hot_ideas: int = 10,
+        hot_share: float = 0.5,
+        batch_size: int = 5000
+) -> int:
+    """
+    Insert about ``count`` votes, ``hot_share`` of them on the first
+    ``hot_ideas`` ideas, then make every idea's counters and scores match
+    its vote rows. Returns the number of votes stored.
+    """
+    rng = random.Random(4321)
+    hot = idea_ids[:hot_ideas] or idea_ids
+    pairs = set()
+    for i in range(count):
+        idea_id = rng.choice(hot) if rng.random() < hot_share else rng.choice(idea_ids)
+        pairs.add((idea_id, f"seed-voter-{i % max(1, count // 4)}"))
+    rows = [
+        {"idea_id": idea_id, "voter_hash": voter, "vote_type": "upvote" if rng.random() < 0.7 else "downvote"}
+        for idea_id, voter in pairs
+    ]
+
+    def counted(vote_type):
+        return (
+            select(func.count()).select_from(Vote)
+            .where(Vote.idea_id == Idea.id, Vote.vote_type == vote_type)
+            .scalar_subquery()
+        )
+
+    async with engine.begin() as conn:
+        for start in range(0, len(rows), batch_size):
+            await conn.execute(insert(Vote.__table__), rows[start:start + batch_size])
+        up, down = counted("upvote"), counted("downvote")
+        await conn.execute(
+            update(Idea.__table__)
+            .ordered_values(*score_values(up, down), (Idea.upvotes, up), (Idea.downvotes, down))
+        )
+    await recompute_hot_scores(async_sessionmaker(engine), batch_size=batch_size)
+    return len(rows)
+
+
+def override_db(app, engine: AsyncEngine) -> async_sessionmaker:
+    """Point the app's ``get_db`` dependency at ``engine``"""
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def _get_db() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    app.dependency_overrides[get_db] = _get_db
+    return session_factory
+
+
+def asgi_client(app, **kwargs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        **kwargs,
+    )
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
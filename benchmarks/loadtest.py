@@ -0,0 +1,391 @@
+# benchmarks/loadtest.py
+"""
+Repeatable load test for the IdeaHub API.
+
+Seeds ideas and votes into a scratch aiosqlite database, then replays
+traffic mixes against the app and reports throughput and latency
+percentiles per endpoint:
+
+    list_heavy        listings (recent/top/hot, categories, next pages), details
+    vote_storm        votes concentrated on a handful of hot ideas
+    submission_burst  new submissions alongside listings
+    mixed             a bit of everything
+
+Each scenario runs closed-loop: ``--concurrency`` virtual users issue
+requests back to back for ``--duration`` seconds after a warm-up.
+Responses of 429 count as rate limited, 5xx and transport failures as
+errors.
+
+Targets, all offline:
+    --transport asgi     in-process ASGI transport (default)
+    --transport uvicorn  a uvicorn server on a loopback port, in a thread
+    --url http://...     an already running server; no seeding, the ideas
+                         it lists are used
+
+Results can be saved as JSON (``--output``) and compared with a previous
+run (``--baseline``); the run fails (exit 1) when a p99 grows or a
+throughput drops by more than ``--max-regression``, or the error rate
+exceeds ``--max-error-rate``.
+
+    python -m benchmarks.loadtest [--scenario list_heavy vote_storm] [--duration 10]
+        [--concurrency 50] [--ideas 5000] [--votes 50000] [--output run.json]
+        [--baseline previous.json] [--max-regression 0.2]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.db.session as db_session
+from app import app
+from benchmarks.common import CATEGORIES, asgi_client, create_schema, make_sqlite_engine, quiet_logging, seed_ideas, seed_votes
+
+PERCENTILES = (50, 90, 99)
+
+
+class Scenario(NamedTuple):
+    description: str
+    weights: Dict[str, int]
+    hot_ideas: int = 20
+
+
+SCENARIOS = {
+    "list_heavy": Scenario(
+        "listing pages and idea details, few votes",
+        {"list": 65, "list_next": 15, "detail": 15, "vote": 5},
+    ),
+    "vote_storm": Scenario(
+        "votes piling onto a few hot ideas",
+        {"vote": 85, "list": 10, "detail": 5},
+        hot_ideas=5,
+    ),
+    "submission_burst": Scenario(
+        "a burst of new submissions next to normal browsing",
+        {"submit": 60, "list": 30, "detail": 10},
+    ),
+    "mixed": Scenario(
+        "everyday traffic",
+        {"list": 50, "list_next": 10, "detail": 20, "vote": 15, "submit": 5},
+    ),
+}
+
+
+class Traffic:
+    """Request generators for one scenario; ``op`` names are the reported endpoints"""
+
+    def __init__(self, idea_ids: List[str], scenario: Scenario, voters: int, seed: int):
+        self.idea_ids = idea_ids
+        self.hot = idea_ids[:scenario.hot_ideas]
+        self.ops = list(scenario.weights)
+        self.weights = list(scenario.weights.values())
+        self.voters = voters
+        self.rng = random.Random(seed)
+        self.cursors: Dict[tuple, str] = {}
+        self.submissions = 0
+
+    def _voter(self) -> Dict[str, str]:
+        return {"User-Agent": f"loadtest-voter-{self.rng.randrange(self.voters)}"}
+
+    def _listing(self) -> tuple:
+        sort = self.rng.choices(("recent", "top", "hot"), (50, 25, 25))[0]
+        category = self.rng.choice(CATEGORIES) if self.rng.random() < 0.4 else None
+        return sort, category
+
+    async def list(self, client: httpx.AsyncClient, cursor: Optional[str] = None, key=None):
+        key = key or self._listing()
+        params = {"sort": key[0], "per_page": 20}
+        if key[1]:
+            params["category"] = key[1]
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/ideas", params=params)
+        next_cursor = response.headers.get("x-next-cursor")
+        if next_cursor:
+            self.cursors[key] = next_cursor
+        else:
+            self.cursors.pop(key, None)
+        return response
+
+    async def list_next(self, client: httpx.AsyncClient):
+        if not self.cursors:
+            return await self.list(client)
+        key = self.rng.choice(list(self.cursors))
+        return await self.list(client, self.cursors[key], key)
+
+    async def detail(self, client: httpx.AsyncClient):
+        pool = self.hot if self.rng.random() < 0.5 else self.idea_ids
+        return await client.get(f"/api/ideas/{self.rng.choice(pool)}")
+
+    async def vote(self, client: httpx.AsyncClient):
+        idea_id = self.rng.choice(self.hot)
+        vote_type = "upvote" if self.rng.random() < 0.8 else "downvote"
+        return await client.post(
+            f"/api/ideas/{idea_id}/vote", json={"vote_type": vote_type}, headers=self._voter()
+        )
+
+    async def submit(self, client: httpx.AsyncClient):
+        self.submissions += 1
+        n = f"{self.rng.getrandbits(48):012x}"
+        return await client.post(
+            "/api/ideas",
+            json={
+                "title": f"Load test idea {n}",
+                "summary": f"Submitted by the load test to measure the submission path ({n}).",
+                "details": "Details of a load test idea, long enough to be realistic. " * 30,
+                "category": self.rng.choice(CATEGORIES),
+                "is_new": True,
+            },
+            headers=self._voter(),
+        )
+
+    def pick(self):
+        return self.rng.choices(self.ops, self.weights)[0]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, op: str, elapsed: float, status):
+        self.latencies[op].append(elapsed)
+        self.statuses[op][status] += 1
+
+    @staticmethod
+    def _summary(samples: List[float], statuses: Counter, elapsed: float) -> dict:
+        samples = sorted(samples)
+        count = len(samples)
+        errors = sum(n for status, n in statuses.items() if status == "error" or int(status) >= 500)
+        summary = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2),
+            "errors": errors,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "rate_limited": statuses.get("429", 0),
+            "statuses": dict(sorted(statuses.items())),
+            "mean_ms": round(sum(samples) / count * 1e3, 3) if count else 0.0,
+            "max_ms": round(samples[-1] * 1e3, 3) if count else 0.0,
+        }
+        for p in PERCENTILES:
+            summary[f"p{p}_ms"] = round(samples[min(count - 1, int(count * p / 100))] * 1e3, 3) if count else 0.0
+        return summary
+
+    def summarize(self, elapsed: float) -> dict:
+        endpoints = {
+            op: self._summary(samples, self.statuses[op], elapsed)
+            for op, samples in sorted(self.latencies.items())
+        }
+        total = self._summary(
+            [s for samples in self.latencies.values() for s in samples],
+            sum(self.statuses.values(), Counter()),
+            elapsed,
+        )
+        return {"elapsed_s": round(elapsed, 3), "total": total, "endpoints": endpoints}
+
+
+async def run_scenario(client, traffic: Traffic, concurrency: int, duration: float, warmup: float) -> dict:
+    recorder = Recorder()
+    measuring = False
+
+    async def user(deadline: float):
+        while time.perf_counter() < deadline:
+            op = traffic.pick()
+            started = time.perf_counter()
+            try:
+                response = await getattr(traffic, op)(client)
+                status = str(response.status_code)
+            except httpx.HTTPError:
+                status = "error"
+            if measuring:
+                recorder.record(op, time.perf_counter() - started, status)
+
+    if warmup > 0:
+        await asyncio.gather(*(user(time.perf_counter() + warmup) for _ in range(concurrency)))
+    measuring = True
+    started = time.perf_counter()
+    await asyncio.gather(*(user(started + duration) for _ in range(concurrency)))
+    return recorder.summarize(time.perf_counter() - started)
+
+
+class ThreadedServer:
+    """uvicorn on a loopback port, served from a background thread"""
+
+    def __init__(self, asgi_app):
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(
+            asgi_app, host="127.0.0.1", port=0, lifespan="off", log_config=None, access_log=False
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+async def discover_ideas(client: httpx.AsyncClient, limit: int) -> List[str]:
+    """Idea ids listed by a running server, most voted first"""
+    ids, cursor = [], None
+    while len(ids) < limit:
+        params = {"sort": "top", "per_page": 100}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/ideas", params=params)
+        response.raise_for_status()
+        ids.extend(idea["id"] for idea in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    return ids[:limit]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, max_regression: float, max_error_rate: float) -> List[str]:
+    """Human-readable threshold violations of ``results`` (against ``baseline`` when given)"""
+    failures = []
+    for name, run in results["scenarios"].items():
+        for op, current in run["endpoints"].items():
+            if current["error_rate"] > max_error_rate:
+                failures.append(f"{name}/{op}: error rate {current['error_rate']:.2%} > {max_error_rate:.2%}")
+            previous = ((baseline or {}).get("scenarios", {}).get(name) or {}).get("endpoints", {}).get(op)
+            if not previous:
+                continue
+            if previous["p99_ms"] and current["p99_ms"] > previous["p99_ms"] * (1 + max_regression):
+                failures.append(
+                    f"{name}/{op}: p99 {current['p99_ms']:.1f}ms vs {previous['p99_ms']:.1f}ms baseline"
+                )
+            if current["throughput_rps"] < previous["throughput_rps"] * (1 - max_regression):
+                failures.append(
+                    f"{name}/{op}: {current['throughput_rps']:.1f} req/s vs "
+                    f"{previous['throughput_rps']:.1f} req/s baseline"
+                )
+    return failures
+
+
+def print_run(name: str, run: dict):
+    print(f"\n{name}: {SCENARIOS[name].description} ({run['elapsed_s']:.1f}s)")
+    print(f"  {'endpoint':<11}{'req/s':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'429':>7}{'err':>6}")
+    for op, summary in [*run["endpoints"].items(), ("total", run["total"])]:
+        print(
+            f"  {op:<11}{summary['throughput_rps']:9.1f}"
+            + "".join(f"{summary[f'p{p}_ms']:7.1f}ms" for p in PERCENTILES)
+            + f"{summary['max_ms']:7.1f}ms{summary['rate_limited']:7d}{summary['errors']:6d}"
+        )
+
+
+async def main(args) -> int:
+    quiet_logging()
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("transport", "url", "ideas", "votes", "voters", "concurrency", "duration", "warmup", "seed")
+        },
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = None
+        if args.url:
+            base_url = args.url
+        else:
+            seed_engine = make_sqlite_engine(Path(tmp) / "loadtest.db")
+            await create_schema(seed_engine)
+            idea_ids = await seed_ideas(seed_engine, args.ideas)
+            stored = await seed_votes(seed_engine, idea_ids, args.votes)
+            await seed_engine.dispose()
+            print(f"seeded {len(idea_ids)} ideas and {stored} votes")
+            # The app's own get_db, on the scratch database
+            engine = make_sqlite_engine(Path(tmp) / "loadtest.db")
+            db_session.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+        server = ThreadedServer(app) if args.transport == "uvicorn" and not args.url else None
+        if server is not None:
+            base_url = server.__enter__()
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            if server is None and not args.url:
+                client = asgi_client(app, timeout=60)
+            else:
+                client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+            async with client:
+                if args.url:
+                    idea_ids = await discover_ideas(client, args.ideas)
+                    print(f"using {len(idea_ids)} ideas listed by {args.url}")
+                for offset, name in enumerate(args.scenario):
+                    traffic = Traffic(idea_ids, SCENARIOS[name], args.voters, args.seed + offset)
+                    run = await run_scenario(client, traffic, args.concurrency, args.duration, args.warmup)
+                    results["scenarios"][name] = run
+                    print_run(name, run)
+        finally:
+            if server is not None:
+                server.__exit__(None, None, None)
+            if engine is not None:
+                await engine.dispose()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nresults written to {args.output}")
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    if baseline is not None:
+        differing = [
+            key for key, value in results["config"].items()
+            if key != "seed" and baseline.get("config", {}).get(key) != value
+        ]
+        if differing:
+            print(f"note: baseline ran with different {', '.join(differing)}; numbers may not be comparable")
+    failures = compare(results, baseline, args.max_regression, args.max_error_rate)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if baseline is not None and not failures:
+        print(f"no regressions beyond {args.max_regression:.0%} against {args.baseline}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--url", help="load an already running server instead")
+    parser.add_argument("--ideas", type=int, default=5000)
+    parser.add_argument("--votes", type=int, default=50000)
+    parser.add_argument("--voters", type=int, default=5000, help="distinct clients sending votes/submissions")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    sys.exit(asyncio.run(main(parser.parse_args())))
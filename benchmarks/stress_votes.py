@@ -0,0 +1,104 @@
+# benchmarks/stress_votes.py
+"""
+Contention stress test for the vote path.
+
+Many voters hammer a single hot idea with random upvotes, downvotes,
+switches and repeats. Afterwards the stored counters must equal
+``COUNT(*)`` over ``votes`` and the stored scores must match the counters.
+Exits non-zero on any mismatch.
+
+    python -m benchmarks.stress_votes [--voters 300] [--rounds 5] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from app import app
+from app.models.idea import Idea, Vote
+from benchmarks.common import (
+    Timer, asgi_client, create_schema, make_sqlite_engine, override_db, quiet_logging, seed_ideas
+)
+
+
+async def check_consistency(session_factory, idea_ids) -> bool:
+    ok = True
+    async with session_factory() as session:
+        for idea_id in idea_ids:
+            idea = await session.get(Idea, idea_id)
+            counted = dict((await session.execute(
+                select(Vote.vote_type, func.count())
+                .where(Vote.idea_id == idea_id)
+                .group_by(Vote.vote_type)
+            )).all())
+            expected = (counted.get('upvote', 0), counted.get('downvote', 0))
+            stored = (idea.upvotes, idea.downvotes)
+            if stored != expected or idea.net_score != idea.upvotes - idea.downvotes:
+                print(f"MISMATCH {idea_id}: stored={stored} net={idea.net_score} counted={expected}")
+                ok = False
+            else:
+                print(f"ok {idea_id}: upvotes={stored[0]} downvotes={stored[1]}")
+    return ok
+
+
+async def main(voters: int, rounds: int, concurrency: int) -> bool:
+    quiet_logging()
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_sqlite_engine(Path(tmp) / "stress.db")
+        await create_schema(engine)
+        idea_ids = await seed_ideas(engine, 2)
+        session_factory = override_db(app, engine)
+
+        # Start from zero so every counter is backed by a vote row
+        async with session_factory() as session, session.begin():
+            for idea_id in idea_ids:
+                idea = await session.get(Idea, idea_id)
+                idea.upvotes = idea.downvotes = idea.net_score = 0
+
+        hot_idea = idea_ids[0]
+        jobs = [
+            (hot_idea, f"stress-voter-{voter}", rng.choice(("upvote", "downvote")))
+            for _ in range(rounds)
+            for voter in range(voters)
+        ]
+        rng.shuffle(jobs)
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = {}
+
+        async def cast(client, idea_id, user_agent, vote_type):
+            async with semaphore:
+                response = await client.post(
+                    f"/api/ideas/{idea_id}/vote",
+                    json={"vote_type": vote_type},
+                    headers={"User-Agent": user_agent},
+                )
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Rate limiting is per voter and would reject most repeat votes
+        from app.security import voting_limiter
+        voting_limiter.enabled = False
+        async with asgi_client(app) as client:
+            with Timer() as timer:
+                await asyncio.gather(*(cast(client, *job) for job in jobs))
+        voting_limiter.enabled = True
+
+        print(f"{len(jobs)} votes in {timer.elapsed:.2f}s ({len(jobs) / timer.elapsed:.0f}/s), statuses={statuses}")
+        ok = await check_consistency(session_factory, idea_ids)
+
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--voters", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.voters, args.rounds, args.concurrency)) else 1)
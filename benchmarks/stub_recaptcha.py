@@ -0,0 +1,77 @@
+# benchmarks/stub_recaptcha.py
+"""
+Local stand-in for Google's ``siteverify`` endpoint.
+
+Serves ``POST /siteverify`` on 127.0.0.1 with a configurable delay, score
+and failure mode, and counts the verifications it answers, so the
+verifier can be exercised without network access:
+
+    async with StubVerifier() as stub:
+        verifier = CaptchaVerifier(stub.url, "secret")
+        stub.mode = "hang"
+"""
+import asyncio
+import socket
+from urllib.parse import parse_qs
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+class StubVerifier:
+    def __init__(self, score: float = 0.9, delay: float = 0.0):
+        self.score = score
+        self.delay = delay
+        # "ok", "error" (HTTP 503), "hang" (never answers in time) or
+        # "garbled" (200 with a JSON body that is not an object)
+        self.mode = "ok"
+        self.requests = 0
+        self._server = None
+        self._task = None
+        self._socket = None
+        self._closing = asyncio.Event()
+
+    async def _siteverify(self, request: Request):
+        self.requests += 1
+        # Parsed by hand: Starlette's form parser needs python-multipart
+        form = parse_qs((await request.body()).decode())
+        if self.mode == "hang":
+            # Held until the stub shuts down
+            await self._closing.wait()
+            return Response(status_code=503)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.mode == "error":
+            return Response(status_code=503)
+        if self.mode == "garbled":
+            return JSONResponse(["success"])
+        success = not form.get("response", [""])[0].startswith("bad")
+        return JSONResponse({"success": success, "score": self.score if success else 0.0})
+
+    @property
+    def url(self) -> str:
+        host, port = self._socket.getsockname()
+        return f"http://{host}:{port}/siteverify"
+
+    async def __aenter__(self):
+        app = Starlette(routes=[Route("/siteverify", self._siteverify, methods=["POST"])])
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Inherited by accepted connections; otherwise each response waits
+        # ~40ms on the client's delayed ACK and swamps the measurements
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        config = uvicorn.Config(app, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve(sockets=[self._socket]))
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._closing.set()
+        self._server.should_exit = True
+        await self._task
+        self._socket.close()
@@ -48,19 +48,20 @@ def run_migrations_online():
         poolclass=pool.NullPool,
     )
 
-    async def do_run_migrations(connection):
+    def do_run_migrations(connection):
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
         )
 
-        async with context.begin_transaction():
-            await context.run_migrations()
+        with context.begin_transaction():
+            context.run_migrations()
 
     async def run():
         async with connectable.connect() as connection:
-            await do_run_migrations(connection)
+            await connection.run_sync(do_run_migrations)
+        await connectable.dispose()
 
     asyncio.run(run())
 
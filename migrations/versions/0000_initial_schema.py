@@ -0,0 +1,57 @@
+"""Initial schema: ideas and votes
+
+Revision ID: 0000_initial_schema
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+Databases whose tables were created at startup (before the schema was
+managed here) already match this revision: ``alembic stamp
+0000_initial_schema`` them, then upgrade.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0000_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ideas',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('title', sa.String(200), nullable=False),
+        sa.Column('slug', sa.String(220), nullable=False, unique=True),
+        sa.Column('summary', sa.String(500), nullable=False),
+        sa.Column('details', sa.String(10000), nullable=False),
+        sa.Column('category', sa.Enum('industry', 'technology', 'problem_area'), nullable=False),
+        sa.Column('is_new', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'approved', 'rejected')),
+        sa.Column('submitted_by', sa.String(100), nullable=False),
+        sa.Column('upvotes', sa.Integer(), nullable=False),
+        sa.Column('downvotes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.CheckConstraint('char_length(title) >= 10', name='title_min_length'),
+        sa.CheckConstraint('char_length(summary) BETWEEN 50 AND 500', name='summary_length'),
+    )
+    op.create_index('ix_ideas_title', 'ideas', ['title'])
+    op.create_index('ix_ideas_status', 'ideas', ['status'])
+
+    op.create_table(
+        'votes',
+        sa.Column('idea_id', sa.String(36), sa.ForeignKey('ideas.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('voter_hash', sa.String(64), primary_key=True),
+        sa.Column('vote_type', sa.Enum('upvote', 'downvote'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table('votes')
+    op.drop_index('ix_ideas_status', table_name='ideas')
+    op.drop_index('ix_ideas_title', table_name='ideas')
+    op.drop_table('ideas')
@@ -0,0 +1,31 @@
+"""Composite indexes for keyset pagination of approved ideas
+
+Revision ID: 0001_keyset_pagination
+Revises: 0000_initial_schema
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0001_keyset_pagination'
+down_revision = '0000_initial_schema'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_ideas_status_created', ['status', 'created_at', 'id']),
+    ('ix_ideas_status_category_created', ['status', 'category', 'created_at', 'id']),
+    ('ix_ideas_status_upvotes', ['status', 'upvotes', 'id']),
+    ('ix_ideas_status_category_upvotes', ['status', 'category', 'upvotes', 'id']),
+)
+
+
+def upgrade():
+    for name, columns in INDEXES:
+        op.create_index(name, 'ideas', columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='ideas')
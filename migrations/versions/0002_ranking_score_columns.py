@@ -0,0 +1,71 @@
+"""Stored ranking score columns with per-(status, category) indexes
+
+Revision ID: 0002_ranking_scores
+Revises: 0001_keyset_pagination
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_ranking_scores'
+down_revision = '0001_keyset_pagination'
+branch_labels = None
+depends_on = None
+
+SCORE_COLUMNS = (
+    ('net_score', sa.Integer(), '0'),
+    ('wilson_score', sa.Double(), '0'),
+    ('controversy', sa.Double(), '0'),
+    ('hot_score', sa.Double(), '0'),
+)
+
+INDEXES = (
+    ('ix_ideas_status_net_score', ['status', 'net_score', 'id']),
+    ('ix_ideas_status_category_net_score', ['status', 'category', 'net_score', 'id']),
+    ('ix_ideas_status_wilson', ['status', 'wilson_score', 'id']),
+    ('ix_ideas_status_category_wilson', ['status', 'category', 'wilson_score', 'id']),
+    ('ix_ideas_status_controversy', ['status', 'controversy', 'id']),
+    ('ix_ideas_status_category_controversy', ['status', 'category', 'controversy', 'id']),
+    ('ix_ideas_status_hot', ['status', 'hot_score', 'id']),
+    ('ix_ideas_status_category_hot', ['status', 'category', 'hot_score', 'id']),
+)
+
+# Same formulas as app.services.ranking.score_values; hot_score is filled
+# in by the periodic recomputation job.
+BACKFILL = """
+UPDATE ideas SET
+    net_score = upvotes - downvotes,
+    wilson_score = CASE
+        WHEN upvotes + downvotes = 0 THEN 0
+        ELSE (upvotes + 1.9208 - 1.96 * SQRT(upvotes * downvotes / (upvotes + downvotes) + 0.9604))
+             / (upvotes + downvotes + 3.8416)
+    END,
+    controversy = CASE
+        WHEN upvotes <= 0 OR downvotes <= 0 THEN 0
+        WHEN upvotes > downvotes THEN POWER(upvotes + downvotes, downvotes / upvotes)
+        ELSE POWER(upvotes + downvotes, upvotes / downvotes)
+    END
+"""
+
+
+def upgrade():
+    for name, column_type, default in SCORE_COLUMNS:
+        op.add_column('ideas', sa.Column(name, column_type, nullable=False, server_default=default))
+    op.execute(BACKFILL)
+
+    # popular now ranks by wilson_score, so the upvotes indexes are unused
+    op.drop_index('ix_ideas_status_category_upvotes', table_name='ideas')
+    op.drop_index('ix_ideas_status_upvotes', table_name='ideas')
+    for name, columns in INDEXES:
+        op.create_index(name, 'ideas', columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='ideas')
+    op.create_index('ix_ideas_status_upvotes', 'ideas', ['status', 'upvotes', 'id'])
+    op.create_index('ix_ideas_status_category_upvotes', 'ideas', ['status', 'category', 'upvotes', 'id'])
+    for name, _, _ in reversed(SCORE_COLUMNS):
+        op.drop_column('ideas', name)
@@ -0,0 +1,25 @@
+"""FULLTEXT index for idea search
+
+Revision ID: 0003_ideas_fulltext
+Revises: 0002_ranking_scores
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0003_ideas_fulltext'
+down_revision = '0002_ranking_scores'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # InnoDB builds the auxiliary FTS tables in place (ALGORITHM=INPLACE)
+    op.create_index(
+        'ft_ideas_search', 'ideas', ['title', 'summary', 'details'], mysql_prefix='FULLTEXT'
+    )
+
+
+def downgrade():
+    op.drop_index('ft_ideas_search', table_name='ideas')
@@ -0,0 +1,110 @@
+# tests/test_captcha.py
+"""
+``CaptchaVerifier`` and its circuit breaker against the local stub
+verifier in ``benchmarks.stub_recaptcha``.
+"""
+import asyncio
+
+from app.services.captcha import CaptchaVerifier
+from app.utils.circuit import CircuitBreaker
+from benchmarks.stub_recaptcha import StubVerifier
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def run(scenario):
+    """Run ``scenario(stub, verifier, clock)`` against a fresh stub verifier"""
+    async def main():
+        clock = FakeClock()
+        async with StubVerifier() as stub:
+            verifier = CaptchaVerifier(
+                stub.url, "secret", read_timeout=0.5,
+                breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30, timer=clock),
+            )
+            try:
+                return await scenario(stub, verifier, clock)
+            finally:
+                await verifier.close()
+    return asyncio.run(main())
+
+
+async def open_circuit(stub, verifier, clock):
+    stub.mode = "error"
+    for n in range(2):
+        assert not await verifier.verify(f"token-{n}")
+    assert verifier.breaker.state == CircuitBreaker.OPEN
+    stub.mode = "ok"
+    clock.now += 30
+    assert verifier.breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_verifies_and_caches_tokens():
+    async def scenario(stub, verifier, clock):
+        assert await verifier.verify("good-token")
+        assert await verifier.verify("good-token")
+        assert not await verifier.verify("bad-token")
+        assert stub.requests == 2
+    run(scenario)
+
+
+def test_probe_success_closes_circuit():
+    async def scenario(stub, verifier, clock):
+        await open_circuit(stub, verifier, clock)
+        requests = stub.requests
+        assert await verifier.verify("probe-token")
+        assert stub.requests == requests + 1
+        assert verifier.breaker.state == CircuitBreaker.CLOSED
+    run(scenario)
+
+
+def test_cancelled_probe_releases_circuit():
+    async def scenario(stub, verifier, clock):
+        await open_circuit(stub, verifier, clock)
+        stub.mode = "hang"
+        probe = asyncio.create_task(verifier.verify("probe-token"))
+        while not verifier.breaker._probing:
+            await asyncio.sleep(0.01)
+        probe.cancel()
+        try:
+            await probe
+        except asyncio.CancelledError:
+            pass
+        # The next call may probe again, and closes the circuit
+        stub.mode = "ok"
+        assert verifier.breaker.allow()
+        verifier.breaker.release()
+        assert await verifier.verify("next-token")
+        assert verifier.breaker.state == CircuitBreaker.CLOSED
+    run(scenario)
+
+
+def test_non_object_answer_counts_as_failure():
+    async def scenario(stub, verifier, clock):
+        await open_circuit(stub, verifier, clock)
+        stub.mode = "garbled"
+        assert not await verifier.verify("probe-token")
+        # A failed probe re-opens the circuit until the next reset timeout
+        assert verifier.breaker.state == CircuitBreaker.OPEN
+        stub.mode = "ok"
+        clock.now += 30
+        assert await verifier.verify("next-token")
+        assert verifier.breaker.state == CircuitBreaker.CLOSED
+    run(scenario)
+
+
+def test_fail_open_while_circuit_open():
+    async def scenario(stub, verifier, clock):
+        verifier.fail_open = True
+        stub.mode = "error"
+        for n in range(2):
+            assert await verifier.verify(f"token-{n}")
+        requests = stub.requests
+        assert await verifier.verify("token-open")
+        assert stub.requests == requests
+    run(scenario)
@@ -0,0 +1,29 @@
+# tests/test_compression.py
+"""``Accept-Encoding`` negotiation, q-values included."""
+import pytest
+
+from app.compression import Compressor
+
+
+@pytest.fixture
+def compressor():
+    pytest.importorskip("brotli")
+    return Compressor(["br", "gzip"], {"br": 4, "gzip": 6}, minimum_size=0)
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, br", "br"),                     # equal q: server order
+    ("gzip, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0, *", "gzip"),                  # an explicit refusal beats the wildcard
+    ("BR;Q=0, GZIP", "gzip"),
+    ("*;q=0.1", "br"),
+    ("gzip;q=0, br;q=0", None),
+    ("identity;q=0, gzip;q=0.1", "gzip"),
+    ("identity;q=0", None),                 # nothing acceptable: identity rather than a 406
+    ("deflate", None),
+    ("gzip;q=abc, br;q=0", None),
+    ("", None),
+])
+def test_negotiate(compressor, accept_encoding, expected):
+    assert compressor.negotiate(accept_encoding) == expected
@@ -0,0 +1,35 @@
+# tests/test_http_cache.py
+"""Conditional request matching for ``GET /api/ideas``."""
+from email.utils import formatdate
+
+import pytest
+
+from app.http_cache import etag_matches, not_modified_since
+
+ETAG = 'W/"1a.2b.18f0"'
+
+
+@pytest.mark.parametrize("if_none_match, matched", [
+    (ETAG, True),
+    ('"1a.2b.18f0"', True),                 # weak comparison ignores W/
+    ('W/"0.0.0", W/"1a.2b.18f0"', True),
+    ('W/"0.0.0",W/"1a.2b.18f0" ', True),
+    ('W/"0.0.0", "ff"', False),
+    (" * ", True),
+    ('W/"1a.2b"', False),
+    ("", False),
+])
+def test_etag_matches(if_none_match, matched):
+    assert etag_matches(if_none_match, ETAG) is matched
+
+
+def test_not_modified_since_compares_whole_seconds():
+    modified = 1700000000.75
+    assert not_modified_since(formatdate(1700000000, usegmt=True), modified)
+    assert not_modified_since(formatdate(1700000060, usegmt=True), modified)
+    assert not not_modified_since(formatdate(1699999999, usegmt=True), modified)
+
+
+@pytest.mark.parametrize("header", ["", "yesterday", "Mon, 99 Foo 2024 00:00:00 GMT"])
+def test_unparsable_if_modified_since_is_not_a_match(header):
+    assert not not_modified_since(header, 1700000000.0)
@@ -0,0 +1,77 @@
+# tests/test_listing_sweep.py
+"""
+``ListingSweep`` coalescing delayed listing passes, with recording fakes
+for the listing cache, listing versions and vote buffer.
+"""
+import asyncio
+
+from app.services.listing_sweep import ListingSweep
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    async def refresh_counts(self, idea_id, upvotes, downvotes):
+        self.calls.append(("refresh", idea_id, upvotes, downvotes))
+
+    async def invalidate_categories(self, categories):
+        self.calls.append(("drop", sorted(categories)))
+
+    async def bump_categories(self, categories):
+        self.calls.append(("bump", sorted(categories)))
+
+    async def wait_flushed(self):
+        self.calls.append(("flushed",))
+
+
+def test_changes_queued_together_are_swept_once():
+    async def main():
+        sweep, calls = ListingSweep(), Recorder()
+        sweep.start(calls, calls, calls, 0.05)
+        for upvotes in range(1, 101):
+            sweep.schedule(counts={"a": (upvotes, 0)}, voted={"tech"})
+        sweep.schedule(dropped={"industry"})
+        await asyncio.sleep(0.2)
+        return sweep, calls.calls
+
+    sweep, calls = asyncio.run(main())
+    assert calls == [
+        ("flushed",),
+        ("bump", ["tech"]),
+        ("refresh", "a", 100, 0),
+        ("drop", ["industry"]),
+        ("bump", ["industry", "tech"]),
+    ]
+    assert not sweep.pending()
+
+
+def test_changes_queued_during_a_sweep_get_their_own():
+    async def main():
+        sweep, calls = ListingSweep(), Recorder()
+        sweep.start(None, calls, None, 0.1)
+        sweep.schedule(dropped={"tech"})
+        await asyncio.sleep(0.03)
+        sweep.schedule(dropped={"industry"})
+        await asyncio.sleep(0.12)
+        first = list(calls.calls)
+        await asyncio.sleep(0.15)
+        return first, calls.calls
+
+    first, calls = asyncio.run(main())
+    assert first == [("bump", ["tech"])]
+    assert calls == [("bump", ["tech"]), ("bump", ["industry"])]
+
+
+def test_stop_drops_pending_changes():
+    async def main():
+        sweep, calls = ListingSweep(), Recorder()
+        sweep.start(None, calls, None, 10)
+        sweep.schedule(dropped={"tech"})
+        await sweep.stop()
+        sweep.start(None, calls, None, 0.01)
+        sweep.schedule(dropped={"industry"})
+        await asyncio.sleep(0.05)
+        return calls.calls
+
+    assert asyncio.run(main()) == [("bump", ["industry"])]
@@ -0,0 +1,59 @@
+# tests/test_pagination.py
+"""
+Cursor round-trips, and the cursors ``decode_cursor`` must refuse before
+any of their values reach a query.
+"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(sort, payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, payload]).encode()).decode().rstrip("=")
+
+
+def test_round_trip_restores_datetimes():
+    created = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    cursor = encode_cursor("recent", (created, "idea-id"))
+    assert decode_cursor(cursor, "recent", (datetime, str)) == (created, "idea-id")
+
+
+def test_float_slot_accepts_ints():
+    assert decode_cursor(raw_cursor("top", [3, "id"]), "top", (float, str)) == (3, "id")
+
+
+def test_cursor_for_another_sort_is_refused():
+    cursor = encode_cursor("top", (3, "id"))
+    with pytest.raises(ValueError, match="sort order"):
+        decode_cursor(cursor, "recent")
+
+
+@pytest.mark.parametrize("payload", [
+    [True, "id"],           # bools are ints to Python, never scores here
+    [3, False],
+    [float("inf"), "id"],
+    [float("nan"), "id"],
+    ["3", "id"],            # wrong kind
+    [{"dt": "2024-05-01T12:30:15"}, "id"],
+    [3],                    # wrong arity
+    [3, "id", "extra"],
+])
+def test_mistyped_values_are_refused(payload):
+    with pytest.raises(ValueError, match="Malformed"):
+        decode_cursor(raw_cursor("top", payload), "top", (float, str))
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    raw_cursor("top", "not a list"),
+    raw_cursor("recent", [{"dt": "yesterday"}, "id"]),
+    base64.urlsafe_b64encode(json.dumps(["top"]).encode()).decode(),
+])
+def test_malformed_cursors_are_refused(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "top")
@@ -0,0 +1,120 @@
+# tests/test_rate_limit.py
+"""
+Token-bucket storages: refill, costs, expiry and slot recycling, on every
+backend (Redis through ``fakeredis[lua]`` when installed).
+"""
+import time
+
+import pytest
+from limits.errors import ConfigurationError
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.services.rate_limit import BucketStorage, MemoryBucketStorage, MmapBucketStorage, RedisBucketStorage
+
+
+def memory_storage(tmp_path):
+    return MemoryBucketStorage("bucket-memory://")
+
+
+def mmap_storage(tmp_path):
+    return MmapBucketStorage(f"bucket-mmap://{tmp_path}/buckets?slots=64")
+
+
+def redis_storage(tmp_path):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisBucketStorage("bucket-redis://localhost:6379/0", client=fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=[memory_storage, mmap_storage, redis_storage], ids=["memory", "mmap", "redis"])
+def storage(request, tmp_path):
+    return request.param(tmp_path)
+
+
+def test_spends_until_empty_then_refills(storage):
+    # 2 tokens, refilled at 40 per second
+    assert [storage.acquire("k", 2, 40, 1).allowed for _ in range(3)] == [True, True, False]
+    time.sleep(0.06)
+    bucket = storage.acquire("k", 2, 40, 1)
+    assert bucket.allowed
+    assert bucket.remaining == pytest.approx(1, abs=0.2)
+
+
+def test_cost_above_capacity_is_never_allowed(storage):
+    bucket = storage.acquire("k", 5, 1, 6)
+    assert not bucket.allowed
+    assert bucket.remaining == pytest.approx(5)
+    # and spends nothing
+    assert storage.acquire("k", 5, 1, 5).allowed
+
+
+def test_zero_cost_only_reads(storage):
+    storage.acquire("k", 3, 0.001, 2)
+    for _ in range(3):
+        bucket = storage.acquire("k", 3, 0.001, 0)
+        assert bucket.allowed
+        assert bucket.remaining == pytest.approx(1, abs=0.01)
+
+
+def test_keys_do_not_share_buckets(storage):
+    assert storage.acquire("a", 1, 0.001, 1).allowed
+    assert not storage.acquire("a", 1, 0.001, 1).allowed
+    assert storage.acquire("b", 1, 0.001, 1).allowed
+
+
+def test_clear_refills_a_bucket(storage):
+    storage.acquire("k", 1, 0.001, 1)
+    storage.clear("k")
+    assert storage.acquire("k", 1, 0.001, 1).allowed
+
+
+def test_memory_bucket_expires_once_full_again():
+    storage = MemoryBucketStorage("bucket-memory://")
+    storage.acquire("k", 2, 100, 1)
+    assert "k" in storage._buckets
+    time.sleep(0.02)
+    assert "k" not in storage._buckets
+
+
+def test_redis_bucket_expires_after_refilling():
+    storage = redis_storage(None)
+    storage.acquire("k", 10, 1, 4)
+    # 4s to refill plus a second of slack
+    assert 4000 < storage.client.pttl("ideahub:ratelimit:k") <= 5000
+
+
+def test_full_mmap_stripe_recycles_least_recently_updated_slot(tmp_path):
+    storage = MmapBucketStorage(f"bucket-mmap://{tmp_path}/buckets?slots={MmapBucketStorage.STRIPE_SLOTS}")
+    assert storage.stripes == 1
+    storage.acquire("first", 1, 0.001, 1)
+    assert not storage.acquire("first", 1, 0.001, 1).allowed
+    for n in range(MmapBucketStorage.STRIPE_SLOTS):
+        assert storage.acquire(f"key-{n}", 1, 0.001, 1).allowed
+    # "first" lost its slot, so it starts over with a full bucket
+    assert storage.acquire("first", 1, 0.001, 1).allowed
+
+
+def test_mmap_buckets_are_shared_between_openers(tmp_path):
+    uri = f"bucket-mmap://{tmp_path}/buckets?slots=64"
+    assert MmapBucketStorage(uri).acquire("k", 1, 0.001, 1).allowed
+    assert not MmapBucketStorage(uri).acquire("k", 1, 0.001, 1).allowed
+
+
+def test_incomplete_bucket_storage_fails_when_built():
+    class NoAcquire(BucketStorage):
+        STORAGE_SCHEME = ["bucket-incomplete"]
+
+        def reset(self):
+            return None
+
+        def clear(self, key):
+            pass
+
+    with pytest.raises(TypeError):
+        NoAcquire("bucket-incomplete://")
+
+
+def test_token_bucket_strategy_refuses_counter_storages():
+    with pytest.raises(ConfigurationError):
+        Limiter(key_func=get_remote_address, strategy="token-bucket", storage_uri="memory://")
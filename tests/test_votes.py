@@ -0,0 +1,17 @@
+# tests/test_votes.py
+"""Counter deltas for every (previous vote, new vote) pair."""
+import pytest
+
+from app.services.votes import vote_delta
+
+
+@pytest.mark.parametrize("previous, vote_type, expected", [
+    (None, "upvote", {"upvotes": 1, "downvotes": 0}),
+    (None, "downvote", {"upvotes": 0, "downvotes": 1}),
+    ("upvote", "upvote", {"upvotes": 0, "downvotes": 0}),
+    ("downvote", "downvote", {"upvotes": 0, "downvotes": 0}),
+    ("upvote", "downvote", {"upvotes": -1, "downvotes": 1}),
+    ("downvote", "upvote", {"upvotes": 1, "downvotes": -1}),
+])
+def test_vote_delta(previous, vote_type, expected):
+    assert vote_delta(previous, vote_type) == expected